@@ -1,11 +1,17 @@
 """RAG endpoint definitions."""
 
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 
 router = APIRouter(prefix="/rag")
 
 
+def _do_rag(question: str) -> dict:
+    """Run the (blocking) RAG pipeline for a question."""
+    return {"question": question, "answer": None}
+
+
 @router.post("")
-def run_rag(question: str) -> dict:
+async def run_rag(question: str) -> dict:
     """Placeholder RAG endpoint."""
-    return {"question": question, "answer": None}
+    return await run_in_threadpool(_do_rag, question)
@@ -1,11 +1,17 @@
 """Search endpoint definitions."""
 
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 
 router = APIRouter(prefix="/search")
 
 
+def _do_search(q: str) -> dict:
+    """Run the (blocking) staff search for a query."""
+    return {"query": q, "results": []}
+
+
 @router.get("")
-def search_staff(q: str) -> dict:
+async def search_staff(q: str) -> dict:
     """Placeholder search endpoint."""
-    return {"query": q, "results": []}
+    return await run_in_threadpool(_do_search, q)
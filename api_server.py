@@ -10,30 +10,53 @@ Usage:
     # Or with custom port
     python3 api_server.py --port 8000
 
+    # Multiple worker processes (each loads its own copy of the models,
+    # so RAM use scales with --workers)
+    python3 api_server.py --workers 4
+
+    # Multiple workers sharing one model process (see model_worker.py)
+    python3 model_worker.py &
+    MODEL_WORKER_SOCKET=/tmp/unsw_rag_models.sock python3 api_server.py --workers 4
+
     # Test with curl
     curl -X POST "http://localhost:8000/ask" \
          -H "Content-Type: application/json" \
          -d '{"query": "What is digital twin?", "max_context": 5}'
 """
+import os
+import re
 import sys
 from pathlib import Path
 import logging
-from typing import Optional
+import traceback
+from typing import Optional, TYPE_CHECKING
 import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from functools import partial, lru_cache
 import uvicorn
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from pydantic import BaseModel, Field, field_validator
 
 # Add project root
 PROJECT_ROOT = Path(__file__).parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from config.settings import settings
-from search.hybrid_search import HybridSearchEngine
-from search.rag_generator import RAGAnswerGenerator
-from pipeline.step4_generate_embeddings import EmbeddingGenerator
+from search.batching import BatchingCoalescer
+from search.embedding_cache import QueryEmbeddingCache
+from search.model_client import RemoteModelClient
+
+# Search / LLM modules are imported lazily (startup_event, _get_generator) so
+# `--reload` restarts stay fast and /health still responds if one is broken
+if TYPE_CHECKING:
+    from search.rag_generator import RAGAnswerGenerator
 
 # Configure logging
 logging.basicConfig(
@@ -42,18 +65,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Connection pool sized for expected /ask concurrency
+DB_POOL_SIZE = 20
+DB_MAX_OVERFLOW = 20
+# Recycle connections before Postgres / network idle timeouts kill them
+DB_POOL_RECYCLE = 1800
+
+# Micro-batching of embedding / reranker calls across concurrent requests
+MAX_BATCH = int(os.getenv("MAX_BATCH", "32"))
+MAX_WAIT_MS = float(os.getenv("MAX_WAIT_MS", "8"))
+
+# Shared model worker (see model_worker.py); when set, this process loads no models
+MODEL_WORKER_SOCKET = os.getenv("MODEL_WORKER_SOCKET")
+
+# Database liveness is checked in the background; /health only reads the flag
+HEALTH_REFRESH_INTERVAL = 1.0
+
+# Concurrent OpenAI completion calls (network-bound, bounded by provider limits)
+LLM_MAX_WORKERS = min(max(int(os.getenv("LLM_MAX_WORKERS", "8")), 1), 16)
+
+# Default answer generation settings
+DEFAULT_LLM_MODEL = "gpt-4o-mini"
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_MAX_TOKENS = 1000
+
 
 # ============================================================================
 # Pydantic Models for API
 # ============================================================================
 
+# Longest accepted question; longer input is rejected before any model call
+QUERY_MAX_LENGTH = 2000
+
+_PUNCTUATION_ONLY = re.compile(r"^[\W_]+$")
+
+
 class QueryRequest(BaseModel):
     """Request model for asking questions"""
-    query: str = Field(..., description="User question", min_length=1)
+    query: str = Field(
+        ...,
+        description="User question",
+        min_length=1,
+        max_length=QUERY_MAX_LENGTH
+    )
     max_context: int = Field(10, description="Maximum context chunks to use", ge=1, le=20)
     include_sources: bool = Field(True, description="Whether to include source citations")
     model: Optional[str] = Field(None, description="Override default LLM model")
 
+    @field_validator("query")
+    @classmethod
+    def _normalize_query(cls, value: str) -> str:
+        """Strip whitespace and reject blank or punctuation-only questions"""
+        value = value.strip()
+        if not value:
+            raise ValueError("query must not be blank")
+        if _PUNCTUATION_ONLY.match(value):
+            raise ValueError("query must contain letters or digits")
+        return value
+
 
 class QueryResponse(BaseModel):
     """Response model for answers"""
@@ -84,24 +153,41 @@ class AppState:
         self.search_engine = None
         self.rag_generator = None
         self.embedding_generator = None
+        self.embedding_batcher = None
+        self.rerank_batcher = None
+        self.embedding_cache = None
+        self.rerank = None
+        self.reranked = False
+        self.llm_executor = None
+        self.database_ok = False
+        self.health_task = None
         self.initialized = False
 
 
 app_state = AppState()
 
 
-# ============================================================================
-# FastAPI Application
-# ============================================================================
+@lru_cache(maxsize=16)
+def _get_generator(model: str, temperature: float, max_tokens: int) -> "RAGAnswerGenerator":
+    """
+    Return a shared RAGAnswerGenerator for the given settings.
 
-app = FastAPI(
-    title="UNSW RAG Q&A API",
-    description="RAG-based question answering system for UNSW research",
-    version="1.0.0"
-)
+    Generators are built once per (model, temperature, max_tokens) and reused;
+    the underlying OpenAI client is thread-safe.
+    """
+    from search.rag_generator import RAGAnswerGenerator
 
+    return RAGAnswerGenerator(
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+
+
+# ============================================================================
+# Lifecycle
+# ============================================================================
 
-@app.on_event("startup")
 async def startup_event():
     """
     Initialize models and database connections on startup.
@@ -112,40 +198,102 @@ async def startup_event():
     logger.info("=" * 80)
 
     try:
+        from search.hybrid_search import HybridSearchEngine
+        from pipeline.step4_generate_embeddings import EmbeddingGenerator
+
         # 1. Connect to database
         logger.info(f"Connecting to database: {settings.postgres_dsn}")
-        app_state.db_engine = create_engine(settings.postgres_dsn, echo=False)
-        app_state.SessionLocal = sessionmaker(bind=app_state.db_engine)
+        app_state.db_engine = create_engine(
+            settings.postgres_dsn,
+            echo=False,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            pool_use_lifo=True
+        )
+        app_state.SessionLocal = sessionmaker(bind=app_state.db_engine, expire_on_commit=False)
         logger.info("✓ Database connected")
 
-        # 2. Initialize embedding generator
-        logger.info("Initializing embedding generator...")
-        app_state.embedding_generator = EmbeddingGenerator(model_type="openai")
-        logger.info("✓ Embedding generator initialized")
-
-        # 3. Initialize search engine (this loads the reranker model)
-        logger.info("Initializing search engine with reranker...")
-        logger.info("  (This will take ~7 seconds for model loading...)")
-        session = app_state.SessionLocal()
-        try:
-            app_state.search_engine = HybridSearchEngine(
-                session=session,
-                embedding_generator=app_state.embedding_generator,
-                use_reranker=True,
-                reranker_model="local"
+        app_state.health_task = asyncio.create_task(_refresh_health())
+
+        if MODEL_WORKER_SOCKET:
+            # 2-3. Models live in the shared model worker process
+            logger.info(f"Using shared model worker at {MODEL_WORKER_SOCKET}")
+            model_client = RemoteModelClient(MODEL_WORKER_SOCKET)
+            await model_client.ping()
+            logger.info("✓ Model worker reachable")
+
+            session = app_state.SessionLocal()
+            try:
+                app_state.search_engine = HybridSearchEngine(
+                    session=session,
+                    embedding_generator=None,
+                    use_reranker=False
+                )
+            finally:
+                session.close()
+            logger.info("✓ Search engine initialized (reranking via model worker)")
+
+            embed_fn = model_client.embed
+            app_state.rerank = model_client.rerank
+            app_state.reranked = True
+        else:
+            # 2. Initialize embedding generator
+            logger.info("Initializing embedding generator...")
+            app_state.embedding_generator = EmbeddingGenerator(model_type="openai")
+            logger.info("✓ Embedding generator initialized")
+
+            # 3. Initialize search engine (this loads the reranker model)
+            logger.info("Initializing search engine with reranker...")
+            logger.info("  (This will take ~7 seconds for model loading...)")
+            session = app_state.SessionLocal()
+            try:
+                app_state.search_engine = HybridSearchEngine(
+                    session=session,
+                    embedding_generator=app_state.embedding_generator,
+                    use_reranker=True,
+                    reranker_model="local"
+                )
+            finally:
+                session.close()
+            logger.info("✓ Search engine initialized")
+
+            # Coalesce concurrent query embeddings / reranks into batched calls
+            app_state.embedding_batcher = BatchingCoalescer(
+                app_state.embedding_generator.generate_embeddings,
+                max_batch=MAX_BATCH,
+                max_wait_ms=MAX_WAIT_MS,
+                name="Embedding batcher"
             )
-        finally:
-            session.close()
-        logger.info("✓ Search engine initialized")
+            app_state.rerank_batcher = BatchingCoalescer(
+                app_state.search_engine.rerank_batch,
+                max_batch=MAX_BATCH,
+                max_wait_ms=MAX_WAIT_MS,
+                name="Rerank batcher"
+            )
+            app_state.embedding_batcher.start()
+            app_state.rerank_batcher.start()
+
+            embed_fn = app_state.embedding_batcher.submit
+            app_state.rerank = app_state.rerank_batcher.submit
+            app_state.reranked = app_state.search_engine.use_reranker
+
+        # Repeat queries reuse their embedding instead of recomputing it
+        app_state.embedding_cache = QueryEmbeddingCache(embed_fn)
 
         # 4. Initialize RAG answer generator
         logger.info("Initializing RAG answer generator...")
-        app_state.rag_generator = RAGAnswerGenerator(
-            model="gpt-4o-mini",
-            temperature=0.7,
-            max_tokens=1000
+        app_state.rag_generator = _get_generator(
+            DEFAULT_LLM_MODEL,
+            DEFAULT_TEMPERATURE,
+            DEFAULT_MAX_TOKENS
+        )
+        app_state.llm_executor = ThreadPoolExecutor(
+            max_workers=LLM_MAX_WORKERS,
+            thread_name_prefix="llm"
         )
-        logger.info("✓ RAG generator initialized")
+        logger.info(f"✓ RAG generator initialized (llm workers: {LLM_MAX_WORKERS})")
 
         app_state.initialized = True
 
@@ -154,26 +302,70 @@ async def startup_event():
         logger.info("=" * 80)
         logger.info("API endpoints available at:")
         logger.info("  - POST /ask       - Ask a question")
+        logger.info("  - POST /ask/stream - Ask a question (streaming)")
         logger.info("  - GET  /health    - Health check")
         logger.info("  - GET  /docs      - API documentation")
         logger.info("=" * 80)
 
     except Exception as e:
         logger.error(f"Failed to initialize server: {e}")
-        import traceback
         traceback.print_exc()
         raise
 
 
-@app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down server...")
+    if app_state.health_task:
+        app_state.health_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await app_state.health_task
+    for batcher in (app_state.embedding_batcher, app_state.rerank_batcher):
+        if batcher:
+            await batcher.stop()
+    if app_state.llm_executor:
+        app_state.llm_executor.shutdown(wait=False)
     if app_state.db_engine:
         app_state.db_engine.dispose()
     logger.info("✓ Server shutdown complete")
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run startup before serving requests and shutdown afterwards"""
+    await startup_event()
+    try:
+        yield
+    finally:
+        await shutdown_event()
+
+
+# ============================================================================
+# FastAPI Application
+# ============================================================================
+
+app = FastAPI(
+    title="UNSW RAG Q&A API",
+    description="RAG-based question answering system for UNSW research",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+
+def get_session():
+    """
+    FastAPI dependency yielding a pooled database session per request.
+
+    The session is returned to the pool when the request finishes.
+    """
+    session = app_state.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
@@ -187,6 +379,7 @@ async def root():
         "status": "running" if app_state.initialized else "initializing",
         "endpoints": {
             "ask": "POST /ask - Ask a question",
+            "ask_stream": "POST /ask/stream - Ask a question (Server-Sent Events)",
             "health": "GET /health - Health check",
             "docs": "GET /docs - API documentation"
         }
@@ -199,16 +392,10 @@ async def health_check():
     Health check endpoint
 
     Returns the status of the server and whether models are loaded.
+    Database status comes from the background refresher, so this endpoint
+    never touches the database itself.
     """
-    database_ok = False
-    if app_state.db_engine:
-        try:
-            # Test database connection
-            with app_state.db_engine.connect() as conn:
-                conn.execute("SELECT 1")
-            database_ok = True
-        except:
-            pass
+    database_ok = app_state.database_ok
 
     return {
         "status": "healthy" if app_state.initialized and database_ok else "unhealthy",
@@ -217,8 +404,76 @@ async def health_check():
     }
 
 
+def _ping_database():
+    """Run a trivial query to verify the database is reachable"""
+    with app_state.db_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def _refresh_health():
+    """Periodically ping the database and cache the result for /health"""
+    while True:
+        try:
+            await run_in_threadpool(_ping_database)
+            database_ok = True
+        except Exception as e:
+            if app_state.database_ok:
+                logger.warning(f"Database health check failed: {e}")
+            database_ok = False
+
+        if database_ok and not app_state.database_ok:
+            logger.info("✓ Database health check OK")
+        app_state.database_ok = database_ok
+
+        await asyncio.sleep(HEALTH_REFRESH_INTERVAL)
+
+
+async def _hybrid_search(query: str, top_k: int, db: Session) -> dict:
+    """
+    Run hybrid search for one request.
+
+    BM25 and vector retrieval run concurrently, each on its own pooled
+    session, so wall-clock is max(BM25, embed + vector) instead of the sum.
+    The query embedding (via the cache) and the reranker pass go through the
+    shared batchers so concurrent requests are served by one batched model call.
+    """
+    search_engine = app_state.search_engine.with_session(db)
+
+    async def vector_leg() -> list:
+        query_embedding = await app_state.embedding_cache.get(query)
+        vector_session = app_state.SessionLocal()
+        try:
+            return await run_in_threadpool(
+                search_engine.with_session(vector_session).retrieve_vector,
+                query,
+                query_embedding=query_embedding
+            )
+        finally:
+            vector_session.close()
+
+    bm25_results, vector_results = await asyncio.gather(
+        run_in_threadpool(search_engine.retrieve_bm25, query),
+        vector_leg()
+    )
+    retrieval = search_engine.fuse_results(bm25_results, vector_results)
+
+    final_results = await app_state.rerank(
+        (query, retrieval["candidates"], top_k)
+    )
+
+    return await run_in_threadpool(
+        search_engine.build_response,
+        query,
+        retrieval,
+        final_results,
+        top_k=top_k,
+        include_scores=True,
+        reranked=app_state.reranked
+    )
+
+
 @app.post("/ask", response_model=QueryResponse, tags=["Q&A"])
-async def ask_question(request: QueryRequest):
+async def ask_question(request: QueryRequest, db: Session = Depends(get_session)):
     """
     Ask a question and get an answer based on UNSW research documents.
 
@@ -229,6 +484,7 @@ async def ask_question(request: QueryRequest):
 
     Args:
         request: QueryRequest with query and optional parameters
+        db: Pooled database session for this request
 
     Returns:
         QueryResponse with answer and sources
@@ -239,67 +495,125 @@ async def ask_question(request: QueryRequest):
     try:
         logger.info(f"Processing query: {request.query}")
 
-        # Create database session for this request
-        db_session = app_state.SessionLocal()
+        # 1. Search for relevant documents
+        logger.info("Searching for relevant documents...")
+        search_response = await _hybrid_search(request.query, request.max_context, db)
 
-        try:
-            # 1. Search for relevant documents
-            logger.info("Searching for relevant documents...")
-            search_response = app_state.search_engine.search(
+        logger.info(f"Found {search_response['total_results']} relevant documents")
+
+        # 2. Generate answer with LLM
+        logger.info("Generating answer with LLM...")
+
+        # Use custom model if specified (cached per model)
+        generator = _get_generator(
+            request.model or DEFAULT_LLM_MODEL,
+            DEFAULT_TEMPERATURE,
+            DEFAULT_MAX_TOKENS
+        )
+
+        # LLM calls get their own bounded pool so slow completions
+        # don't starve the threadpool used for search
+        answer_data = await asyncio.get_running_loop().run_in_executor(
+            app_state.llm_executor,
+            partial(
+                generator.generate_answer,
                 query=request.query,
-                top_k=request.max_context,
-                include_scores=True
+                search_results=search_response['citations'],
+                max_context_chunks=request.max_context
             )
+        )
 
-            logger.info(f"Found {search_response['total_results']} relevant documents")
+        logger.info(f"✓ Answer generated ({answer_data['tokens_used']} tokens)")
 
-            # 2. Generate answer with LLM
-            logger.info("Generating answer with LLM...")
+        # 3. Prepare response
+        response = QueryResponse(
+            query=request.query,
+            answer=answer_data["answer"],
+            sources=answer_data["sources"] if request.include_sources else [],
+            model=answer_data["model"],
+            tokens_used=answer_data["tokens_used"],
+            search_results_count=search_response["total_results"]
+        )
 
-            # Use custom model if specified
-            if request.model:
-                # Create a temporary generator with the specified model
-                temp_generator = RAGAnswerGenerator(
-                    model=request.model,
-                    temperature=0.7,
-                    max_tokens=1000
-                )
-                answer_data = temp_generator.generate_answer(
-                    query=request.query,
-                    search_results=search_response['citations'],
-                    max_context_chunks=request.max_context
-                )
-            else:
-                # Use default generator
-                answer_data = app_state.rag_generator.generate_answer(
-                    query=request.query,
-                    search_results=search_response['citations'],
-                    max_context_chunks=request.max_context
-                )
+        return response
 
-            logger.info(f"✓ Answer generated ({answer_data['tokens_used']} tokens)")
+    except Exception as e:
+        logger.error(f"Error processing query: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
 
-            # 3. Prepare response
-            response = QueryResponse(
-                query=request.query,
-                answer=answer_data["answer"],
-                sources=answer_data["sources"] if request.include_sources else [],
-                model=answer_data["model"],
-                tokens_used=answer_data["tokens_used"],
-                search_results_count=search_response["total_results"]
-            )
 
-            return response
+@app.post("/ask/stream", tags=["Q&A"])
+async def ask_question_stream(
+    request: QueryRequest,
+    http_request: Request,
+    db: Session = Depends(get_session)
+):
+    """
+    Ask a question and stream the answer as Server-Sent Events.
 
-        finally:
-            db_session.close()
+    Search runs before the stream starts; answer tokens are then sent as
+    they are generated, so clients see the first words without waiting for
+    the full completion. Events:
+
+    - data: {"delta": "..."}                           - answer text fragment
+    - data: {"done": true, "sources": [...], ...}      - final event
+    - data: {"error": "..."}                           - generation failed
 
+    Generation stops as soon as the client disconnects.
+    """
+    if not app_state.initialized:
+        raise HTTPException(status_code=503, detail="Server not fully initialized")
+
+    try:
+        logger.info(f"Processing streaming query: {request.query}")
+        search_response = await _hybrid_search(request.query, request.max_context, db)
     except Exception as e:
         logger.error(f"Error processing query: {e}")
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+    generator = _get_generator(
+        request.model or DEFAULT_LLM_MODEL,
+        DEFAULT_TEMPERATURE,
+        DEFAULT_MAX_TOKENS
+    )
+    citations = search_response["citations"]
+
+    async def event_stream():
+        deltas = generator.stream_answer(
+            query=request.query,
+            search_results=citations,
+            max_context_chunks=request.max_context
+        )
+        try:
+            async for delta in iterate_in_threadpool(deltas):
+                if await http_request.is_disconnected():
+                    logger.info("Client disconnected, stopping generation")
+                    return
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+
+            sources = generator.extract_sources(citations, request.max_context)
+            final = {
+                "done": True,
+                "sources": sources if request.include_sources else [],
+                "model": generator.model,
+                "search_results_count": search_response["total_results"]
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            # Closes the upstream OpenAI stream if we stopped early
+            # (ValueError: cancelled while a worker thread is still inside it)
+            try:
+                deltas.close()
+            except ValueError:
+                pass
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 
 # ============================================================================
 # Main - Run Server
@@ -324,15 +638,41 @@ def main():
         action="store_true",
         help="Enable auto-reload for development"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes (default: 1). Each worker loads its own "
+             "models, so memory use grows linearly with this value unless "
+             "MODEL_WORKER_SOCKET points at a shared model_worker.py"
+    )
+    parser.add_argument(
+        "--loop",
+        default="uvloop",
+        choices=["auto", "asyncio", "uvloop"],
+        help="Event loop implementation (default: uvloop)"
+    )
+    parser.add_argument(
+        "--http",
+        default="httptools",
+        choices=["auto", "h11", "httptools"],
+        help="HTTP protocol implementation (default: httptools)"
+    )
 
     args = parser.parse_args()
 
+    if args.reload and args.workers > 1:
+        parser.error("--reload cannot be combined with --workers > 1")
+
     # Run server
     uvicorn.run(
         "api_server:app",
         host=args.host,
         port=args.port,
         reload=args.reload,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
         log_level="info"
     )
 
@@ -1,54 +1,131 @@
 """
 分析 Publication 数据质量
 """
-import json
+import sqlite3
 import sys
 
-def analyze_quality(progress_file):
+import numpy as np
+import orjson
+from sklearn.feature_extraction.text import CountVectorizer
+
+def compute_match_rates(dois, titles, abstracts, sources, threshold=0.2):
+    """
+    计算每篇论文 title 中的长词（>=5 字符）出现在 abstract 中的比例
+
+    用 CountVectorizer 把 title / abstract 转成 0/1 稀疏矩阵（词表只取自 title），
+    逐元素相乘后按行求和就是交集大小，不再逐篇做 Python set 运算。
+
+    Returns:
+        (match_rates, suspicious): 有效论文的匹配率数组，以及低于 threshold 的可疑论文列表
+    """
+    if not titles:
+        return np.array([]), []
+
+    vectorizer = CountVectorizer(binary=True, lowercase=True, token_pattern=r"\b\w{5,}\b")
+    try:
+        title_matrix = vectorizer.fit_transform(titles)
+    except ValueError:
+        # 所有 title 都没有长词（空词表）
+        return np.array([]), []
+    abstract_matrix = vectorizer.transform(abstracts)
+
+    common = np.asarray(title_matrix.multiply(abstract_matrix).sum(axis=1)).ravel()
+    title_word_counts = np.asarray(title_matrix.sum(axis=1)).ravel()
+
+    valid = title_word_counts > 0
+    match_rates = common[valid] / title_word_counts[valid]
+
+    suspicious = [
+        {
+            'doi': dois[idx],
+            'title': titles[idx][:60],
+            'source': sources[idx],
+            'match_rate': rate
+        }
+        for idx, rate in zip(np.flatnonzero(valid), match_rates)
+        if rate < threshold  # 可疑的低匹配率
+    ]
+
+    return match_rates, suspicious
+
+
+def analyze_quality(cache_file):
     """分析数据质量"""
 
     print("="*80)
     print("Publication 数据质量分析")
     print("="*80)
 
-    with open(progress_file, 'r') as f:
-        data = json.load(f)
-
-    publications = data.get('publication_cache', {})
-    total = len(publications)
-
+    # 逐行遍历 DOI 缓存数据库，一次遍历提取所有列（不需要整个缓存载入内存），
+    # 后面的统计全部用 NumPy 向量化计算
+    dois = []
+    titles = []
+    abstract_lengths = []      # 去空白后的长度（统计用）
+    raw_abstract_lengths = []  # 原始长度（RAG 就绪度用）
+    years = []
+    citations = []
+    open_access = []
+    has_concepts = []
+    sources = {}
+    # 参与匹配度计算的论文（title 长度 > 10 且有 abstract）
+    match_dois = []
+    match_titles = []
+    match_abstracts = []
+    match_sources = []
+
+    conn = sqlite3.connect(cache_file)
+    try:
+        for doi, data in conn.execute("SELECT doi, data FROM publications"):
+            pub = orjson.loads(data)
+            title = pub.get('title', '')
+            raw_abstract = pub.get('abstract', '')
+            source = pub.get('abstract_source', 'unknown')
+
+            dois.append(doi)
+            titles.append(title)
+            abstract_lengths.append(len(raw_abstract.strip()))
+            raw_abstract_lengths.append(len(raw_abstract))
+            years.append(pub.get('publication_year') or 0)
+            citations.append(pub.get('citations_count') or 0)
+            open_access.append(bool(pub.get('is_open_access')))
+            has_concepts.append(bool(pub.get('concepts')))
+            sources[source] = sources.get(source, 0) + 1
+
+            if title and raw_abstract and len(title) > 10:
+                match_dois.append(doi)
+                match_titles.append(title)
+                match_abstracts.append(raw_abstract)
+                match_sources.append(source)
+    finally:
+        conn.close()
+
+    total = len(dois)
     print(f"\n总出版物: {total}")
 
+    abstract_lengths = np.array(abstract_lengths, dtype=np.int64)
+    raw_abstract_lengths = np.array(raw_abstract_lengths, dtype=np.int64)
+    years = np.array(years, dtype=np.int32)
+    citations = np.array(citations, dtype=np.int64)
+    open_access = np.array(open_access, dtype=bool)
+    has_concepts = np.array(has_concepts, dtype=bool)
+
     # 1. Abstract 覆盖率
     print(f"\n{'='*80}")
     print("1. Abstract 覆盖率")
     print('='*80)
 
-    has_abstract = 0
-    no_abstract = 0
-    abstract_lengths = []
-    sources = {}
-
-    for doi, pub in publications.items():
-        abstract = pub.get('abstract', '').strip()
-        source = pub.get('abstract_source', 'unknown')
-
-        sources[source] = sources.get(source, 0) + 1
-
-        if abstract:
-            has_abstract += 1
-            abstract_lengths.append(len(abstract))
-        else:
-            no_abstract += 1
+    has_abstract_mask = abstract_lengths > 0
+    has_abstract = int(has_abstract_mask.sum())
+    no_abstract = total - has_abstract
 
     print(f"有 abstract: {has_abstract} ({has_abstract/total*100:.1f}%)")
     print(f"缺失 abstract: {no_abstract} ({no_abstract/total*100:.1f}%)")
 
-    if abstract_lengths:
-        avg_length = sum(abstract_lengths) / len(abstract_lengths)
-        print(f"\nAbstract 平均长度: {avg_length:.0f} 字符")
-        print(f"最短: {min(abstract_lengths)} 字符")
-        print(f"最长: {max(abstract_lengths)} 字符")
+    if has_abstract:
+        lengths = abstract_lengths[has_abstract_mask]
+        print(f"\nAbstract 平均长度: {lengths.mean():.0f} 字符")
+        print(f"最短: {lengths.min()} 字符")
+        print(f"最长: {lengths.max()} 字符")
 
     # 2. 来源分布
     print(f"\n{'='*80}")
@@ -63,33 +140,12 @@ def analyze_quality(progress_file):
     print("3. Title-Abstract 匹配度分析")
     print('='*80)
 
-    match_rates = []
-    suspicious = []
-
-    for doi, pub in publications.items():
-        title = pub.get('title', '').lower()
-        abstract = pub.get('abstract', '').lower()
-
-        if title and abstract and len(title) > 10:
-            title_words = set([w for w in title.split() if len(w) > 4])
-            abstract_words = set(abstract.split())
-            common = title_words & abstract_words
-
-            if title_words:
-                match_rate = len(common) / len(title_words)
-                match_rates.append(match_rate)
-
-                if match_rate < 0.2:  # 可疑的低匹配率
-                    suspicious.append({
-                        'doi': doi,
-                        'title': pub.get('title', '')[:60],
-                        'source': pub.get('abstract_source', 'unknown'),
-                        'match_rate': match_rate
-                    })
-
-    if match_rates:
-        avg_match = sum(match_rates) / len(match_rates)
-        print(f"平均匹配率: {avg_match*100:.1f}%")
+    match_rates, suspicious = compute_match_rates(
+        match_dois, match_titles, match_abstracts, match_sources
+    )
+
+    if match_rates.size:
+        print(f"平均匹配率: {match_rates.mean()*100:.1f}%")
         print(f"检查的论文数: {len(match_rates)}")
 
     if suspicious:
@@ -108,16 +164,9 @@ def analyze_quality(progress_file):
     print("4. 出版年份分布")
     print('='*80)
 
-    years = {}
-    for doi, pub in publications.items():
-        year = pub.get('publication_year')
-        if year:
-            years[year] = years.get(year, 0) + 1
-
-    recent_years = sorted([y for y in years.keys() if y >= 2020], reverse=True)
+    year_values, year_counts = np.unique(years[years >= 2020], return_counts=True)
     print("最近年份分布:")
-    for year in recent_years[:5]:
-        count = years[year]
+    for year, count in list(zip(year_values, year_counts))[::-1][:5]:
         print(f"  {year}: {count:4d} ({count/total*100:5.1f}%)")
 
     # 5. 引用统计
@@ -125,32 +174,27 @@ def analyze_quality(progress_file):
     print("5. 引用统计")
     print('='*80)
 
-    citations = [pub.get('citations_count', 0) for pub in publications.values() if pub.get('citations_count')]
+    cited = citations[citations > 0]
 
-    if citations:
-        print(f"总引用数: {sum(citations)}")
-        print(f"平均引用: {sum(citations)/len(citations):.1f}")
-        print(f"中位数: {sorted(citations)[len(citations)//2]}")
-        print(f"最高引用: {max(citations)}")
+    if cited.size:
+        print(f"总引用数: {cited.sum()}")
+        print(f"平均引用: {cited.mean():.1f}")
+        print(f"中位数: {np.sort(cited)[cited.size//2]}")
+        print(f"最高引用: {cited.max()}")
 
-        # Top 5 高引论文
-        top_cited = sorted(
-            [(doi, pub.get('title', 'N/A')[:60], pub.get('citations_count', 0))
-             for doi, pub in publications.items()],
-            key=lambda x: x[2],
-            reverse=True
-        )[:5]
+        # Top 5 高引论文（stable 排序，同引用数保持原顺序）
+        top_idx = np.argsort(-citations, kind='stable')[:5]
 
         print(f"\nTop 5 高引论文:")
-        for i, (doi, title, count) in enumerate(top_cited, 1):
-            print(f"{i}. ({count} 次引用) {title}...")
+        for i, idx in enumerate(top_idx, 1):
+            print(f"{i}. ({citations[idx]} 次引用) {(titles[idx] or 'N/A')[:60]}...")
 
     # 6. 开放获取统计
     print(f"\n{'='*80}")
     print("6. 开放获取统计")
     print('='*80)
 
-    oa_count = sum(1 for pub in publications.values() if pub.get('is_open_access'))
+    oa_count = int(open_access.sum())
     print(f"开放获取论文: {oa_count} ({oa_count/total*100:.1f}%)")
 
     # 7. RAG 就绪度评估
@@ -159,15 +203,13 @@ def analyze_quality(progress_file):
     print('='*80)
 
     # 好的 abstract (长度 > 100 字符)
-    good_abstracts = sum(1 for pub in publications.values()
-                        if pub.get('abstract') and len(pub.get('abstract', '')) > 100)
+    good_abstracts = int((raw_abstract_lengths > 100).sum())
 
     # 有 title 的
-    has_title = sum(1 for pub in publications.values() if pub.get('title'))
+    has_title = sum(1 for title in titles if title)
 
     # 有 keywords/concepts 的
-    has_keywords = sum(1 for pub in publications.values()
-                      if pub.get('concepts') and len(pub.get('concepts', [])) > 0)
+    has_keywords = int(has_concepts.sum())
 
     rag_ready_score = (
         (good_abstracts / total * 0.6) +  # abstract 占 60%
@@ -192,9 +234,9 @@ def analyze_quality(progress_file):
 if __name__ == "__main__":
     # 默认使用清理后的文件
     if len(sys.argv) > 1:
-        progress_file = sys.argv[1]
+        cache_file = sys.argv[1]
     else:
-        progress_file = "/Users/z5241339/Documents/unsw_ai_rag/parsing_progress_multisource_cleaned.json"
+        cache_file = "/Users/z5241339/Documents/unsw_ai_rag/publication_cache_multisource_cleaned.sqlite"
 
-    print(f"分析文件: {progress_file}\n")
-    analyze_quality(progress_file)
+    print(f"分析文件: {cache_file}\n")
+    analyze_quality(cache_file)
@@ -1,27 +1,30 @@
-import requests
-from bs4 import BeautifulSoup
+import httpx
+from selectolax.lexbor import LexborHTMLParser
 
 url = "https://www.unsw.edu.au/staff/mr-ademir-abdala-prata-junior"
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 }
 
-response = requests.get(url, headers=headers, timeout=30)
-soup = BeautifulSoup(response.content, 'html.parser')
+# httpx.Client 复用 TCP/TLS 连接，支持 HTTP/2
+with httpx.Client(http2=True, headers=headers, follow_redirects=True) as client:
+    response = client.get(url, timeout=30)
+
+# selectolax 的 lexbor C 解析器比 bs4 的 html.parser 快得多
+tree = LexborHTMLParser(response.content)
 
 # 保存HTML到文件以便分析
 with open('page_source.html', 'w', encoding='utf-8') as f:
-    f.write(soup.prettify())
+    f.write(tree.html)
 
 print("HTML已保存到 page_source.html")
 
 # 查找所有有class属性的div
 print("\n所有带class的div:")
 print("="*60)
-divs_with_class = soup.find_all('div', class_=True)
 unique_classes = set()
-for div in divs_with_class:
-    classes = div.get('class', [])
+for div in tree.css('div[class]'):
+    classes = (div.attributes.get('class') or '').split()
     for cls in classes:
         unique_classes.add(cls)
 
@@ -31,17 +34,17 @@ for cls in sorted(unique_classes)[:50]:  # 只显示前50个
 # 查找所有section
 print("\n所有section标签:")
 print("="*60)
-sections = soup.find_all('section')
+sections = tree.css('section')
 for section in sections[:10]:
-    section_id = section.get('id', 'no-id')
-    section_class = section.get('class', ['no-class'])
+    section_id = section.attributes.get('id') or 'no-id'
+    section_class = (section.attributes.get('class') or 'no-class').split()
     print(f"  ID: {section_id}, Class: {section_class}")
     # 显示section的前100个字符
-    text = section.get_text(strip=True)[:100]
+    text = section.text(strip=True)[:100]
     print(f"    Text: {text}...\n")
 
-# 查找所有h2, h3 标题
+# 查找所有标题 (h2, h3)
 print("\n所有标题 (h2, h3):")
 print("="*60)
-for heading in soup.find_all(['h2', 'h3'])[:20]:
-    print(f"  {heading.name}: {heading.get_text(strip=True)}")
+for heading in tree.css('h2, h3')[:20]:
+    print(f"  {heading.tag}: {heading.text(strip=True)}")
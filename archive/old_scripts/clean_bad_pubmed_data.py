@@ -1,14 +1,24 @@
 """
 清理旧数据中错误的 PubMed abstract
 """
-import json
-import shutil
+import sqlite3
 from datetime import datetime
 
-# 文件路径
-OLD_PROGRESS_FILE = "/Users/z5241339/Documents/unsw_ai_rag/parsing_progress_multisource.json"
-BACKUP_FILE = f"/Users/z5241339/Documents/unsw_ai_rag/parsing_progress_multisource_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-CLEANED_FILE = "/Users/z5241339/Documents/unsw_ai_rag/parsing_progress_multisource_cleaned.json"
+import orjson
+
+# 文件路径(parse_publications_multisource.py 的 DOI 缓存数据库)
+CACHE_FILE = "/Users/z5241339/Documents/unsw_ai_rag/publication_cache_multisource.sqlite"
+BACKUP_FILE = f"/Users/z5241339/Documents/unsw_ai_rag/publication_cache_multisource_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.sqlite"
+CLEANED_FILE = "/Users/z5241339/Documents/unsw_ai_rag/publication_cache_multisource_cleaned.sqlite"
+
+def copy_database(src_path, dst_path):
+    """用 SQLite 备份接口复制数据库(包含 WAL 里还没合并的写入)"""
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    with dst:
+        src.backup(dst)
+    src.close()
+    dst.close()
 
 def clean_pubmed_data():
     """清理错误的 PubMed abstract"""
@@ -19,15 +29,18 @@ def clean_pubmed_data():
 
     # 1. 备份原文件
     print(f"\n1. 备份原文件...")
-    shutil.copy(OLD_PROGRESS_FILE, BACKUP_FILE)
+    copy_database(CACHE_FILE, BACKUP_FILE)
     print(f"   ✓ 备份到: {BACKUP_FILE}")
 
     # 2. 读取数据
     print(f"\n2. 读取数据...")
-    with open(OLD_PROGRESS_FILE, 'r') as f:
-        data = json.load(f)
+    conn = sqlite3.connect(CACHE_FILE)
+    publications = {
+        doi: orjson.loads(data)
+        for doi, data in conn.execute("SELECT doi, data FROM publications")
+    }
+    conn.close()
 
-    publications = data.get('publication_cache', {})
     total = len(publications)
     print(f"   总出版物: {total}")
 
@@ -42,21 +55,28 @@ def clean_pubmed_data():
 
     # 4. 清理 PubMed abstract
     print(f"\n4. 清理 PubMed abstract...")
-    cleaned_count = 0
+    cleaned = {}
     for doi in pubmed_entries:
         pub = publications[doi]
         # 保留其他数据，只删除 abstract 和修改 source
         if pub.get('abstract'):
             pub['abstract'] = ""
             pub['abstract_source'] = 'none'
-            cleaned_count += 1
+            cleaned[doi] = pub
+    cleaned_count = len(cleaned)
 
     print(f"   ✓ 清理了 {cleaned_count} 个错误的 abstract")
 
     # 5. 保存清理后的数据
     print(f"\n5. 保存清理后的数据...")
-    with open(CLEANED_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    copy_database(CACHE_FILE, CLEANED_FILE)
+    conn = sqlite3.connect(CLEANED_FILE)
+    with conn:
+        conn.executemany(
+            "UPDATE publications SET data = ? WHERE doi = ?",
+            [(orjson.dumps(pub), doi) for doi, pub in cleaned.items()]
+        )
+    conn.close()
     print(f"   ✓ 保存到: {CLEANED_FILE}")
 
     # 6. 统计清理后的状态
@@ -89,8 +109,8 @@ def clean_pubmed_data():
     print("="*80)
     print(f"\n下一步:")
     print(f"1. 检查清理后的文件: {CLEANED_FILE}")
-    print(f"2. 如果确认无误，可以替换原文件:")
-    print(f"   mv {CLEANED_FILE} {OLD_PROGRESS_FILE}")
+    print(f"2. 如果确认无误，停止解析脚本后替换原文件:")
+    print(f"   rm -f {CACHE_FILE}-wal {CACHE_FILE}-shm && mv {CLEANED_FILE} {CACHE_FILE}")
     print(f"3. 或者直接使用新的 V2 脚本重新获取数据")
 
 if __name__ == "__main__":
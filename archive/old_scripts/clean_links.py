@@ -1,6 +1,110 @@
-import json
 import re
-
+import argparse
+import logging
+from functools import lru_cache
+
+import ahocorasick
+import ijson
+import orjson
+from tqdm import tqdm
+
+logger = logging.getLogger(__name__)
+
+# 输出文件写缓冲大小，记录攒够后批量落盘
+WRITE_BUFFER_SIZE = 1 << 20
+
+# 移除的链接文本模式
+REMOVE_TEXTS = [
+    'Arts, Design & Architecture',
+    'Business School',
+    'Engineering',
+    'Law & Justice',
+    'Medicine & Health',
+    'Science',
+    'Overview',
+    'Areas to support',
+    'Ways to give',
+    'Impact stories',
+    'Alumni essentials',
+    'Professional hub',
+    'Get involved',
+    'Update your details',
+    'Our strategy',
+    'Human resources',
+    'Back to',
+    'The Uluru Statement',
+    'UNSW',
+    'Home',
+    'Staff',
+    'Study',
+    'Research',
+    'Engage',
+    'About',
+    'Giving',
+    'Alumni'
+]
+
+# 移除的URL片段（都是字面子串，用 Aho-Corasick 匹配）
+REMOVE_URL_LITERALS = [
+    *[f'unsw.edu.au/{section}' for section in (
+        'arts-design-architecture', 'business', 'engineering', 'law-justice', 'medicine-health', 'science',
+        'giving', 'alumni', 'strategy', 'human-resources',
+        'study', 'research', 'engage', 'about',
+    )],
+    'ulurustatement.org',
+    'facebook.com',
+    'twitter.com',
+    'linkedin.com',
+    'instagram.com',
+]
+
+# 保留的URL片段
+KEEP_URL_LITERALS = [
+    'doi.org',  # DOI链接 (也覆盖 dx.doi.org)
+    'github.com',  # GitHub
+    'gitlab.com',  # GitLab
+    'scholar.google',  # Google Scholar
+    'researchgate.net',  # ResearchGate
+    'orcid.org',  # ORCID
+    'arxiv.org',  # arXiv
+    '.gov',  # 政府网站
+]
+
+# 需要前瞻断言的保留模式，仍用正则
+KEEP_URL_PATTERNS = [
+    r'\.edu(?!/)',  # 教育机构(但不是unsw.edu.au的内部页面)
+    r'\.org(?!$)',  # 组织网站(但不是简单的.org)
+]
+
+
+def _compile_alternation(patterns):
+    """把多个模式合并成一个交替正则，一次扫描即可判断是否命中任意一个"""
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+
+def _build_automaton(words):
+    """用所有字面片段（小写）构建 Aho-Corasick 自动机"""
+    automaton = ahocorasick.Automaton()
+    for word in words:
+        automaton.add_word(word.lower(), word)
+    automaton.make_automaton()
+    return automaton
+
+
+def _matches_any(automaton, text):
+    """text 中是否出现自动机里的任一片段"""
+    return next(automaton.iter(text), None) is not None
+
+
+# 模块加载时构建一次
+REMOVE_TEXT_AC = _build_automaton(REMOVE_TEXTS)
+REMOVE_URL_AC = _build_automaton(REMOVE_URL_LITERALS)
+KEEP_URL_AC = _build_automaton(KEEP_URL_LITERALS)
+KEEP_URL_RE = _compile_alternation(KEEP_URL_PATTERNS)
+
+
+# 页眉/页脚等通用链接在大量 profile 中重复出现，相同 (text, url) 直接命中缓存
+@lru_cache(maxsize=100_000)
 def should_keep_link(link_text: str, link_url: str) -> bool:
     """
     判断链接是否应该保留
@@ -12,81 +116,29 @@ def should_keep_link(link_text: str, link_url: str) -> bool:
     Returns:
         True表示保留,False表示删除
     """
+    # 每个链接只做一次大小写转换和去空白
+    text_lower = link_text.lower()
+    text_stripped = link_text.strip()
+    url_lower = link_url.lower()
+
+    # 以下三个移除条件顺序无关，按开销从小到大排列：
+    # 锚点链接 "#" → 文本移除短语 → 移除的URL片段
+    if url_lower == '#':
+        return False
+
+    # 检查文本是否包含任一移除短语（Aho-Corasick 一次线性扫描）
+    if _matches_any(REMOVE_TEXT_AC, text_lower):
+        return False
 
-    # 移除的链接文本模式
-    remove_texts = [
-        'Arts, Design & Architecture',
-        'Business School',
-        'Engineering',
-        'Law & Justice',
-        'Medicine & Health',
-        'Science',
-        'Overview',
-        'Areas to support',
-        'Ways to give',
-        'Impact stories',
-        'Alumni essentials',
-        'Professional hub',
-        'Get involved',
-        'Update your details',
-        'Our strategy',
-        'Human resources',
-        'Back to',
-        'The Uluru Statement',
-        'UNSW',
-        'Home',
-        'Staff',
-        'Study',
-        'Research',
-        'Engage',
-        'About',
-        'Giving',
-        'Alumni'
-    ]
-
-    # 检查文本是否在移除列表中
-    for remove_text in remove_texts:
-        if remove_text.lower() in link_text.lower():
-            return False
-
-    # 移除的URL模式
-    remove_url_patterns = [
-        r'unsw\.edu\.au/(arts-design-architecture|business|engineering|law-justice|medicine-health|science)',
-        r'unsw\.edu\.au/(giving|alumni|strategy|human-resources)',
-        r'unsw\.edu\.au/(study|research|engage|about)',
-        r'ulurustatement\.org',
-        r'^#$',
-        r'facebook\.com',
-        r'twitter\.com',
-        r'linkedin\.com',
-        r'instagram\.com',
-    ]
-
-    for pattern in remove_url_patterns:
-        if re.search(pattern, link_url.lower()):
-            return False
-
-    # 保留的URL模式
-    keep_url_patterns = [
-        r'doi\.org',  # DOI链接
-        r'dx\.doi\.org',  # DOI链接
-        r'github\.com',  # GitHub
-        r'gitlab\.com',  # GitLab
-        r'scholar\.google',  # Google Scholar
-        r'researchgate\.net',  # ResearchGate
-        r'orcid\.org',  # ORCID
-        r'arxiv\.org',  # arXiv
-        r'\.edu(?!/)',  # 教育机构(但不是unsw.edu.au的内部页面)
-        r'\.gov',  # 政府网站
-        r'\.org(?!$)',  # 组织网站(但不是简单的.org)
-    ]
-
-    for pattern in keep_url_patterns:
-        if re.search(pattern, link_url.lower()):
-            return True
+    if _matches_any(REMOVE_URL_AC, url_lower):
+        return False
+
+    # 保留的URL（必须在短文本检查之前：DOI/ORCID 链接的文本经常很短）
+    if _matches_any(KEEP_URL_AC, url_lower) or KEEP_URL_RE.search(url_lower):
+        return True
 
     # 如果链接文本很短(少于5个字符),可能是无意义的
-    if len(link_text.strip()) < 5:
+    if len(text_stripped) < 5:
         return False
 
     # 默认:如果是外部链接且文本合理,保留
@@ -97,68 +149,74 @@ def should_keep_link(link_text: str, link_url: str) -> bool:
     return False
 
 
-def clean_staff_data(input_file: str, output_file: str):
+def clean_staff_data(input_file: str, output_file: str, pretty: bool = False):
     """
     清理教职员工数据中的无关链接
 
     Args:
         input_file: 输入的JSON文件
         output_file: 输出的清理后JSON文件
+        pretty: 是否缩进输出（默认紧凑格式，每条记录一行）
     """
     print("=" * 70)
     print("清理教职员工数据中的无关链接")
     print("=" * 70)
 
-    # 读取数据
+    # 流式读取：逐条解析、清理并写出，内存占用与文件大小无关
     print(f"\n读取文件: {input_file}")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    print(f"清理后的数据写入: {output_file}")
+
+    dump_option = orjson.OPT_INDENT_2 if pretty else 0
 
-    total_staff = len(data)
+    total_staff = 0
     total_links_before = 0
     total_links_after = 0
 
-    # 清理每个教职员工的链接
-    for i, staff in enumerate(data, 1):
-        profile_details = staff.get('profile_details', {})
-        links = profile_details.get('related_links', [])
+    with open(input_file, 'rb') as infile, open(output_file, 'wb', buffering=WRITE_BUFFER_SIZE) as outfile:
+        outfile.write(b'[')
+
+        # 清理每个教职员工的链接
+        staff_iter = tqdm(ijson.items(infile, 'item', use_float=True), desc="清理链接", unit="人")
+        for i, staff in enumerate(staff_iter, 1):
+            total_staff = i
+            profile_details = staff.get('profile_details', {})
+            links = profile_details.get('related_links', [])
 
-        if not links:
-            continue
+            if links:
+                links_before = len(links)
+                total_links_before += links_before
 
-        links_before = len(links)
-        total_links_before += links_before
+                # 过滤链接
+                cleaned_links = []
+                for link in links:
+                    text = link.get('text', '')
+                    url = link.get('url', '')
 
-        # 过滤链接
-        cleaned_links = []
-        for link in links:
-            text = link.get('text', '')
-            url = link.get('url', '')
+                    if should_keep_link(text, url):
+                        cleaned_links.append(link)
 
-            if should_keep_link(text, url):
-                cleaned_links.append(link)
+                # 更新链接
+                if cleaned_links:
+                    profile_details['related_links'] = cleaned_links
+                else:
+                    # 如果没有有效链接,移除整个字段
+                    if 'related_links' in profile_details:
+                        del profile_details['related_links']
 
-        # 更新链接
-        if cleaned_links:
-            profile_details['related_links'] = cleaned_links
-        else:
-            # 如果没有有效链接,移除整个字段
-            if 'related_links' in profile_details:
-                del profile_details['related_links']
+                links_after = len(cleaned_links)
+                total_links_after += links_after
 
-        links_after = len(cleaned_links)
-        total_links_after += links_after
+                # 逐条移除记录写日志，不刷屏
+                removed = links_before - links_after
+                if removed > 0:
+                    logger.info(f"[{i}] {staff.get('full_name', 'Unknown')}: "
+                                f"{links_before} → {links_after} (移除{removed}个)")
 
-        if (i % 100 == 0) or (links_before != links_after):
-            removed = links_before - links_after
-            if removed > 0:
-                print(f"[{i}/{total_staff}] {staff.get('full_name', 'Unknown')}: "
-                      f"{links_before} → {links_after} (移除{removed}个)")
+            # 写出这一条记录
+            outfile.write(b',\n' if i > 1 else b'\n')
+            outfile.write(orjson.dumps(staff, option=dump_option))
 
-    # 保存清理后的数据
-    print(f"\n保存清理后的数据到: {output_file}")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        outfile.write(b'\n]\n')
 
     # 统计
     print("\n" + "=" * 70)
@@ -173,7 +231,19 @@ def clean_staff_data(input_file: str, output_file: str):
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="清理教职员工数据中的无关链接")
+    parser.add_argument('--pretty', action='store_true', help="缩进输出，便于人工查看")
+    parser.add_argument('--log-file', default='clean_links.log', help="逐条移除记录的日志文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        filename=args.log_file,
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
     clean_staff_data(
         input_file='engineering_staff_with_profiles.json',
-        output_file='engineering_staff_with_profiles_cleaned.json'
+        output_file='engineering_staff_with_profiles_cleaned.json',
+        pretty=args.pretty
     )
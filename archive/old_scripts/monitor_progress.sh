@@ -4,26 +4,32 @@
 python3 << 'EOF'
 import json
 import os
+import sqlite3
 from datetime import datetime
 
-progress_file = "/Users/z5241339/Documents/unsw_ai_rag/parsing_progress_multisource.json"
+# parse_publications_multisource.py 的已处理日志(每行一个staff email)和 DOI 缓存数据库
+processed_log = "/Users/z5241339/Documents/unsw_ai_rag/processed_staff_multisource.log"
+cache_file = "/Users/z5241339/Documents/unsw_ai_rag/publication_cache_multisource.sqlite"
 
-if not os.path.exists(progress_file):
+if not os.path.exists(processed_log) or not os.path.exists(cache_file):
     print("⏳ 解析还未开始或进度文件未创建")
     exit()
 
-with open(progress_file) as f:
-    progress = json.load(f)
+with open(processed_log, encoding='utf-8') as f:
+    processed = len({line.strip() for line in f if line.strip()})
 
-processed = len(progress['processed_staff_emails'])
-cache_size = len(progress['publication_cache'])
+# 只读打开,不影响正在写入的解析脚本(WAL 模式下读写互不阻塞)
+conn = sqlite3.connect(f"file:{cache_file}?mode=ro", uri=True)
+publications = [json.loads(row[0]) for row in conn.execute("SELECT data FROM publications")]
+conn.close()
+cache_size = len(publications)
 
 # 统计
 sources = {}
 with_abstract = 0
 total_citations = 0
 
-for doi, data in progress['publication_cache'].items():
+for data in publications:
     if 'error' in data:
         continue
     source = data.get('abstract_source', 'unknown')
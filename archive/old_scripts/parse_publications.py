@@ -2,14 +2,37 @@
 解析UNSW工程学院staff数据,提取publications并从OpenAlex获取详细信息
 生成适合RAG的分块文档
 """
-import json
 import re
-import requests
-from time import sleep
+import time
+import sqlite3
+import asyncio
+import orjson
+import httpx
 from typing import List, Dict, Optional
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
 from datetime import datetime
 from tqdm import tqdm
-import hashlib
+from tqdm.asyncio import tqdm_asyncio
+import xxhash
+
+# OpenAlex 并发请求数(同时也是每秒请求上限)
+OPENALEX_CONCURRENCY = 10
+# 每个 filter=doi:... 请求包含的 DOI 数
+OPENALEX_FILTER_BATCH = 50
+# OpenAlex 结果本地缓存(SQLite,按 DOI 存解析后的字段)
+OPENALEX_CACHE_FILE = "openalex_cache.sqlite"
+OPENALEX_CACHE_TTL = 30 * 86400  # 30 天
+
+# 模块加载时预编译
+DOI_RE = re.compile(r'http://dx\.doi\.org/([^\s]+)')
+TITLE_RE = re.compile(r"'([^']+)'")
+
+@lru_cache(maxsize=None)
+def get_header_re(pub_type: str) -> re.Pattern:
+    """每种 publication 类型的 "类型 | 年份" 分割正则(只编译一次)"""
+    return re.compile(rf'{re.escape(pub_type)} \| (\d{{4}})')
 
 def parse_publication_text(pub_text: str, pub_type: str) -> List[Dict]:
     """
@@ -21,8 +44,7 @@ def parse_publication_text(pub_text: str, pub_type: str) -> List[Dict]:
     publications = []
 
     # 按照 "类型 | 年份" 分割
-    pattern = rf'{re.escape(pub_type)} \| (\d{{4}})'
-    entries = re.split(pattern, pub_text)
+    entries = get_header_re(pub_type).split(pub_text)
 
     # entries格式: ['', '2025', '内容1', '2025', '内容2', ...]
     for i in range(1, len(entries), 2):
@@ -30,15 +52,16 @@ def parse_publication_text(pub_text: str, pub_type: str) -> List[Dict]:
         content = entries[i + 1].strip()
 
         # 提取DOI
-        doi_match = re.search(r'http://dx\.doi\.org/([^\s]+)', content)
+        doi_match = DOI_RE.search(content)
         doi = doi_match.group(1) if doi_match else None
 
         # 提取标题 (在单引号之间)
-        title_match = re.search(r"'([^']+)'", content)
+        title_match = TITLE_RE.search(content)
         title = title_match.group(1) if title_match else None
 
         # 提取作者 (逗号之前的部分)
-        authors_text = content.split(',')[0].strip() if ',' in content else ""
+        authors_text, comma, _ = content.partition(',')
+        authors_text = authors_text.strip() if comma else ""
 
         if title or doi:  # 至少要有title或DOI
             publications.append({
@@ -57,72 +80,214 @@ def invert_abstract_index(inverted_index: Dict) -> str:
     if not inverted_index:
         return ""
 
-    words = {}
+    # 位置基本是连续的 0..N-1,直接预分配列表按下标填充,不需要 dict + 排序
+    length = 1 + max((max(positions) for positions in inverted_index.values() if positions), default=-1)
+    words = [None] * length
     for word, positions in inverted_index.items():
         for pos in positions:
             words[pos] = word
 
-    return " ".join([words[i] for i in sorted(words.keys())])
+    # 跳过缺失的位置
+    return " ".join([word for word in words if word is not None])
+
+def parse_openalex_work(data: Dict) -> Dict:
+    """从OpenAlex work对象中提取RAG需要的字段"""
+    # 提取关键信息
+    abstract = invert_abstract_index(data.get("abstract_inverted_index"))
+
+    return {
+        "title": data.get("title"),
+        "abstract": abstract,
+        "publication_year": data.get("publication_year"),
+        "authors": [
+            {
+                "name": a.get("author", {}).get("display_name"),
+                "orcid": a.get("author", {}).get("orcid"),
+            }
+            for a in data.get("authorships", [])
+        ],
+        # primary_location / source 可能是 null
+        "venue": ((data.get("primary_location") or {}).get("source") or {}).get("display_name"),
+        "citations_count": data.get("cited_by_count", 0),
+        "is_open_access": data.get("open_access", {}).get("is_oa", False),
+        "pdf_url": data.get("open_access", {}).get("oa_url"),
+        "concepts": [
+            {
+                "name": c.get("display_name"),
+                "score": c.get("score", 0),
+                "level": c.get("level", 0)
+            }
+            for c in data.get("concepts", [])[:15]
+        ],
+        "referenced_works_count": len(data.get("referenced_works", [])),
+        "type": data.get("type"),
+        "language": data.get("language"),
+    }
 
-def fetch_openalex_batch(dois: List[str], email: str = "research@unsw.edu.au") -> Dict[str, Dict]:
+def normalize_doi(doi: Optional[str]) -> str:
+    """DOI统一为小写、去掉 https://doi.org/ 前缀,用于匹配OpenAlex返回结果"""
+    doi = (doi or "").strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "http://dx.doi.org/"):
+        if doi.startswith(prefix):
+            return doi[len(prefix):]
+    return doi
+
+async def openalex_get(client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                       url: str, params: Optional[Dict] = None) -> httpx.Response:
     """
-    批量从OpenAlex获取论文信息
-    OpenAlex支持批量查询,更高效
+    限速的OpenAlex GET请求
+
+    每个并发槽位至少占用 1 秒,总速率不超过 OPENALEX_CONCURRENCY 次/秒
+    (OpenAlex polite pool 限制 10 次/秒)
     """
-    results = {}
+    async with semaphore:
+        started = time.monotonic()
+        try:
+            return await client.get(url, params=params)
+        finally:
+            await asyncio.sleep(max(0.0, 1.0 - (time.monotonic() - started)))
+
+async def fetch_openalex_one(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, doi: str) -> Dict[str, Dict]:
+    """单篇查询(用于无法放进 filter 的 DOI)"""
+    try:
+        response = await openalex_get(client, semaphore, f"https://api.openalex.org/works/https://doi.org/{doi}")
+        if response.status_code == 200:
+            result = parse_openalex_work(response.json())
+        elif response.status_code == 404:
+            result = {"error": "not_found"}
+        else:
+            result = {"error": f"status_{response.status_code}"}
+
+    except Exception as e:
+        result = {"error": str(e)}
+
+    return {doi: result}
+
+async def fetch_openalex_chunk(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, dois: List[str]) -> Dict[str, Dict]:
+    """用 filter=doi:<d1>|<d2>|... 一次请求获取最多 OPENALEX_FILTER_BATCH 篇论文"""
+    try:
+        response = await openalex_get(
+            client, semaphore, "https://api.openalex.org/works",
+            params={"filter": "doi:" + "|".join(dois), "per-page": OPENALEX_FILTER_BATCH}
+        )
+        if response.status_code != 200:
+            return {doi: {"error": f"status_{response.status_code}"} for doi in dois}
+
+        works = {
+            normalize_doi(work.get("doi")): work
+            for work in response.json().get("results", [])
+        }
 
-    # OpenAlex单次API调用
+    except Exception as e:
+        return {doi: {"error": str(e)} for doi in dois}
+
+    results = {}
     for doi in dois:
-        if not doi:
+        work = works.get(normalize_doi(doi))
+        if not work:
+            results[doi] = {"error": "not_found"}
             continue
-
-        url = f"https://api.openalex.org/works/https://doi.org/{doi}"
-        headers = {"User-Agent": f"mailto:{email}"}
-
+        # 单篇解析失败只记这一篇的错误,不影响同批其他论文
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-
-                # 提取关键信息
-                abstract = invert_abstract_index(data.get("abstract_inverted_index"))
-
-                results[doi] = {
-                    "title": data.get("title"),
-                    "abstract": abstract,
-                    "publication_year": data.get("publication_year"),
-                    "authors": [
-                        {
-                            "name": a.get("author", {}).get("display_name"),
-                            "orcid": a.get("author", {}).get("orcid"),
-                        }
-                        for a in data.get("authorships", [])
-                    ],
-                    "venue": data.get("primary_location", {}).get("source", {}).get("display_name"),
-                    "citations_count": data.get("cited_by_count", 0),
-                    "is_open_access": data.get("open_access", {}).get("is_oa", False),
-                    "pdf_url": data.get("open_access", {}).get("oa_url"),
-                    "concepts": [
-                        {
-                            "name": c.get("display_name"),
-                            "score": c.get("score", 0),
-                            "level": c.get("level", 0)
-                        }
-                        for c in data.get("concepts", [])[:15]
-                    ],
-                    "referenced_works_count": len(data.get("referenced_works", [])),
-                    "type": data.get("type"),
-                    "language": data.get("language"),
-                }
-            elif response.status_code == 404:
-                results[doi] = {"error": "not_found"}
-            else:
-                results[doi] = {"error": f"status_{response.status_code}"}
-
+            results[doi] = parse_openalex_work(work)
         except Exception as e:
             results[doi] = {"error": str(e)}
+    return results
+
+async def fetch_openalex_batch_async(dois: List[str], email: str = "research@unsw.edu.au") -> Dict[str, Dict]:
+    """
+    并发获取多篇论文信息
+
+    DOI 每 OPENALEX_FILTER_BATCH 个合并成一次请求,最多 OPENALEX_CONCURRENCY 个请求同时进行。
+    含 "," 或 "|" 的 DOI 会破坏 filter 语法,单独查询。
+    """
+    dois = [doi for doi in dois if doi]
+    batchable = [doi for doi in dois if "," not in doi and "|" not in doi]
+    singles = [doi for doi in dois if "," in doi or "|" in doi]
+
+    semaphore = asyncio.Semaphore(OPENALEX_CONCURRENCY)
+    headers = {"User-Agent": f"mailto:{email}"}
+
+    # 整个批次共用一个客户端: 连接池大小与并发数一致,HTTP/2 在同一 TLS 连接上复用请求
+    limits = httpx.Limits(
+        max_connections=OPENALEX_CONCURRENCY,
+        max_keepalive_connections=OPENALEX_CONCURRENCY
+    )
+    async with httpx.AsyncClient(headers=headers, params={"mailto": email}, timeout=30,
+                                 limits=limits, http2=True) as client:
+        tasks = [
+            fetch_openalex_chunk(client, semaphore, batchable[i:i + OPENALEX_FILTER_BATCH])
+            for i in range(0, len(batchable), OPENALEX_FILTER_BATCH)
+        ]
+        tasks += [fetch_openalex_one(client, semaphore, doi) for doi in singles]
+
+        chunk_results = await tqdm_asyncio.gather(*tasks, disable=len(tasks) <= 1)
+
+    results = {}
+    for chunk_result in chunk_results:
+        results.update(chunk_result)
+    return results
+
+def load_cached_works(conn: sqlite3.Connection, dois: List[str]) -> Dict[str, Dict]:
+    """从本地缓存读取未过期的论文信息"""
+    cached = {}
+    keys = {normalize_doi(doi): doi for doi in dois}
+    key_list = list(keys)
+    min_fetched_at = time.time() - OPENALEX_CACHE_TTL
+
+    # 分批查询,避免超过 SQLite 参数个数上限
+    for i in range(0, len(key_list), 500):
+        batch = key_list[i:i + 500]
+        rows = conn.execute(
+            f"SELECT doi, data FROM works WHERE fetched_at >= ? AND doi IN ({','.join('?' * len(batch))})",
+            [min_fetched_at, *batch]
+        )
+        for key, data in rows:
+            cached[keys[key]] = orjson.loads(data)
+
+    return cached
+
+def save_cached_works(conn: sqlite3.Connection, results: Dict[str, Dict]):
+    """把成功获取的论文信息写入本地缓存(错误结果不缓存,下次重试)"""
+    now = time.time()
+    conn.executemany(
+        "INSERT OR REPLACE INTO works (doi, data, fetched_at) VALUES (?, ?, ?)",
+        [
+            (normalize_doi(doi), orjson.dumps(result), now)
+            for doi, result in results.items()
+            if 'error' not in result
+        ]
+    )
+    conn.commit()
+
+def fetch_openalex_batch(dois: List[str], email: str = "research@unsw.edu.au",
+                         cache_file: Optional[str] = OPENALEX_CACHE_FILE) -> Dict[str, Dict]:
+    """
+    批量从OpenAlex获取论文信息
+    每个请求查询 OPENALEX_FILTER_BATCH 篇,请求之间并发进行
 
-        sleep(0.1)  # 礼貌性延迟,避免rate limit
+    已解析的字段按 DOI 缓存在本地 SQLite(cache_file=None 时不使用缓存),
+    重复运行时未变化的 DOI 不再请求网络
+    """
+    if not cache_file:
+        return asyncio.run(fetch_openalex_batch_async(dois, email))
+
+    conn = sqlite3.connect(cache_file)
+    try:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS works (doi TEXT PRIMARY KEY, data BLOB NOT NULL, fetched_at REAL NOT NULL)"
+        )
+
+        results = load_cached_works(conn, [doi for doi in dois if doi])
+        missing = [doi for doi in dois if doi and doi not in results]
+        print(f"  OpenAlex cache: {len(results)} hit, {len(missing)} to fetch")
+
+        if missing:
+            fetched = asyncio.run(fetch_openalex_batch_async(missing, email))
+            save_cached_works(conn, fetched)
+            results.update(fetched)
+    finally:
+        conn.close()
 
     return results
 
@@ -162,47 +327,32 @@ def create_rag_chunks(staff_entry: Dict, publication_data: Dict) -> List[Dict]:
 
         oa_data = pub.get('openalex_data', {})
 
-        # 构建论文内容
-        content_parts = []
-
-        # 标题和基本信息
         title = oa_data.get('title') or pub.get('title', 'Unknown Title')
-        content_parts.append(f"Title: {title}")
-
-        # 作者
         authors = oa_data.get('authors', [])
-        if authors:
-            author_names = [a['name'] for a in authors if a.get('name')]
-            content_parts.append(f"Authors: {', '.join(author_names)}")
-
-        # 发表信息
         year = oa_data.get('publication_year') or pub.get('year')
         venue = oa_data.get('venue')
-        if venue:
-            content_parts.append(f"Published in: {venue} ({year})")
-        else:
-            content_parts.append(f"Publication Year: {year}")
+        abstract = oa_data.get('abstract', '')  # 最重要的内容
+        concepts = oa_data.get('concepts', [])
 
-        # Abstract (最重要的内容)
-        abstract = oa_data.get('abstract', '')
-        if abstract:
-            content_parts.append(f"\nAbstract:\n{abstract}")
+        # 只保留高分的concepts
+        high_score_concepts = [c['name'] for c in concepts if c.get('score', 0) > 0.3]
 
-        # Keywords/Concepts
-        concepts = oa_data.get('concepts', [])
-        if concepts:
-            # 只保留高分的concepts
-            high_score_concepts = [c['name'] for c in concepts if c.get('score', 0) > 0.3]
-            if high_score_concepts:
-                content_parts.append(f"\nKeywords: {', '.join(high_score_concepts)}")
+        # 构建论文内容: 可选部分为 None,一次 join 生成
+        content = "\n".join(part for part in (
+            f"Title: {title}",
+            f"Authors: {', '.join(a['name'] for a in authors if a.get('name'))}" if authors else None,
+            f"Published in: {venue} ({year})" if venue else f"Publication Year: {year}",
+            f"\nAbstract:\n{abstract}" if abstract else None,
+            f"\nKeywords: {', '.join(high_score_concepts)}" if high_score_concepts else None,
+        ) if part)
 
         # 生成唯一ID
-        pub_id = pub.get('doi') or hashlib.md5(title.encode()).hexdigest()
+        pub_id = pub.get('doi') or xxhash.xxh64_hexdigest(title.encode())  # 非加密哈希,只用作ID
 
         pub_chunk = {
             "chunk_id": f"pub_{pub_id}",
             "chunk_type": "publication",
-            "content": "\n".join(content_parts),
+            "content": content,
             "metadata": {
                 "person_name": staff_entry['full_name'],
                 "person_email": staff_entry['email'],
@@ -225,6 +375,10 @@ def create_rag_chunks(staff_entry: Dict, publication_data: Dict) -> List[Dict]:
 
     return chunks
 
+def create_rag_chunks_for_item(item: Dict) -> List[Dict]:
+    """进程池入口: 解包 {'staff': ..., 'publications': ...}"""
+    return create_rag_chunks(item['staff'], item['publications'])
+
 def main():
     """主处理流程"""
     print("="*80)
@@ -233,8 +387,8 @@ def main():
 
     # 1. 读取原始数据
     print("\n[1/5] Loading data...")
-    with open('/Users/z5241339/Documents/unsw_ai_rag/engineering_staff_with_profiles_cleaned.json', 'r') as f:
-        staff_data = json.load(f)
+    with open('/Users/z5241339/Documents/unsw_ai_rag/engineering_staff_with_profiles_cleaned.json', 'rb') as f:
+        staff_data = orjson.loads(f.read())
     print(f"✓ Loaded {len(staff_data)} staff members")
 
     # 2. 解析所有publications
@@ -254,7 +408,7 @@ def main():
             for pub in parsed:
                 pub['person_email'] = staff['email']
                 pub['person_name'] = staff['full_name']
-                staff_pubs.extend(parsed)
+            staff_pubs.extend(parsed)
 
         if staff_pubs:
             staff_with_pubs.append({
@@ -267,20 +421,15 @@ def main():
 
     # 3. 收集所有DOI
     print("\n[3/5] Collecting DOIs...")
-    dois = [pub['doi'] for pub in all_publications if pub.get('doi')]
-    print(f"✓ Found {len(dois)} publications with DOI")
+    # 合著论文会在多个staff下重复出现,去重后每个DOI只请求一次(保持原顺序)
+    dois = list(dict.fromkeys(pub['doi'] for pub in all_publications if pub.get('doi')))
+    print(f"✓ Found {len(dois)} unique DOIs")
 
     # 4. 从OpenAlex获取详细信息
     print("\n[4/5] Fetching publication details from OpenAlex...")
-    print("(This may take a while... ~10 papers/second)")
+    print(f"({OPENALEX_FILTER_BATCH} DOIs per request, up to {OPENALEX_CONCURRENCY} concurrent requests)")
 
-    openalex_data = {}
-    batch_size = 1  # 逐个处理,可以看到进度
-
-    for i in tqdm(range(0, len(dois), batch_size)):
-        batch = dois[i:i+batch_size]
-        batch_results = fetch_openalex_batch(batch)
-        openalex_data.update(batch_results)
+    openalex_data = fetch_openalex_batch(dois)
 
     # 统计
     success = sum(1 for v in openalex_data.values() if 'error' not in v)
@@ -289,46 +438,47 @@ def main():
     print(f"✓ Successfully fetched {success}/{len(dois)} publications")
     print(f"✓ {with_abstract} publications have abstracts")
 
-    # 5. 生成RAG chunks
-    print("\n[5/5] Creating RAG chunks...")
-    all_chunks = []
-
-    for item in tqdm(staff_with_pubs):
-        staff = item['staff']
-        pubs = item['publications']
+    # 5. 生成RAG chunks,边生成边写入 NDJSON(每行一个chunk),不在内存中累积
+    output_file = '/Users/z5241339/Documents/unsw_ai_rag/rag_chunks.jsonl'
+    print(f"\n[5/5] Creating RAG chunks -> {output_file}...")
 
-        # 添加OpenAlex数据到publications
-        for pub in pubs:
+    # 添加OpenAlex数据到publications
+    for item in staff_with_pubs:
+        for pub in item['publications']:
             if pub.get('doi'):
                 pub['openalex_data'] = openalex_data.get(pub['doi'], {})
 
-        chunks = create_rag_chunks(staff, pubs)
-        all_chunks.extend(chunks)
+    stats = Counter()
 
-    print(f"✓ Created {len(all_chunks)} chunks")
+    # 每个staff的chunks互不依赖,多进程并行生成(chunksize 分摊序列化开销)
+    with ProcessPoolExecutor() as executor, open(output_file, 'wb') as f:
+        results = executor.map(create_rag_chunks_for_item, staff_with_pubs, chunksize=32)
+        for chunks in tqdm(results, total=len(staff_with_pubs)):
+            for chunk in chunks:
+                f.write(orjson.dumps(chunk))
+                f.write(b"\n")
 
-    # 6. 保存结果
-    output_file = '/Users/z5241339/Documents/unsw_ai_rag/rag_chunks.json'
-    print(f"\n[6/6] Saving to {output_file}...")
+                stats[chunk['chunk_type']] += 1
+                if chunk['chunk_type'] == 'publication':
+                    metadata = chunk['metadata']
+                    stats['with_abstract'] += bool(metadata['has_abstract'])
+                    stats['open_access'] += bool(metadata['is_open_access'])
+                    stats['with_pdf'] += bool(metadata['pdf_url'])
 
-    with open(output_file, 'w') as f:
-        json.dump(all_chunks, f, indent=2, ensure_ascii=False)
-
-    print(f"✓ Saved {len(all_chunks)} chunks")
+    total_chunks = stats['person_profile'] + stats['publication']
+    print(f"✓ Created and saved {total_chunks} chunks")
 
     # 统计信息
     print("\n" + "="*80)
     print("STATISTICS")
     print("="*80)
-    person_chunks = [c for c in all_chunks if c['chunk_type'] == 'person_profile']
-    pub_chunks = [c for c in all_chunks if c['chunk_type'] == 'publication']
-    pubs_with_abstract = [c for c in pub_chunks if c['metadata']['has_abstract']]
-
-    print(f"Person profile chunks: {len(person_chunks)}")
-    print(f"Publication chunks: {len(pub_chunks)}")
-    print(f"  - With abstract: {len(pubs_with_abstract)} ({len(pubs_with_abstract)/len(pub_chunks)*100:.1f}%)")
-    print(f"  - Open Access: {sum(1 for c in pub_chunks if c['metadata']['is_open_access'])}")
-    print(f"  - With PDF URL: {sum(1 for c in pub_chunks if c['metadata']['pdf_url'])}")
+    pub_count = stats['publication']
+
+    print(f"Person profile chunks: {stats['person_profile']}")
+    print(f"Publication chunks: {pub_count}")
+    print(f"  - With abstract: {stats['with_abstract']} ({stats['with_abstract']/pub_count*100:.1f}%)")
+    print(f"  - Open Access: {stats['open_access']}")
+    print(f"  - With PDF URL: {stats['with_pdf']}")
 
     print("\n✓ Done!")
 
@@ -2,16 +2,23 @@
 完整版 - 解析UNSW工程学院staff数据,提取publications并从OpenAlex获取详细信息
 特性:
 - 错误重试机制
+- OpenAlex并发请求(限速 10 次/秒)
 - 进度保存和恢复
 - 详细的统计信息
 - 按sections分块(title, abstract, keywords分开)
-- 支持中断后继续
+- 支持中断后继续(chunks边处理边追加到JSONL)
 """
-import json
 import re
-import requests
-from time import sleep
-from typing import List, Dict, Optional
+import sys
+import orjson
+import ijson
+import time
+import asyncio
+import httpx
+from typing import List, Dict, Optional, Iterator, Tuple
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import hashlib
 import os
 from datetime import datetime
@@ -20,15 +27,281 @@ from pathlib import Path
 # 配置
 CONFIG = {
     "input_file": "/Users/z5241339/Documents/unsw_ai_rag/engineering_staff_with_profiles_cleaned.json",
-    "output_file": "/Users/z5241339/Documents/unsw_ai_rag/rag_chunks_full.json",
+    "output_file": "/Users/z5241339/Documents/unsw_ai_rag/rag_chunks_full.jsonl",  # 每行一个chunk,边处理边追加
     "progress_file": "/Users/z5241339/Documents/unsw_ai_rag/parsing_progress.json",
+    "cache_file": "/Users/z5241339/Documents/unsw_ai_rag/openalex_cache.jsonl",  # DOI -> OpenAlex data,只追加
     "stats_file": "/Users/z5241339/Documents/unsw_ai_rag/parsing_statistics.json",
     "max_retries": 3,
     "retry_delay": 1.0,
-    "api_delay": 0.15,  # OpenAlex推荐 100ms, 我们用150ms更保险
+    "max_concurrency": 10,  # OpenAlex polite pool 限制 10 次/秒
+    "refresh_after_days": None,  # 设置后重新获取缓存超过N天的论文(有ETag的用条件请求,未变化时返回304)
     "email": "research@unsw.edu.au",
 }
 
+# OpenAlex filter 单次请求的 DOI 数
+OPENALEX_BATCH_SIZE = 50
+# 需要等待后重试的HTTP状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 每组staff的DOI一起并发获取,每组完成后保存一次进度
+STAFF_GROUP_SIZE = 10
+
+# publication文本解析用的正则(模块加载时编译一次)
+DOI_RE = re.compile(r'http://dx\.doi\.org/([^\s,]+)')
+TITLE_RE = re.compile(r"'([^']+)'")
+
+@lru_cache(maxsize=64)
+def get_header_re(pub_type: str) -> re.Pattern:
+    """每种 publication 类型的 "类型 | 年份" 分割正则(只编译一次)"""
+    return re.compile(rf'{re.escape(pub_type)} \| (\d{{4}})')
+
+@lru_cache(maxsize=100_000)
+def title_id(title: str) -> str:
+    """没有DOI的论文用标题哈希作为ID(同一篇论文在多个合作者下只算一次)"""
+    return hashlib.blake2b(title.encode("utf-8"), digest_size=8).hexdigest()
+
+def normalize_doi(doi: Optional[str]) -> str:
+    """DOI统一为小写、去掉 https://doi.org/ 前缀,用于匹配OpenAlex返回结果"""
+    doi = (doi or "").strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "http://dx.doi.org/"):
+        if doi.startswith(prefix):
+            return doi[len(prefix):]
+    return doi
+
+def parse_publication_text(pub_text: str, pub_type: str) -> List[Dict]:
+    """解析publication文本字符串,提取individual publications"""
+    publications = []
+    entries = get_header_re(pub_type).split(pub_text)
+
+    # 循环内用到的方法先绑定到局部变量,省去每次的属性查找
+    search_doi = DOI_RE.search
+    search_title = TITLE_RE.search
+    append = publications.append
+
+    # entries格式: ['', '2025', '内容1', '2025', '内容2', ...],最后一个年份后没有内容时跳过
+    for i in range(1, len(entries) - 1, 2):
+        year = entries[i]
+        content = entries[i + 1].strip()
+
+        # 提取DOI
+        doi_match = search_doi(content)
+        doi = doi_match.group(1) if doi_match else None
+
+        # 提取标题 (在单引号之间)
+        title_match = search_title(content)
+        title = title_match.group(1) if title_match else None
+
+        # 提取作者
+        authors_text, comma, _ = content.partition(',')
+        authors_text = authors_text.strip() if comma else ""
+
+        if title or doi:
+            append({
+                'year': int(year) if year.isdigit() else year,
+                'title': title,
+                'doi': doi,
+                'authors_text': authors_text,
+                'raw_text': content,
+                'pub_type': pub_type
+            })
+
+    return publications
+
+def create_rag_chunks(staff_entry: Dict, publication_data: List[Dict]) -> List[Dict]:
+    """
+    为每个研究人员创建多个RAG chunks
+    策略: 每篇论文分成多个chunks以提高检索精度
+    """
+    chunks = []
+
+    # Chunk Type 1: 人员基本信息
+    person_basic_chunk = {
+        "chunk_id": f"person_basic_{staff_entry['email']}",
+        "chunk_type": "person_basic",
+        "content": f"{staff_entry['full_name']}\n"
+                   f"Position: {staff_entry['role']}\n"
+                   f"School: {staff_entry['school']}\n"
+                   f"Faculty: {staff_entry['faculty']}\n"
+                   f"Email: {staff_entry['email']}",
+        "metadata": {
+            "person_name": staff_entry['full_name'],
+            "person_email": staff_entry['email'],
+            "role": staff_entry['role'],
+            "school": staff_entry['school'],
+            "faculty": staff_entry['faculty'],
+            "profile_url": staff_entry['profile_url'],
+        }
+    }
+    chunks.append(person_basic_chunk)
+
+    # Chunk Type 2: 人员研究介绍
+    if staff_entry.get('biography'):
+        person_bio_chunk = {
+            "chunk_id": f"person_bio_{staff_entry['email']}",
+            "chunk_type": "person_biography",
+            "content": f"{staff_entry['full_name']} - Biography and Research Interests\n\n"
+                       f"{staff_entry['biography']}\n\n"
+                       f"Research Areas: {staff_entry.get('research_text', '')}",
+            "metadata": {
+                "person_name": staff_entry['full_name'],
+                "person_email": staff_entry['email'],
+                "school": staff_entry['school'],
+                "faculty": staff_entry['faculty'],
+                "profile_url": staff_entry['profile_url'],
+            }
+        }
+        chunks.append(person_bio_chunk)
+
+    # 同一个staff所有论文chunks共享的人员metadata,只构建一次
+    staff_meta = {
+        "person_name": staff_entry['full_name'],
+        "person_email": staff_entry['email'],
+        "person_profile_url": staff_entry['profile_url'],
+        "person_school": staff_entry['school'],
+        "person_faculty": staff_entry['faculty'],
+    }
+
+    # Chunk Type 3-N: 论文chunks (每篇论文可能产生多个chunks)
+    for pub in publication_data:
+        oa_data = pub.get('openalex_data', {})
+
+        if 'error' in oa_data:
+            # 即使没有OpenAlex数据,也创建基本chunk
+            if pub.get('title'):
+                basic_pub_chunk = _create_basic_publication_chunk(staff_entry, pub)
+                if basic_pub_chunk:
+                    chunks.append(basic_pub_chunk)
+            continue
+
+        # 为有OpenAlex数据的论文创建详细chunks
+        pub_chunks = _create_detailed_publication_chunks(staff_meta, pub, oa_data)
+        chunks.extend(pub_chunks)
+
+    return chunks
+
+def _create_basic_publication_chunk(staff: Dict, pub: Dict) -> Optional[Dict]:
+    """为没有OpenAlex数据的论文创建基本chunk"""
+    title = pub.get('title')
+    if not title:
+        return None
+
+    pub_id = pub.get('doi') or title_id(title)
+
+    return {
+        "chunk_id": f"pub_basic_{pub_id}",
+        "chunk_type": "publication_basic",
+        "content": f"Title: {title}\n"
+                   f"Author: {staff['full_name']}\n"
+                   f"Year: {pub.get('year')}\n"
+                   f"Type: {pub.get('pub_type')}",
+        "metadata": {
+            "person_name": staff['full_name'],
+            "person_email": staff['email'],
+            "person_profile_url": staff['profile_url'],
+            "person_school": staff['school'],
+            "pub_title": title,
+            "pub_year": pub.get('year'),
+            "pub_type": pub.get('pub_type'),
+            "pub_doi": pub.get('doi'),
+            "has_abstract": False,
+        }
+    }
+
+def _create_detailed_publication_chunks(staff_meta: Dict, pub: Dict, oa_data: Dict) -> List[Dict]:
+    """为有完整OpenAlex数据的论文创建多个细粒度chunks(staff_meta 见 create_rag_chunks)"""
+    chunks = []
+
+    title = oa_data.get('title') or pub.get('title', 'Unknown Title')
+    pub_id = pub.get('doi') or title_id(title)
+    year = oa_data.get('publication_year') or pub.get('year')
+    venue = oa_data.get('venue')
+    abstract = oa_data.get('abstract', '')
+    concept_names = oa_data.get('concept_names', [])
+    concept_scores = oa_data.get('concept_scores', [])
+    citations = oa_data.get('citations_count', 0)
+    pub_type = pub.get('pub_type')
+    person_name = staff_meta['person_name']
+
+    # 共享的metadata
+    base_metadata = {
+        **staff_meta,
+        "pub_title": title,
+        "pub_year": year,
+        "pub_type": pub_type,
+        "pub_doi": pub.get('doi'),
+        "pub_venue": venue,
+        "citations_count": citations,
+        "is_open_access": oa_data.get('is_open_access', False),
+        "pdf_url": oa_data.get('pdf_url'),
+    }
+
+    # Chunk 3a: 论文标题和元数据 (用于精确匹配论文查询)
+    authors = oa_data.get('authors', [])
+    author_names = [a['name'] for a in authors if a.get('name')]
+
+    # content 用相邻 f-string 拼接: 编译期合并成一个 f-string,一次性构建整个字符串
+    # (比 "\n".join([...]) 少一个列表分配,不要改成 + 或 join)
+    title_chunk = {
+        "chunk_id": f"pub_title_{pub_id}",
+        "chunk_type": "publication_title",
+        "content": f"Title: {title}\n"
+                   f"Authors: {', '.join(author_names[:10])}\n"  # 限制作者数量
+                   f"Published in: {venue} ({year})\n"
+                   f"Type: {pub_type}\n"
+                   f"Citations: {citations}",
+        "metadata": {**base_metadata, "has_abstract": bool(abstract)}
+    }
+    chunks.append(title_chunk)
+
+    # Chunk 3b: 论文摘要 (如果有) - 这是最重要的内容chunk
+    if abstract:
+        abstract_chunk = {
+            "chunk_id": f"pub_abstract_{pub_id}",
+            "chunk_type": "publication_abstract",
+            "content": f"Paper: {title}\n"
+                       f"Author: {person_name} ({staff_meta['person_school']})\n"
+                       f"Year: {year}\n\n"
+                       f"Abstract:\n{abstract}",
+            "metadata": {**base_metadata, "has_abstract": True}
+        }
+        chunks.append(abstract_chunk)
+
+    # Chunk 3c: 论文关键词/概念 (用于主题检索)
+    if concept_names:
+        high_score_concepts = [n for n, s in zip(concept_names, concept_scores) if s > 0.3]
+        if high_score_concepts:
+            keywords_chunk = {
+                "chunk_id": f"pub_keywords_{pub_id}",
+                "chunk_type": "publication_keywords",
+                "content": f"Paper: {title}\n"
+                           f"Author: {person_name}\n"
+                           f"Keywords: {', '.join(high_score_concepts)}\n"
+                           f"Research Topics: {', '.join(high_score_concepts[:5])}",
+                "metadata": {
+                    **base_metadata,
+                    "keywords": high_score_concepts,
+                    "has_abstract": bool(abstract)
+                }
+            }
+            chunks.append(keywords_chunk)
+
+    return chunks
+
+def parse_staff_record(staff: Dict) -> Tuple[List[Dict], List[str]]:
+    """进程池任务: 解析一个staff的所有publications,返回 (publications, 解析错误)"""
+    staff_pubs = []
+    errors = []
+    for pub_type, pub_text in staff['profile_details']['publications'].items():
+        try:
+            staff_pubs.extend(parse_publication_text(pub_text, pub_type))
+        except Exception as e:
+            errors.append(f"Parse error in {pub_type}: {str(e)}")
+    return staff_pubs, errors
+
+def build_staff_chunks(staff: Dict, staff_pubs: List[Dict]) -> Tuple[bytes, int]:
+    """进程池任务: 创建一个staff的chunks并序列化为JSONL,返回 (JSONL字节, chunk数)"""
+    chunks = create_rag_chunks(staff, staff_pubs)
+    return b"".join(orjson.dumps(chunk) + b"\n" for chunk in chunks), len(chunks)
+
 class PublicationParser:
     def __init__(self):
         self.stats = {
@@ -40,6 +313,7 @@ class PublicationParser:
             "openalex_success": 0,
             "openalex_not_found": 0,
             "openalex_errors": 0,
+            "openalex_not_modified": 0,
             "publications_with_abstract": 0,
             "publications_open_access": 0,
             "total_citations": 0,
@@ -47,67 +321,122 @@ class PublicationParser:
             "errors": []
         }
         self.progress = self.load_progress()
+        # 已处理的staff email(集合查找,保存时写回排序后的列表)
+        self.processed = set(self.progress["processed_staff_emails"])
+        # 作者名/venue/concept等重复出现的短字符串共用一个对象(见 intern)
+        self.interner: Dict[str, str] = {}
+        # DOI -> OpenAlex结果, DOI -> {"etag": ..., "fetched_at": ...}
+        self.cache, self.cache_info = self.load_cache()
+        # 运行期间打开的缓存日志文件(见 process_pending)
+        self.cache_log = None
+        # 在事件循环中创建(见 process_pending)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        # 被限速时所有请求暂停到这个时间点(time.monotonic)
+        self.paused_until = 0.0
+
+    def create_client(self) -> httpx.AsyncClient:
+        """创建共享的异步HTTP客户端(连接池大小与并发数一致,HTTP/2 在同一连接上复用请求)"""
+        limits = httpx.Limits(
+            max_connections=CONFIG["max_concurrency"],
+            max_keepalive_connections=CONFIG["max_concurrency"]
+        )
+        return httpx.AsyncClient(
+            headers={"User-Agent": f"mailto:{CONFIG['email']}"},
+            params={"mailto": CONFIG["email"]},
+            timeout=30,
+            limits=limits,
+            http2=True
+        )
 
     def load_progress(self) -> Dict:
         """加载之前的进度"""
         if os.path.exists(CONFIG["progress_file"]):
-            with open(CONFIG["progress_file"], 'r') as f:
-                return json.load(f)
+            with open(CONFIG["progress_file"], 'rb') as f:
+                return orjson.loads(f.read())
         return {
-            "processed_staff_emails": [],
-            "openalex_cache": {}  # DOI -> OpenAlex data cache
+            "processed_staff_emails": []
         }
 
+    def load_cache(self) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+        """
+        加载OpenAlex缓存日志(每行 {"doi", "result", "etag", "fetched_at"},同一DOI以最后一行为准)
+
+        旧版进度文件里的 openalex_cache 会合并进来;日志中有重复/损坏的行时压缩重写一次
+        """
+        cache = {}
+        cache_info = {}
+        lines = 0
+        if os.path.exists(CONFIG["cache_file"]):
+            with open(CONFIG["cache_file"], 'rb') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        entry = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        continue  # 中断时写了一半的行
+                    cache[entry["doi"]] = self.intern_result(entry["result"])
+                    cache_info[entry["doi"]] = {
+                        "etag": entry.get("etag"),
+                        "fetched_at": entry.get("fetched_at", 0),
+                    }
+
+        legacy = self.progress.pop("openalex_cache", None) or {}
+        for doi, result in legacy.items():
+            if doi not in cache:
+                cache[doi] = self.intern_result(result)
+                cache_info[doi] = {"etag": None, "fetched_at": 0}
+
+        if legacy or lines != len(cache):
+            self.compact_cache(cache, cache_info)
+        return cache, cache_info
+
+    @staticmethod
+    def cache_line(doi: str, result: Dict, info: Dict) -> bytes:
+        """缓存日志中的一行"""
+        return orjson.dumps({"doi": doi, "result": result, **info}) + b"\n"
+
+    def compact_cache(self, cache: Dict[str, Dict], cache_info: Dict[str, Dict]):
+        """把缓存完整重写为每个DOI一行(先写临时文件再原子替换)"""
+        tmp_file = CONFIG["cache_file"] + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(b"".join(
+                self.cache_line(doi, result, cache_info[doi])
+                for doi, result in cache.items()
+            ))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, CONFIG["cache_file"])
+
+    def cache_result(self, doi: str, result: Dict, etag: Optional[str] = None):
+        """写入内存缓存并追加到缓存日志"""
+        self.cache[doi] = result
+        self.cache_info[doi] = {"etag": etag, "fetched_at": time.time()}
+        self.cache_log.write(self.cache_line(doi, result, self.cache_info[doi]))
+
+    def is_stale(self, doi: str) -> bool:
+        """缓存是否超过 refresh_after_days(未设置时缓存永不过期)"""
+        if CONFIG["refresh_after_days"] is None:
+            return False
+        age = time.time() - self.cache_info[doi]["fetched_at"]
+        return age > CONFIG["refresh_after_days"] * 86400
+
     def save_progress(self):
-        """保存当前进度"""
-        with open(CONFIG["progress_file"], 'w') as f:
-            json.dump(self.progress, f, indent=2)
+        """保存当前进度(紧凑编码,先写临时文件再原子替换,中断时不会留下半个文件)"""
+        self.progress["processed_staff_emails"] = sorted(self.processed)
+        tmp_file = CONFIG["progress_file"] + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(self.progress))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, CONFIG["progress_file"])
 
     def save_stats(self):
         """保存统计信息"""
         self.stats["end_time"] = datetime.now().isoformat()
-        with open(CONFIG["stats_file"], 'w') as f:
-            json.dump(self.stats, f, indent=2, ensure_ascii=False)
-
-    def parse_publication_text(self, pub_text: str, pub_type: str) -> List[Dict]:
-        """解析publication文本字符串,提取individual publications"""
-        publications = []
-        pattern = rf'{re.escape(pub_type)} \| (\d{{4}})'
-
-        try:
-            entries = re.split(pattern, pub_text)
-
-            for i in range(1, len(entries), 2):
-                if i + 1 >= len(entries):
-                    break
-
-                year = entries[i]
-                content = entries[i + 1].strip()
-
-                # 提取DOI
-                doi_match = re.search(r'http://dx\.doi\.org/([^\s,]+)', content)
-                doi = doi_match.group(1) if doi_match else None
-
-                # 提取标题 (在单引号之间)
-                title_match = re.search(r"'([^']+)'", content)
-                title = title_match.group(1) if title_match else None
-
-                # 提取作者
-                authors_text = content.split(',')[0].strip() if ',' in content else ""
-
-                if title or doi:
-                    publications.append({
-                        'year': int(year) if year.isdigit() else year,
-                        'title': title,
-                        'doi': doi,
-                        'authors_text': authors_text,
-                        'raw_text': content,
-                        'pub_type': pub_type
-                    })
-        except Exception as e:
-            self.stats["errors"].append(f"Parse error in {pub_type}: {str(e)}")
-
-        return publications
+        with open(CONFIG["stats_file"], 'wb') as f:
+            f.write(orjson.dumps(self.stats, option=orjson.OPT_INDENT_2))
 
     def invert_abstract_index(self, inverted_index: Dict) -> str:
         """将OpenAlex的倒排索引转换为正常文本"""
@@ -115,311 +444,347 @@ class PublicationParser:
             return ""
 
         try:
-            words = {}
+            # 位置基本是连续的 0..N-1,直接预分配列表按下标填充,不需要 dict + 排序
+            length = 1 + max((max(positions) for positions in inverted_index.values() if positions), default=-1)
+            words = [None] * length
             for word, positions in inverted_index.items():
                 for pos in positions:
                     words[pos] = word
-            return " ".join([words[i] for i in sorted(words.keys())])
+
+            # 跳过缺失的位置
+            return " ".join([word for word in words if word is not None])
         except Exception as e:
             self.stats["errors"].append(f"Abstract inversion error: {str(e)}")
             return ""
 
-    def fetch_openalex(self, doi: str) -> Dict:
-        """从OpenAlex获取单篇论文信息,带重试机制"""
-        if not doi:
-            return {"error": "no_doi"}
-
-        # 检查缓存
-        if doi in self.progress["openalex_cache"]:
-            return self.progress["openalex_cache"][doi]
-
-        url = f"https://api.openalex.org/works/https://doi.org/{doi}"
-        headers = {"User-Agent": f"mailto:{CONFIG['email']}"}
-
-        for attempt in range(CONFIG["max_retries"]):
-            try:
-                response = requests.get(url, headers=headers, timeout=15)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    abstract = self.invert_abstract_index(data.get("abstract_inverted_index"))
-
-                    result = {
-                        "title": data.get("title"),
-                        "abstract": abstract,
-                        "publication_year": data.get("publication_year"),
-                        "authors": [
-                            {
-                                "name": a.get("author", {}).get("display_name"),
-                                "orcid": a.get("author", {}).get("orcid"),
-                            }
-                            for a in data.get("authorships", [])
-                        ],
-                        "venue": data.get("primary_location", {}).get("source", {}).get("display_name"),
-                        "citations_count": data.get("cited_by_count", 0),
-                        "is_open_access": data.get("open_access", {}).get("is_oa", False),
-                        "pdf_url": data.get("open_access", {}).get("oa_url"),
-                        "concepts": [
-                            {
-                                "name": c.get("display_name"),
-                                "score": c.get("score", 0),
-                                "level": c.get("level", 0)
-                            }
-                            for c in data.get("concepts", [])[:20]
-                        ],
-                        "type": data.get("type"),
-                    }
-
-                    # 缓存结果
-                    self.progress["openalex_cache"][doi] = result
-                    self.stats["openalex_success"] += 1
+    def intern(self, s: Optional[str]) -> Optional[str]:
+        """返回字符串的共享实例(合作者、期刊在大量论文中重复出现)"""
+        if s is None:
+            return None
+        v = self.interner.get(s)
+        if v is None:
+            v = self.interner[s] = sys.intern(s)
+        return v
+
+    def intern_result(self, result: Dict) -> Dict:
+        """就地intern从缓存日志读入的结果中的作者名、venue、concept名和类型(旧格式concepts一并转换)"""
+        if "error" in result:
+            return result
+        intern = self.intern
+        for a in result.get("authors", []):
+            a["name"] = intern(a.get("name"))
+        concepts = result.pop("concepts", None)
+        if concepts is not None:
+            # 旧版缓存的 concepts 是 dict 列表,转成并行的 名称/分数 列表
+            result["concept_names"] = [c.get("name") for c in concepts]
+            result["concept_scores"] = [c.get("score", 0) for c in concepts]
+        if "concept_names" in result:
+            result["concept_names"] = [intern(n) for n in result["concept_names"]]
+        result["venue"] = intern(result.get("venue"))
+        result["type"] = intern(result.get("type"))
+        return result
+
+    def parse_openalex_work(self, data: Dict) -> Dict:
+        """从OpenAlex work对象中提取需要的字段"""
+        abstract = self.invert_abstract_index(data.get("abstract_inverted_index"))
+        intern = self.intern
+        concepts = data.get("concepts", [])[:20]
 
-                    if abstract:
-                        self.stats["publications_with_abstract"] += 1
-                    if result["is_open_access"]:
-                        self.stats["publications_open_access"] += 1
-                    self.stats["total_citations"] += result["citations_count"]
+        return {
+            "title": data.get("title"),
+            "abstract": abstract,
+            "publication_year": data.get("publication_year"),
+            "authors": [
+                {
+                    "name": intern(a.get("author", {}).get("display_name")),
+                    "orcid": a.get("author", {}).get("orcid"),
+                }
+                for a in data.get("authorships", [])
+            ],
+            # primary_location / source 可能是 null
+            "venue": intern(((data.get("primary_location") or {}).get("source") or {}).get("display_name")),
+            "citations_count": data.get("cited_by_count", 0),
+            "is_open_access": data.get("open_access", {}).get("is_oa", False),
+            "pdf_url": data.get("open_access", {}).get("oa_url"),
+            # concepts 存成并行的 名称/分数 列表,创建chunk时按分数过滤不用逐个查dict
+            "concept_names": [intern(c.get("display_name")) for c in concepts],
+            "concept_scores": [c.get("score", 0) for c in concepts],
+            "type": intern(data.get("type")),
+        }
 
-                    return result
+    def record_openalex_success(self, doi: str, result: Dict, etag: Optional[str] = None):
+        """缓存成功获取的结果并更新统计"""
+        self.cache_result(doi, result, etag)
+        self.stats["openalex_success"] += 1
+
+        if result["abstract"]:
+            self.stats["publications_with_abstract"] += 1
+        if result["is_open_access"]:
+            self.stats["publications_open_access"] += 1
+        self.stats["total_citations"] += result["citations_count"]
+
+    def retry_delay(self, response: Optional[httpx.Response], attempt: int) -> float:
+        """优先使用 Retry-After 头(秒),没有时指数退避"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return float(retry_after)
+        return CONFIG["retry_delay"] * 2 ** attempt
+
+    async def openalex_get(self, url: str, params: Optional[Dict] = None,
+                           headers: Optional[Dict] = None) -> httpx.Response:
+        """
+        限速的OpenAlex GET请求,带重试机制
 
-                elif response.status_code == 404:
-                    result = {"error": "not_found"}
-                    self.progress["openalex_cache"][doi] = result
-                    self.stats["openalex_not_found"] += 1
-                    return result
-                else:
-                    if attempt < CONFIG["max_retries"] - 1:
-                        sleep(CONFIG["retry_delay"] * (attempt + 1))
-                        continue
-                    result = {"error": f"status_{response.status_code}"}
-                    self.stats["openalex_errors"] += 1
-                    return result
+        每个并发槽位至少占用 1 秒,总速率不超过 max_concurrency 次/秒。
+        429/5xx 和网络错误按 Retry-After(没有则指数退避)等待后重试;
+        429 或 X-RateLimit-Remaining 为 0 时所有请求一起暂停。
+        """
+        for attempt in range(CONFIG["max_retries"] + 1):
+            response = None
+            async with self.semaphore:
+                await asyncio.sleep(max(0.0, self.paused_until - time.monotonic()))
+                started = time.monotonic()
+                try:
+                    response = await self.client.get(url, params=params, headers=headers)
+                except httpx.TransportError:
+                    if attempt == CONFIG["max_retries"]:
+                        raise
+                finally:
+                    await asyncio.sleep(max(0.0, 1.0 - (time.monotonic() - started)))
+
+            if response is not None:
+                if response.status_code == 429 or response.headers.get("X-RateLimit-Remaining") == "0":
+                    self.paused_until = max(
+                        self.paused_until,
+                        time.monotonic() + self.retry_delay(response, attempt)
+                    )
+                if response.status_code not in RETRY_STATUS or attempt == CONFIG["max_retries"]:
+                    return response
+
+            await asyncio.sleep(self.retry_delay(response, attempt))
+
+    async def fetch_openalex_chunk(self, dois: List[str]) -> Dict[str, Dict]:
+        """用 filter=doi:<d1>|<d2>|... 一次请求获取最多 OPENALEX_BATCH_SIZE 篇论文,只返回找到的"""
+        try:
+            response = await self.openalex_get(
+                "https://api.openalex.org/works",
+                params={"filter": "doi:" + "|".join(dois), "per-page": OPENALEX_BATCH_SIZE}
+            )
+            if response.status_code != 200:
+                return {}
+            works = {
+                normalize_doi(work.get("doi")): work
+                for work in orjson.loads(response.content).get("results", [])
+            }
+        except Exception as e:
+            self.stats["errors"].append(f"OpenAlex batch fetch error: {str(e)}")
+            return {}
 
+        results = {}
+        for doi in dois:
+            work = works.get(normalize_doi(doi))
+            if not work:
+                continue
+            # 单篇解析失败只记这一篇的错误,同组其他论文照常处理
+            try:
+                results[doi] = self.parse_openalex_work(work)
             except Exception as e:
-                if attempt < CONFIG["max_retries"] - 1:
-                    sleep(CONFIG["retry_delay"] * (attempt + 1))
-                    continue
-                result = {"error": str(e)}
+                results[doi] = {"error": str(e)}
                 self.stats["openalex_errors"] += 1
-                self.stats["errors"].append(f"OpenAlex fetch error for {doi}: {str(e)}")
-                return result
-
-        return {"error": "max_retries_exceeded"}
-
-    def create_rag_chunks(self, staff_entry: Dict, publication_data: List[Dict]) -> List[Dict]:
-        """
-        为每个研究人员创建多个RAG chunks
-        策略: 每篇论文分成多个chunks以提高检索精度
-        """
-        chunks = []
-
-        # Chunk Type 1: 人员基本信息
-        person_basic_chunk = {
-            "chunk_id": f"person_basic_{staff_entry['email']}",
-            "chunk_type": "person_basic",
-            "content": f"{staff_entry['full_name']}\n"
-                       f"Position: {staff_entry['role']}\n"
-                       f"School: {staff_entry['school']}\n"
-                       f"Faculty: {staff_entry['faculty']}\n"
-                       f"Email: {staff_entry['email']}",
-            "metadata": {
-                "person_name": staff_entry['full_name'],
-                "person_email": staff_entry['email'],
-                "role": staff_entry['role'],
-                "school": staff_entry['school'],
-                "faculty": staff_entry['faculty'],
-                "profile_url": staff_entry['profile_url'],
-            }
-        }
-        chunks.append(person_basic_chunk)
-
-        # Chunk Type 2: 人员研究介绍
-        if staff_entry.get('biography'):
-            person_bio_chunk = {
-                "chunk_id": f"person_bio_{staff_entry['email']}",
-                "chunk_type": "person_biography",
-                "content": f"{staff_entry['full_name']} - Biography and Research Interests\n\n"
-                           f"{staff_entry['biography']}\n\n"
-                           f"Research Areas: {staff_entry.get('research_text', '')}",
-                "metadata": {
-                    "person_name": staff_entry['full_name'],
-                    "person_email": staff_entry['email'],
-                    "school": staff_entry['school'],
-                    "faculty": staff_entry['faculty'],
-                    "profile_url": staff_entry['profile_url'],
-                }
-            }
-            chunks.append(person_bio_chunk)
-
-        # Chunk Type 3-N: 论文chunks (每篇论文可能产生多个chunks)
-        for pub in publication_data:
-            oa_data = pub.get('openalex_data', {})
-
-            if 'error' in oa_data:
-                # 即使没有OpenAlex数据,也创建基本chunk
-                if pub.get('title'):
-                    basic_pub_chunk = self._create_basic_publication_chunk(staff_entry, pub)
-                    if basic_pub_chunk:
-                        chunks.append(basic_pub_chunk)
+                self.stats["errors"].append(f"OpenAlex parse error for {doi}: {str(e)}")
                 continue
+            self.record_openalex_success(doi, results[doi])
+        return results
 
-            # 为有OpenAlex数据的论文创建详细chunks
-            pub_chunks = self._create_detailed_publication_chunks(staff_entry, pub, oa_data)
-            chunks.extend(pub_chunks)
-
-        self.stats["chunks_created"] += len(chunks)
-        return chunks
+    async def fetch_openalex_batch(self, dois: List[str]) -> Dict[str, Dict]:
+        """
+        并发获取多篇论文信息
 
-    def _create_basic_publication_chunk(self, staff: Dict, pub: Dict) -> Optional[Dict]:
-        """为没有OpenAlex数据的论文创建基本chunk"""
-        title = pub.get('title')
-        if not title:
-            return None
+        DOI 每 OPENALEX_BATCH_SIZE 个合并成一次 filter 请求,所有请求并发发出(由 openalex_get 限速)。
+        批量响应中缺失的 DOI、批量请求失败的 DOI、以及含 "," / "|"(会破坏 filter 语法)的 DOI
+        回退到单篇查询 fetch_openalex。
+        过期但有ETag的缓存也走单篇查询(条件请求,批量接口不支持)
+        """
+        results = {}
+        singles = []
+        batchable = []
+        for doi in dois:
+            if "," in doi or "|" in doi or (doi in self.cache_info and self.cache_info[doi]["etag"]):
+                singles.append(doi)
+            else:
+                batchable.append(doi)
 
-        pub_id = pub.get('doi') or hashlib.md5(title.encode()).hexdigest()
+        chunk_results = await asyncio.gather(*(
+            self.fetch_openalex_chunk(batchable[i:i + OPENALEX_BATCH_SIZE])
+            for i in range(0, len(batchable), OPENALEX_BATCH_SIZE)
+        ))
+        for chunk_result in chunk_results:
+            results.update(chunk_result)
 
-        return {
-            "chunk_id": f"pub_basic_{pub_id}",
-            "chunk_type": "publication_basic",
-            "content": f"Title: {title}\n"
-                       f"Author: {staff['full_name']}\n"
-                       f"Year: {pub.get('year')}\n"
-                       f"Type: {pub.get('pub_type')}",
-            "metadata": {
-                "person_name": staff['full_name'],
-                "person_email": staff['email'],
-                "person_profile_url": staff['profile_url'],
-                "person_school": staff['school'],
-                "pub_title": title,
-                "pub_year": pub.get('year'),
-                "pub_type": pub.get('pub_type'),
-                "pub_doi": pub.get('doi'),
-                "has_abstract": False,
-            }
-        }
+        singles += [doi for doi in batchable if doi not in results]
+        single_results = await asyncio.gather(*(self.fetch_openalex(doi) for doi in singles))
+        results.update(zip(singles, single_results))
 
-    def _create_detailed_publication_chunks(self, staff: Dict, pub: Dict, oa_data: Dict) -> List[Dict]:
-        """为有完整OpenAlex数据的论文创建多个细粒度chunks"""
-        chunks = []
+        return results
 
-        title = oa_data.get('title') or pub.get('title', 'Unknown Title')
-        pub_id = pub.get('doi') or hashlib.md5(title.encode()).hexdigest()
-        year = oa_data.get('publication_year') or pub.get('year')
-        venue = oa_data.get('venue')
-        abstract = oa_data.get('abstract', '')
-        concepts = oa_data.get('concepts', [])
+    async def fetch_openalex(self, doi: str) -> Dict:
+        """从OpenAlex获取单篇论文信息,带重试机制;过期的缓存有ETag时发条件请求"""
+        if not doi:
+            return {"error": "no_doi"}
 
-        # 共享的metadata
-        base_metadata = {
-            "person_name": staff['full_name'],
-            "person_email": staff['email'],
-            "person_profile_url": staff['profile_url'],
-            "person_school": staff['school'],
-            "person_faculty": staff['faculty'],
-            "pub_title": title,
-            "pub_year": year,
-            "pub_type": pub.get('pub_type'),
-            "pub_doi": pub.get('doi'),
-            "pub_venue": venue,
-            "citations_count": oa_data.get('citations_count', 0),
-            "is_open_access": oa_data.get('is_open_access', False),
-            "pdf_url": oa_data.get('pdf_url'),
-        }
+        # 检查缓存
+        headers = None
+        if doi in self.cache:
+            if not self.is_stale(doi):
+                return self.cache[doi]
+            etag = self.cache_info[doi]["etag"]
+            if etag:
+                headers = {"If-None-Match": etag}
 
-        # Chunk 3a: 论文标题和元数据 (用于精确匹配论文查询)
-        authors = oa_data.get('authors', [])
-        author_names = [a['name'] for a in authors if a.get('name')]
-
-        title_chunk = {
-            "chunk_id": f"pub_title_{pub_id}",
-            "chunk_type": "publication_title",
-            "content": f"Title: {title}\n"
-                       f"Authors: {', '.join(author_names[:10])}\n"  # 限制作者数量
-                       f"Published in: {venue} ({year})\n"
-                       f"Type: {pub.get('pub_type')}\n"
-                       f"Citations: {oa_data.get('citations_count', 0)}",
-            "metadata": {**base_metadata, "has_abstract": bool(abstract)}
-        }
-        chunks.append(title_chunk)
+        url = f"https://api.openalex.org/works/https://doi.org/{doi}"
 
-        # Chunk 3b: 论文摘要 (如果有) - 这是最重要的内容chunk
-        if abstract:
-            abstract_chunk = {
-                "chunk_id": f"pub_abstract_{pub_id}",
-                "chunk_type": "publication_abstract",
-                "content": f"Paper: {title}\n"
-                           f"Author: {staff['full_name']} ({staff['school']})\n"
-                           f"Year: {year}\n\n"
-                           f"Abstract:\n{abstract}",
-                "metadata": {**base_metadata, "has_abstract": True}
-            }
-            chunks.append(abstract_chunk)
-
-        # Chunk 3c: 论文关键词/概念 (用于主题检索)
-        if concepts:
-            high_score_concepts = [c['name'] for c in concepts if c.get('score', 0) > 0.3]
-            if high_score_concepts:
-                keywords_chunk = {
-                    "chunk_id": f"pub_keywords_{pub_id}",
-                    "chunk_type": "publication_keywords",
-                    "content": f"Paper: {title}\n"
-                               f"Author: {staff['full_name']}\n"
-                               f"Keywords: {', '.join(high_score_concepts)}\n"
-                               f"Research Topics: {', '.join(high_score_concepts[:5])}",
-                    "metadata": {
-                        **base_metadata,
-                        "keywords": high_score_concepts,
-                        "has_abstract": bool(abstract)
-                    }
-                }
-                chunks.append(keywords_chunk)
+        try:
+            response = await self.openalex_get(url, headers=headers)
+            if response.status_code == 200:
+                result = self.parse_openalex_work(orjson.loads(response.content))
+        except Exception as e:
+            result = {"error": str(e)}
+            self.stats["openalex_errors"] += 1
+            self.stats["errors"].append(f"OpenAlex fetch error for {doi}: {str(e)}")
+            return result
+
+        if response.status_code == 200:
+            self.record_openalex_success(doi, result, response.headers.get("ETag"))
+            return result
+
+        elif response.status_code == 304 and headers:
+            # 未变化: 沿用缓存内容,只更新获取时间
+            result = self.cache[doi]
+            self.cache_result(doi, result, headers["If-None-Match"])
+            self.stats["openalex_not_modified"] += 1
+            return result
+
+        elif response.status_code == 404:
+            result = {"error": "not_found"}
+            self.cache_result(doi, result)
+            self.stats["openalex_not_found"] += 1
+            return result
+
+        result = {"error": f"status_{response.status_code}"}
+        self.stats["openalex_errors"] += 1
+        return result
+
+    async def process_staff_group(self, group: List[Dict], out_file) -> int:
+        """
+        处理一组staff成员,返回写入的chunk数
 
-        return chunks
+        解析publications和创建chunks(CPU)在进程池中按staff并行执行;
+        主进程负责并发获取整组未缓存的DOI(去重后每个DOI只请求一次)并单线程写入 out_file
+        (先写chunks再标记已处理,中断后不会丢失chunks)
+        """
+        loop = asyncio.get_running_loop()
 
-    def process_staff(self, staff: Dict) -> List[Dict]:
-        """处理单个staff成员"""
-        email = staff['email']
+        to_parse = []
+        for staff in group:
+            print(f"  {staff['full_name']} ({staff['school']})")
 
-        # 检查是否已处理
-        if email in self.progress["processed_staff_emails"]:
-            print(f"  ⏭  Skipping {staff['full_name']} (already processed)")
-            return []
+            # 检查是否已处理
+            if staff['email'] in self.processed:
+                print(f"  ⏭  Skipping {staff['full_name']} (already processed)")
+                continue
 
-        if not staff.get('profile_details') or not staff['profile_details'].get('publications'):
-            self.progress["processed_staff_emails"].append(email)
-            return []
+            if not staff.get('profile_details') or not staff['profile_details'].get('publications'):
+                self.processed.add(staff['email'])
+                continue
 
-        pubs = staff['profile_details']['publications']
-        staff_pubs = []
+            to_parse.append(staff)
 
         # 解析publications
-        for pub_type, pub_text in pubs.items():
-            parsed = self.parse_publication_text(pub_text, pub_type)
-            staff_pubs.extend(parsed)
-
-        if not staff_pubs:
-            self.progress["processed_staff_emails"].append(email)
-            return []
+        parse_results = await asyncio.gather(*(
+            loop.run_in_executor(self.pool, parse_staff_record, staff) for staff in to_parse
+        ))
+
+        parsed = []
+        for staff, (staff_pubs, errors) in zip(to_parse, parse_results):
+            self.stats["errors"].extend(errors)
+            if not staff_pubs:
+                self.processed.add(staff['email'])
+                continue
 
-        self.stats["staff_with_publications"] += 1
-        self.stats["total_publications_parsed"] += len(staff_pubs)
+            self.stats["staff_with_publications"] += 1
+            self.stats["total_publications_parsed"] += len(staff_pubs)
+            parsed.append((staff, staff_pubs))
 
         # 获取OpenAlex数据
-        for pub in staff_pubs:
-            if pub.get('doi'):
-                self.stats["publications_with_doi"] += 1
-                pub['openalex_data'] = self.fetch_openalex(pub['doi'])
-                sleep(CONFIG["api_delay"])  # 礼貌性延迟
-            else:
-                pub['openalex_data'] = {"error": "no_doi"}
+        cache = self.cache
+        uncached = list(dict.fromkeys(
+            pub['doi'] for _, staff_pubs in parsed for pub in staff_pubs
+            if pub.get('doi') and (pub['doi'] not in cache or self.is_stale(pub['doi']))
+        ))
+        fetched = await self.fetch_openalex_batch(uncached) if uncached else {}
+
+        for _, staff_pubs in parsed:
+            for pub in staff_pubs:
+                if pub.get('doi'):
+                    self.stats["publications_with_doi"] += 1
+                    pub['openalex_data'] = cache.get(pub['doi']) or fetched[pub['doi']]
+                else:
+                    pub['openalex_data'] = {"error": "no_doi"}
 
         # 创建chunks
-        chunks = self.create_rag_chunks(staff, staff_pubs)
-
-        # 标记为已处理
-        self.progress["processed_staff_emails"].append(email)
+        chunk_results = await asyncio.gather(*(
+            loop.run_in_executor(self.pool, build_staff_chunks, staff, staff_pubs)
+            for staff, staff_pubs in parsed
+        ))
+
+        written = 0
+        for (staff, _), (lines, count) in zip(parsed, chunk_results):
+            out_file.write(lines)
+            written += count
+            self.stats["chunks_created"] += count
+
+            # 标记为已处理
+            self.processed.add(staff['email'])
+            print(f"  ✓ {staff['full_name']}: created {count} chunks")
+
+        return written
+
+    def iter_pending_staff(self, f) -> Iterator[Dict]:
+        """流式读取staff数据(ijson,内存中只保留当前一条),跳过已处理的,同时统计总人数"""
+        seen = set(self.processed)
+        for staff in ijson.items(f, "item", use_float=True):
+            self.stats["total_staff"] += 1
+            # 同一email只处理一次
+            if staff['email'] not in seen:
+                seen.add(staff['email'])
+                yield staff
+
+    async def process_pending(self, pending: Iterator[Dict]) -> int:
+        """按组处理所有未处理的staff,整个过程共用一个HTTP客户端和进程池,返回写入的chunk数"""
+        self.semaphore = asyncio.Semaphore(CONFIG["max_concurrency"])
+        written = 0
+
+        # 追加模式: 恢复运行时保留之前已写入的chunks和缓存
+        with open(CONFIG["output_file"], 'ab') as out_file, open(CONFIG["cache_file"], 'ab') as self.cache_log, \
+                ProcessPoolExecutor() as self.pool:
+            async with self.create_client() as self.client:
+                while True:
+                    group = list(islice(pending, STAFF_GROUP_SIZE))
+                    if not group:
+                        break
+                    print(f"\n[{self.stats['total_staff']} read] Processing {len(group)} staff members...")
+
+                    written += await self.process_staff_group(group, out_file)
+
+                    # 每组保存一次进度(chunks先落盘)
+                    for f in (out_file, self.cache_log):
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self.save_progress()
+                    print(f"\n  💾 Progress saved (processed {len(self.processed)})")
 
-        return chunks
+        return written
 
     def run(self):
         """运行完整的解析流程"""
@@ -427,41 +792,18 @@ class PublicationParser:
         print("UNSW Engineering Staff Publications Parser - Full Version")
         print("="*80)
 
-        # 加载数据
-        print("\n[1/4] Loading staff data...")
-        with open(CONFIG["input_file"], 'r') as f:
-            staff_data = json.load(f)
-
-        self.stats["total_staff"] = len(staff_data)
-        already_processed = len(self.progress["processed_staff_emails"])
-
-        print(f"✓ Total staff: {len(staff_data)}")
+        # 加载数据: 边读边处理,不把整个文件读进内存
+        print("\n[1/4] Streaming staff data...")
+        already_processed = len(self.processed)
         if already_processed > 0:
             print(f"✓ Already processed: {already_processed}")
-            print(f"✓ Remaining: {len(staff_data) - already_processed}")
 
         # 处理每个staff
         print(f"\n[2/4] Processing staff members...")
-        all_chunks = []
-
         try:
-            for i, staff in enumerate(staff_data, 1):
-                if staff['email'] in self.progress["processed_staff_emails"]:
-                    continue
-
-                print(f"\n[{i}/{len(staff_data)}] {staff['full_name']}")
-                print(f"  School: {staff['school']}")
-
-                chunks = self.process_staff(staff)
-                all_chunks.extend(chunks)
-
-                if chunks:
-                    print(f"  ✓ Created {len(chunks)} chunks")
-
-                # 每10个staff保存一次进度
-                if i % 10 == 0:
-                    self.save_progress()
-                    print(f"\n  💾 Progress saved (processed {len(self.progress['processed_staff_emails'])}/{len(staff_data)})")
+            with open(CONFIG["input_file"], 'rb') as f:
+                written = asyncio.run(self.process_pending(self.iter_pending_staff(f)))
+            print(f"\n✓ Total staff: {self.stats['total_staff']}")
 
         except KeyboardInterrupt:
             print("\n\n⚠️  Interrupted by user. Saving progress...")
@@ -470,11 +812,9 @@ class PublicationParser:
             print("✓ Progress saved. You can resume later.")
             return
 
-        # 保存最终结果
+        # chunks已在处理过程中写入
         print(f"\n[3/4] Saving chunks...")
-        with open(CONFIG["output_file"], 'w') as f:
-            json.dump(all_chunks, f, indent=2, ensure_ascii=False)
-        print(f"✓ Saved {len(all_chunks)} chunks to {CONFIG['output_file']}")
+        print(f"✓ Saved {written} chunks to {CONFIG['output_file']}")
 
         # 保存统计
         print(f"\n[4/4] Saving statistics...")
@@ -503,6 +843,8 @@ class PublicationParser:
         print(f"  Successful: {self.stats['openalex_success']}")
         print(f"  Not found: {self.stats['openalex_not_found']}")
         print(f"  Errors: {self.stats['openalex_errors']}")
+        if self.stats['openalex_not_modified']:
+            print(f"  Not modified (cached): {self.stats['openalex_not_modified']}")
 
         if self.stats['openalex_success'] > 0:
             abstract_rate = self.stats['publications_with_abstract'] / self.stats['openalex_success'] * 100
@@ -1,155 +1,512 @@
 """
 多源版本 - 按优先级从多个API获取abstract
 优先级: OpenAlex > Semantic Scholar > Crossref > PubMed
+每个staff的DOI并发获取(每个API主机按 host_rates 限速,最多 max_concurrency_per_host 个请求同时进行)
+输入文件流式读取,staff_workers 个staff同时处理
 """
-import json
+import orjson
+import ijson
 import re
-import requests
-from time import sleep
-from typing import List, Dict, Optional
-import hashlib
+import sqlite3
+import time
+import random
+import asyncio
+import httpx
+from cachetools import LRUCache
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+from xml.etree import ElementTree
+import xxhash
 import os
 from datetime import datetime
 
 # 配置
 CONFIG = {
     "input_file": "/Users/z5241339/Documents/unsw_ai_rag/engineering_staff_with_profiles_cleaned.json",
-    "output_file": "/Users/z5241339/Documents/unsw_ai_rag/rag_chunks_multisource.json",
-    "progress_file": "/Users/z5241339/Documents/unsw_ai_rag/parsing_progress_multisource.json",
+    "output_file": "/Users/z5241339/Documents/unsw_ai_rag/rag_chunks_multisource.jsonl",  # 每行一个chunk,边处理边追加
+    "processed_log": "/Users/z5241339/Documents/unsw_ai_rag/processed_staff_multisource.log",  # 每行一个已处理的staff email,只追加
+    "progress_file": "/Users/z5241339/Documents/unsw_ai_rag/parsing_progress_multisource.json",  # 旧版进度文件,启动时迁移
     "stats_file": "/Users/z5241339/Documents/unsw_ai_rag/parsing_statistics_multisource.json",
+    "cache_file": "/Users/z5241339/Documents/unsw_ai_rag/publication_cache_multisource.sqlite",  # DOI -> 多源获取结果
+    "cache_memory_size": 4096,  # 内存中保留最近使用的DOI数
     "max_retries": 3,
     "retry_delay": 1.0,
-    "api_delay": 0.15,
+    "max_concurrency_per_host": 32,
+    # 每个API主机每秒最多发出的请求数(没列出的主机用 default_host_rate);
+    # 响应头 X-RateLimit-Remaining 为 0 或返回 429 时该主机暂停到重置/Retry-After
+    "host_rates": {
+        "api.openalex.org": 10,
+        "api.semanticscholar.org": 10,
+        "api.crossref.org": 50,
+        "eutils.ncbi.nlm.nih.gov": 3,  # 没有API key时 NCBI 限制 3 次/秒
+    },
+    "default_host_rate": 10,
+    "max_backoff": 60.0,
+    "staff_workers": 8,  # 同时处理的staff数
     "email": "research@unsw.edu.au",
 }
 
+# 需要等待后重试的HTTP状态码
+RETRY_STATUS = {429, 502, 503, 504}
+# 各个源在 abstract_source 字段里的名称(按优先级排列)
+ABSTRACT_SOURCE_NAMES = {
+    'openalex': 'OpenAlex',
+    'semantic_scholar': 'Semantic Scholar',
+    'crossref': 'Crossref',
+    'pubmed': 'PubMed',
+}
+# 批量接口单次请求的 DOI 数
+OPENALEX_BATCH_SIZE = 50
+SEMANTIC_SCHOLAR_BATCH_SIZE = 500
+PUBMED_BATCH_SIZE = 200
+
+# publication文本解析和abstract清理用的正则(模块加载时编译一次)
+SPLIT_RE = re.compile(r'([A-Za-z][A-Za-z\s/&()\-\']+?)\s\|\s(\d{4})', re.IGNORECASE)
+DOI_RE = re.compile(r'https?://(?:dx\.)?doi\.org/([^\s,]+)', re.IGNORECASE)
+TITLE_RE = re.compile(r"'([^']+)'")
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+def parse_publication_text(pub_text: str, pub_type: str) -> List[Dict]:
+    """解析publication文本"""
+    publications = []
+    # Many "Other" sections actually contain entries like "Conference Papers | 2025".
+    # Instead of relying on the dict key, detect the actual label inside the text (SPLIT_RE).
+    matches = list(SPLIT_RE.finditer(pub_text))
+    for idx, match in enumerate(matches):
+        entry_label = match.group(1).strip()
+        year = match.group(2)
+
+        start = match.end()
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(pub_text)
+        content = pub_text[start:end].strip()
+        if not content:
+            continue
+
+        doi_match = DOI_RE.search(content)
+        doi = doi_match.group(1) if doi_match else None
+
+        title_match = TITLE_RE.search(content)
+        title = title_match.group(1) if title_match else None
+
+        if title or doi:
+            publications.append({
+                'year': int(year) if year.isdigit() else year,
+                'title': title,
+                'doi': doi,
+                'raw_text': content,
+                'pub_type': entry_label or pub_type
+            })
+
+    return publications
+
+def parse_staff_publications(pubs: Dict[str, str]) -> Tuple[List[Dict], List[str]]:
+    """进程池任务: 解析一个staff的所有publications,返回 (publications, 解析错误)"""
+    staff_pubs = []
+    errors = []
+    for pub_type, pub_text in pubs.items():
+        try:
+            staff_pubs.extend(parse_publication_text(pub_text, pub_type))
+        except Exception as e:
+            errors.append(f"Parse error: {str(e)}")
+    return staff_pubs, errors
+
+def normalize_doi(doi: Optional[str]) -> str:
+    """DOI统一为小写、去掉 https://doi.org/ 前缀,用于匹配OpenAlex返回结果"""
+    doi = (doi or "").strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "http://dx.doi.org/"):
+        if doi.startswith(prefix):
+            return doi[len(prefix):]
+    return doi
+
+class PublicationCache:
+    """
+    DOI -> 多源获取结果的持久化缓存
+
+    SQLite 按 DOI 存 JSON(WAL 模式,每次写入只涉及新增的行),前面加一层内存LRU;
+    重复出现的DOI(合作者)直接从内存返回
+    """
+
+    def __init__(self, path: str, memory_size: int):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS publications (doi TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        self.memory = LRUCache(maxsize=memory_size)
+
+    def get_many(self, dois: List[str]) -> Dict[str, Dict]:
+        """返回已缓存的DOI的结果(没缓存的不在结果里)"""
+        found = {}
+        missing = []
+        for doi in dois:
+            data = self.memory.get(doi)
+            if data is None:
+                missing.append(doi)
+            else:
+                found[doi] = data
+
+        # 分批查询,避免超过 SQLite 参数个数上限
+        for i in range(0, len(missing), 500):
+            batch = missing[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT doi, data FROM publications WHERE doi IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            for doi, data in rows:
+                found[doi] = self.memory[doi] = orjson.loads(data)
+
+        return found
+
+    def put_many(self, results: Dict[str, Dict]):
+        """写入(覆盖)一批结果"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO publications (doi, data) VALUES (?, ?)",
+            [(doi, orjson.dumps(data)) for doi, data in results.items()]
+        )
+        self.conn.commit()
+        self.memory.update(results)
+
+    def close(self):
+        self.conn.close()
+
 class MultiSourceFetcher:
     """多源Abstract获取器"""
 
     def __init__(self, stats_tracker):
         self.stats = stats_tracker
+        # 在事件循环中创建(见 PublicationParser.process_all)
+        self.client: Optional[httpx.AsyncClient] = None
+        # 主机名 -> 并发上限
+        self.host_limits: Dict[str, asyncio.Semaphore] = {}
+        # 主机名 -> 下一个请求最早的发出时间 / 被限速时暂停到的时间点(time.monotonic)
+        self.host_next_slot: Dict[str, float] = {}
+        self.host_paused_until: Dict[str, float] = {}
+
+    def create_client(self) -> httpx.AsyncClient:
+        """
+        创建共享的异步HTTP客户端
 
-    def fetch_abstract(self, doi: str) -> Dict:
+        连接池容纳 4 个API主机各自的并发上限,keep-alive 连接在请求间复用;
+        与 requests 一样跟随重定向;连接失败由传输层重试
         """
-        按优先级尝试多个源获取abstract
-        返回: {abstract, source, ...其他metadata}
+        limits = httpx.Limits(
+            max_connections=4 * CONFIG["max_concurrency_per_host"],
+            max_keepalive_connections=4 * CONFIG["max_concurrency_per_host"]
+        )
+        return httpx.AsyncClient(
+            headers={"User-Agent": f"mailto:{CONFIG['email']}"},
+            timeout=15,
+            limits=limits,
+            follow_redirects=True,
+            transport=httpx.AsyncHTTPTransport(retries=CONFIG["max_retries"], limits=limits)
+        )
+
+    def retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """重试前等待的秒数: 优先用 Retry-After,否则带抖动的指数退避(不超过 max_backoff)"""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        delay = min(CONFIG["max_backoff"], CONFIG["retry_delay"] * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def reset_delay(self, response: httpx.Response) -> float:
+        """X-RateLimit-Reset 到现在的秒数(有的API给时间戳,有的给剩余秒数),没有时等 1 秒"""
+        reset = response.headers.get("X-RateLimit-Reset")
+        try:
+            reset = float(reset)
+        except (TypeError, ValueError):
+            return 1.0
+        if reset > 1e9:
+            reset -= time.time()
+        return min(CONFIG["max_backoff"], max(0.0, reset))
+
+    async def wait_for_slot(self, host: str):
+        """按主机的速率和暂停时间等待,轮到时占用下一个发出时间"""
+        interval = 1.0 / CONFIG["host_rates"].get(host, CONFIG["default_host_rate"])
+        now = time.monotonic()
+        start = max(now, self.host_next_slot.get(host, 0.0), self.host_paused_until.get(host, 0.0))
+        self.host_next_slot[host] = start + interval
+        await asyncio.sleep(start - now)
+
+    def pause_host(self, host: str, delay: float):
+        """暂停该主机的所有请求 delay 秒"""
+        self.host_paused_until[host] = max(self.host_paused_until.get(host, 0.0), time.monotonic() + delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """GET请求(见 request)"""
+        return await self.request("GET", url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
         """
-        if not doi:
-            return {"error": "no_doi"}
+        按主机限制并发和速率的HTTP请求,429/502/503/504 等待后重试
 
-        # 1. OpenAlex (优先,数据最全)
-        result = self._fetch_openalex(doi)
-        if result and result.get('abstract'):
-            result['abstract_source'] = 'OpenAlex'
-            self.stats['abstract_sources']['openalex'] += 1
-            return result
+        X-RateLimit-Remaining 为 0 时该主机暂停到 X-RateLimit-Reset;
+        429 时该主机暂停 Retry-After(没有则指数退避)
+        """
+        host = urlsplit(url).hostname
+        semaphore = self.host_limits.get(host)
+        if semaphore is None:
+            semaphore = self.host_limits[host] = asyncio.Semaphore(CONFIG["max_concurrency_per_host"])
+        for attempt in range(CONFIG["max_retries"] + 1):
+            async with semaphore:
+                await self.wait_for_slot(host)
+                response = await self.client.request(method, url, **kwargs)
+
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                self.pause_host(host, self.reset_delay(response))
+            if response.status_code not in RETRY_STATUS or attempt == CONFIG["max_retries"]:
+                return response
+
+            delay = self.retry_delay(response, attempt)
+            if response.status_code == 429:
+                self.pause_host(host, delay)
+            await asyncio.sleep(delay)
+
+    async def fetch_batch(self, dois: List[str]) -> Dict[str, Dict]:
+        """
+        批量获取多篇论文,返回 DOI -> fetch_abstract 的结果
 
-        # 保存OpenAlex的metadata (即使没有abstract)
-        base_data = result if result and 'error' not in result else {}
+        OpenAlex 每 50 个 DOI 合并成一次 filter 请求,Semantic Scholar 每 500 个一次 POST /paper/batch,
+        两者并发发出;两者都没有abstract的DOI再按每 200 个一组查 PubMed(esearch + efetch 两次请求)。
+        OpenAlex 批量结果中缺失的 DOI(以及含 "," / "|" 的DOI)、批量请求失败的 DOI 才回退到单篇查询;
+        Crossref 没有批量接口,仍逐篇查询
+        """
+        batchable = [doi for doi in dois if "," not in doi and "|" not in doi]
+        openalex_chunks, s2_chunks = await asyncio.gather(
+            asyncio.gather(*(
+                self._fetch_openalex_chunk(batchable[i:i + OPENALEX_BATCH_SIZE])
+                for i in range(0, len(batchable), OPENALEX_BATCH_SIZE)
+            )),
+            asyncio.gather(*(
+                self._fetch_semantic_scholar_chunk(dois[i:i + SEMANTIC_SCHOLAR_BATCH_SIZE])
+                for i in range(0, len(dois), SEMANTIC_SCHOLAR_BATCH_SIZE)
+            )),
+        )
+        openalex_results = {doi: r for chunk in openalex_chunks for doi, r in chunk.items()}
+        s2_results = {doi: r for chunk in s2_chunks for doi, r in chunk.items()}
+
+        need_pubmed = [
+            doi for doi in dois
+            if not (openalex_results.get(doi) or {}).get('_abstract_inverted_index') and not s2_results.get(doi)
+        ]
+        pubmed_chunks = await asyncio.gather(*(
+            self._fetch_pubmed_chunk(need_pubmed[i:i + PUBMED_BATCH_SIZE])
+            for i in range(0, len(need_pubmed), PUBMED_BATCH_SIZE)
+        ))
+        pubmed_results = {doi: r for chunk in pubmed_chunks for doi, r in chunk.items()}
+
+        results = await asyncio.gather(*(
+            self.fetch_abstract(doi, openalex_results, s2_results, pubmed_results) for doi in dois
+        ))
+        return dict(zip(dois, results))
+
+    async def fetch_abstract(self, doi: str, openalex_results: Optional[Dict[str, Dict]] = None,
+                             s2_results: Optional[Dict[str, Optional[str]]] = None,
+                             pubmed_results: Optional[Dict[str, Optional[str]]] = None) -> Dict:
+        """
+        按优先级选择abstract: OpenAlex > Semantic Scholar > Crossref > PubMed
+        openalex_results / s2_results / pubmed_results 是 fetch_batch 已批量取到的结果
 
-        # 2. Semantic Scholar (高质量abstract + TLDR)
-        abstract = self._fetch_semantic_scholar(doi)
-        if abstract:
-            base_data['abstract'] = abstract
-            base_data['abstract_source'] = 'Semantic Scholar'
-            self.stats['abstract_sources']['semantic_scholar'] += 1
-            return base_data
+        已知结果里高优先级的源有abstract时直接返回;否则从第一个未知的源起,
+        剩下的源同时请求,按优先级依次等待,选定后取消其余请求(延迟取决于最慢的那个被等待的源,而不是逐个相加)
+        返回: {abstract, source, ...其他metadata}
+        """
+        if not doi:
+            return {"error": "no_doi"}
 
-        # 3. Crossref
-        abstract = self._fetch_crossref(doi)
-        if abstract:
-            base_data['abstract'] = abstract
-            base_data['abstract_source'] = 'Crossref'
-            self.stats['abstract_sources']['crossref'] += 1
-            return base_data
+        known = {}
+        if openalex_results and doi in openalex_results:
+            known['openalex'] = openalex_results[doi]
+        if s2_results and doi in s2_results:
+            known['semantic_scholar'] = s2_results[doi]
+        if pubmed_results and doi in pubmed_results:
+            known['pubmed'] = pubmed_results[doi]
+
+        fetchers = {
+            'openalex': self._fetch_openalex,
+            'semantic_scholar': self._fetch_semantic_scholar,
+            'crossref': self._fetch_crossref,
+            'pubmed': self._fetch_pubmed,
+        }
+        sources = list(fetchers)
+        tasks = {}
+        base_data = {}
+        try:
+            for i, source in enumerate(sources):
+                if source in known:
+                    result = known[source]
+                else:
+                    if not tasks:
+                        tasks = {
+                            s: asyncio.create_task(fetchers[s](doi))
+                            for s in sources[i:] if s not in known
+                        }
+                    result = await tasks[source]
+
+                if source == 'openalex':
+                    # 保存OpenAlex的metadata (即使没有abstract)
+                    base_data = result if result and 'error' not in result else {}
+                    inverted_index = base_data.pop('_abstract_inverted_index', None)
+                    abstract = self._invert_abstract_index(inverted_index) if inverted_index else ""
+                    if base_data:
+                        base_data['abstract'] = abstract
+                else:
+                    abstract = result
 
-        # 4. PubMed (主要用于生物医学论文)
-        abstract = self._fetch_pubmed(doi)
-        if abstract:
-            base_data['abstract'] = abstract
-            base_data['abstract_source'] = 'PubMed'
-            self.stats['abstract_sources']['pubmed'] += 1
-            return base_data
+                if abstract:
+                    base_data['abstract'] = abstract
+                    base_data['abstract_source'] = ABSTRACT_SOURCE_NAMES[source]
+                    self.stats['abstract_sources'][source] += 1
+                    return base_data
+        finally:
+            for task in tasks.values():
+                task.cancel()
 
         # 如果都没有abstract,返回OpenAlex的数据
         if base_data:
             base_data['abstract_source'] = 'none'
         return base_data if base_data else {"error": "not_found"}
 
-    def _fetch_openalex(self, doi: str) -> Optional[Dict]:
+    def _parse_openalex_work(self, data: Dict) -> Dict:
+        """
+        从OpenAlex work对象中提取需要的字段
+
+        倒排索引原样放在 _abstract_inverted_index,选定OpenAlex的abstract时才由 fetch_abstract 转换
+        """
+        return {
+            "title": data.get("title"),
+            "_abstract_inverted_index": data.get("abstract_inverted_index"),
+            "publication_year": data.get("publication_year"),
+            "authors": [
+                {"name": a.get("author", {}).get("display_name")}
+                for a in data.get("authorships", [])
+            ],
+            # primary_location / source 可能是 null
+            "venue": ((data.get("primary_location") or {}).get("source") or {}).get("display_name"),
+            "citations_count": data.get("cited_by_count", 0),
+            "is_open_access": data.get("open_access", {}).get("is_oa", False),
+            "pdf_url": data.get("open_access", {}).get("oa_url"),
+            "concepts": [
+                {"name": c.get("display_name"), "score": c.get("score", 0)}
+                for c in data.get("concepts", [])[:20]
+            ],
+            "type": data.get("type"),
+        }
+
+    async def _fetch_openalex_chunk(self, dois: List[str]) -> Dict[str, Dict]:
+        """用 filter=doi:<d1>|<d2>|... 一次请求获取最多 OPENALEX_BATCH_SIZE 篇论文,只返回找到的"""
+        try:
+            response = await self.get(
+                "https://api.openalex.org/works",
+                params={"filter": "doi:" + "|".join(dois), "per-page": OPENALEX_BATCH_SIZE},
+                timeout=30
+            )
+            if response.status_code != 200:
+                return {}
+            works = {
+                normalize_doi(work.get("doi")): work
+                for work in orjson.loads(response.content).get("results", [])
+            }
+        except Exception as e:
+            self.stats['errors'].append(f"OpenAlex batch error: {str(e)}")
+            return {}
+
+        results = {}
+        for doi in dois:
+            work = works.get(normalize_doi(doi))
+            if not work:
+                continue
+            # 解析失败的不放进结果,由 fetch_abstract 逐篇查询
+            try:
+                results[doi] = self._parse_openalex_work(work)
+            except Exception as e:
+                self.stats['errors'].append(f"OpenAlex parse error for {doi}: {str(e)}")
+        return results
+
+    async def _fetch_openalex(self, doi: str) -> Optional[Dict]:
         """从OpenAlex获取"""
         url = f"https://api.openalex.org/works/https://doi.org/{doi}"
-        headers = {"User-Agent": f"mailto:{CONFIG['email']}"}
 
         try:
-            response = requests.get(url, headers=headers, timeout=15)
+            response = await self.get(url, timeout=15)
             if response.status_code == 200:
-                data = response.json()
-                abstract = self._invert_abstract_index(data.get("abstract_inverted_index"))
-
-                return {
-                    "title": data.get("title"),
-                    "abstract": abstract,
-                    "publication_year": data.get("publication_year"),
-                    "authors": [
-                        {"name": a.get("author", {}).get("display_name")}
-                        for a in data.get("authorships", [])
-                    ],
-                    "venue": data.get("primary_location", {}).get("source", {}).get("display_name"),
-                    "citations_count": data.get("cited_by_count", 0),
-                    "is_open_access": data.get("open_access", {}).get("is_oa", False),
-                    "pdf_url": data.get("open_access", {}).get("oa_url"),
-                    "concepts": [
-                        {"name": c.get("display_name"), "score": c.get("score", 0)}
-                        for c in data.get("concepts", [])[:20]
-                    ],
-                    "type": data.get("type"),
-                }
+                return self._parse_openalex_work(orjson.loads(response.content))
             return None
         except Exception as e:
             self.stats['errors'].append(f"OpenAlex error for {doi}: {str(e)}")
             return None
 
-    def _fetch_semantic_scholar(self, doi: str) -> Optional[str]:
+    def _semantic_scholar_abstract(self, data: Optional[Dict]) -> Optional[str]:
+        """从Semantic Scholar paper对象中取abstract,没有时用TLDR"""
+        if not data:
+            return None
+        # 优先用abstract,其次用TLDR
+        abstract = data.get('abstract')
+        if abstract:
+            return abstract
+        # TLDR是AI生成的摘要,也很有价值
+        tldr = data.get('tldr', {}).get('text') if data.get('tldr') else None
+        if tldr:
+            return f"[TLDR] {tldr}"
+        return None
+
+    async def _fetch_semantic_scholar_chunk(self, dois: List[str]) -> Dict[str, Optional[str]]:
+        """
+        POST /paper/batch 一次获取最多 SEMANTIC_SCHOLAR_BATCH_SIZE 篇论文的abstract
+
+        结果与请求的 ids 按位置一一对应(找不到的为 null),所以请求成功时每个DOI都有答案;
+        请求失败时返回空,由 fetch_abstract 逐篇查询
+        """
+        try:
+            response = await self.request(
+                "POST",
+                "https://api.semanticscholar.org/graph/v1/paper/batch",
+                params={"fields": "abstract,tldr"},
+                content=orjson.dumps({"ids": [f"DOI:{doi}" for doi in dois]}),
+                headers={"Content-Type": "application/json"},
+                timeout=30
+            )
+            if response.status_code != 200:
+                return {}
+            papers = orjson.loads(response.content)
+        except Exception as e:
+            self.stats['errors'].append(f"Semantic Scholar batch error: {str(e)}")
+            return {}
+
+        return {doi: self._semantic_scholar_abstract(paper) for doi, paper in zip(dois, papers)}
+
+    async def _fetch_semantic_scholar(self, doi: str) -> Optional[str]:
         """从Semantic Scholar获取abstract"""
         url = f"https://api.semanticscholar.org/graph/v1/paper/DOI:{doi}"
         params = {"fields": "abstract,tldr"}
 
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.get(url, params=params, timeout=10)
             if response.status_code == 200:
-                data = response.json()
-                # 优先用abstract,其次用TLDR
-                abstract = data.get('abstract')
-                if abstract:
-                    return abstract
-                # TLDR是AI生成的摘要,也很有价值
-                tldr = data.get('tldr', {}).get('text') if data.get('tldr') else None
-                if tldr:
-                    return f"[TLDR] {tldr}"
+                return self._semantic_scholar_abstract(orjson.loads(response.content))
             return None
-        except:
+        except Exception:
             return None
 
-    def _fetch_crossref(self, doi: str) -> Optional[str]:
+    async def _fetch_crossref(self, doi: str) -> Optional[str]:
         """从Crossref获取abstract"""
         url = f"https://api.crossref.org/works/{doi}"
 
         try:
-            response = requests.get(url, timeout=10)
+            response = await self.get(url, timeout=10)
             if response.status_code == 200:
-                data = response.json()['message']
+                data = orjson.loads(response.content)['message']
                 abstract = data.get('abstract', '')
                 if abstract:
                     # 清理HTML标签
-                    abstract = re.sub(r'<[^>]+>', '', abstract)
+                    abstract = HTML_TAG_RE.sub('', abstract)
                     abstract = abstract.strip()
                     return abstract if abstract else None
             return None
-        except:
+        except Exception:
             return None
 
-    def _fetch_pubmed(self, doi: str) -> Optional[str]:
+    async def _fetch_pubmed(self, doi: str) -> Optional[str]:
         """从PubMed获取abstract"""
         # 先通过DOI搜索PMID
         search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
@@ -160,9 +517,9 @@ class MultiSourceFetcher:
         }
 
         try:
-            response = requests.get(search_url, params=params, timeout=10)
+            response = await self.get(search_url, params=params, timeout=10)
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 id_list = data.get('esearchresult', {}).get('idlist', [])
                 if id_list:
                     pmid = id_list[0]
@@ -173,33 +530,94 @@ class MultiSourceFetcher:
                         "id": pmid,
                         "retmode": "xml"
                     }
-                    sleep(0.2)  # PubMed要求延迟
-                    response = requests.get(fetch_url, params=params, timeout=10)
+                    response = await self.get(fetch_url, params=params, timeout=10)
                     if response.status_code == 200:
-                        # 提取abstract文本
-                        match = re.search(r'<AbstractText[^>]*>(.*?)</AbstractText>',
-                                        response.text, re.DOTALL)
-                        if match:
-                            abstract = match.group(1).strip()
-                            # 清理XML实体
-                            abstract = re.sub(r'&lt;', '<', abstract)
-                            abstract = re.sub(r'&gt;', '>', abstract)
-                            abstract = re.sub(r'&amp;', '&', abstract)
-                            return abstract
+                        return self._pubmed_abstract(ElementTree.fromstring(response.content))
             return None
-        except:
+        except Exception:
             return None
 
+    async def _fetch_pubmed_chunk(self, dois: List[str]) -> Dict[str, Optional[str]]:
+        """
+        一次 esearch(usehistory=y)查出所有DOI对应的文章,再用 WebEnv/query_key 一次 efetch 全部取回
+
+        按文章里的DOI对回请求的DOI;请求成功时没找到的DOI为 None(PubMed里没有),
+        请求失败时返回空,由 fetch_abstract 逐篇查询
+        """
+        try:
+            response = await self.request(
+                "POST",
+                "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi",
+                data={
+                    "db": "pubmed",
+                    "term": " OR ".join(f'"{doi}"[DOI]' for doi in dois),
+                    "usehistory": "y",
+                    "retmax": 0,
+                    "retmode": "json",
+                },
+                timeout=30
+            )
+            if response.status_code != 200:
+                return {}
+            search = orjson.loads(response.content).get('esearchresult', {})
+            count = int(search.get('count', 0))
+            if count == 0:
+                return {doi: None for doi in dois}
+
+            response = await self.get(
+                "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi",
+                params={
+                    "db": "pubmed",
+                    "WebEnv": search['webenv'],
+                    "query_key": search['querykey'],
+                    "retmax": count,
+                    "retmode": "xml",
+                },
+                timeout=60
+            )
+            if response.status_code != 200:
+                return {}
+            root = ElementTree.fromstring(response.content)
+        except Exception as e:
+            self.stats['errors'].append(f"PubMed batch error: {str(e)}")
+            return {}
+
+        abstracts = {}
+        for article in root.iter('PubmedArticle'):
+            abstract = self._pubmed_abstract(article)
+            if not abstract:
+                continue
+            # 文章自身的DOI(不要用 ReferenceList 里引用文献的DOI)
+            ids = article.findall("PubmedData/ArticleIdList/ArticleId[@IdType='doi']")
+            ids += article.findall("MedlineCitation/Article/ELocationID[@EIdType='doi']")
+            for node in ids:
+                if node.text:
+                    abstracts.setdefault(normalize_doi(node.text), abstract)
+
+        return {doi: abstracts.get(normalize_doi(doi)) for doi in dois}
+
+    def _pubmed_abstract(self, element: ElementTree.Element) -> Optional[str]:
+        """
+        提取abstract文本: 分段的abstract(BACKGROUND / METHODS ...)每段一个 AbstractText,
+        itertext 包含段内 <i>/<sup> 等标签里的文字,实体由XML解析器处理
+        """
+        texts = ["".join(node.itertext()).strip() for node in element.iter('AbstractText')]
+        abstract = " ".join(text for text in texts if text)
+        return abstract if abstract else None
+
     def _invert_abstract_index(self, inverted_index: Dict) -> str:
         """将OpenAlex的倒排索引转换为正常文本"""
         if not inverted_index:
             return ""
         try:
-            words = {}
+            # 位置基本是连续的 0..N-1,直接预分配列表按下标填充,不需要 dict + 排序
+            length = 1 + max((max(positions) for positions in inverted_index.values() if positions), default=-1)
+            words = [None] * length
             for word, positions in inverted_index.items():
                 for pos in positions:
                     words[pos] = word
-            return " ".join([words[i] for i in sorted(words.keys())])
+            # 跳过缺失的位置
+            return " ".join([word for word in words if word is not None])
         except:
             return ""
 
@@ -224,84 +642,92 @@ class PublicationParser:
             },
             "errors": []
         }
-        self.progress = self.load_progress()
+        # 已处理的staff email(集合查找)
+        self.processed = self.load_processed()
+        self.cache = PublicationCache(CONFIG["cache_file"], CONFIG["cache_memory_size"])
+        self.migrate_progress_file()
         self.fetcher = MultiSourceFetcher(self.stats)
-
-    def load_progress(self) -> Dict:
-        if os.path.exists(CONFIG["progress_file"]):
-            with open(CONFIG["progress_file"], 'r') as f:
-                return json.load(f)
-        return {
-            "processed_staff_emails": [],
-            "publication_cache": {}
-        }
-
-    def save_progress(self):
-        with open(CONFIG["progress_file"], 'w') as f:
-            json.dump(self.progress, f, indent=2)
+        # 在 process_all 中创建
+        self.pool: Optional[ProcessPoolExecutor] = None
+        # 本次运行处理完的staff数(见 staff_worker)
+        self.staff_done = 0
+        # 运行期间打开的已处理日志(见 run);chunks落盘后才写入的email(见 save_progress)
+        self.processed_log = None
+        self.pending_processed: List[str] = []
+
+    def load_processed(self) -> set:
+        """读取已处理日志;重复的行超过一半时压缩重写一次"""
+        processed = set()
+        lines = 0
+        if os.path.exists(CONFIG["processed_log"]):
+            with open(CONFIG["processed_log"], 'r', encoding='utf-8') as f:
+                for line in f:
+                    email = line.strip()
+                    if email:
+                        lines += 1
+                        processed.add(email)
+
+        if lines > 2 * len(processed):
+            self.compact_processed(processed)
+        return processed
+
+    def compact_processed(self, processed: set):
+        """把已处理日志重写为每个email一行(先写临时文件再原子替换)"""
+        tmp_file = CONFIG["processed_log"] + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write("".join(email + "\n" for email in sorted(processed)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, CONFIG["processed_log"])
+
+    def migrate_progress_file(self):
+        """旧版进度文件: publication_cache 迁移到缓存数据库,processed_staff_emails 并入已处理日志,然后删除"""
+        if not os.path.exists(CONFIG["progress_file"]):
+            return
+        with open(CONFIG["progress_file"], 'rb') as f:
+            progress = orjson.loads(f.read())
+
+        if progress.get("publication_cache"):
+            self.cache.put_many(progress["publication_cache"])
+        self.processed.update(progress.get("processed_staff_emails", []))
+        self.compact_processed(self.processed)
+        os.remove(CONFIG["progress_file"])
+
+    def save_progress(self, out_file):
+        """先把已写入的chunks刷到磁盘,再把对应的staff追加到已处理日志"""
+        out_file.flush()
+        os.fsync(out_file.fileno())
+        self.processed_log.write("".join(email + "\n" for email in self.pending_processed))
+        self.processed_log.flush()
+        self.pending_processed.clear()
 
     def save_stats(self):
         self.stats["end_time"] = datetime.now().isoformat()
-        with open(CONFIG["stats_file"], 'w') as f:
-            json.dump(self.stats, f, indent=2, ensure_ascii=False)
-
-    def parse_publication_text(self, pub_text: str, pub_type: str) -> List[Dict]:
-        """解析publication文本"""
-        publications = []
-        # Many "Other" sections actually contain entries like "Conference Papers | 2025".
-        # Instead of relying on the dict key, detect the actual label inside the text.
-        split_pattern = re.compile(r'([A-Za-z][A-Za-z\s/&()\-\']+?)\s\|\s(\d{4})', re.IGNORECASE)
-
-        try:
-            matches = list(split_pattern.finditer(pub_text))
-            for idx, match in enumerate(matches):
-                entry_label = match.group(1).strip()
-                year = match.group(2)
-
-                start = match.end()
-                end = matches[idx + 1].start() if idx + 1 < len(matches) else len(pub_text)
-                content = pub_text[start:end].strip()
-                if not content:
-                    continue
-
-                doi_match = re.search(r'https?://(?:dx\.)?doi\.org/([^\s,]+)', content, re.IGNORECASE)
-                doi = doi_match.group(1) if doi_match else None
-
-                title_match = re.search(r"'([^']+)'", content)
-                title = title_match.group(1) if title_match else None
-
-                if title or doi:
-                    publications.append({
-                        'year': int(year) if year.isdigit() else year,
-                        'title': title,
-                        'doi': doi,
-                        'raw_text': content,
-                        'pub_type': entry_label or pub_type
-                    })
-        except Exception as e:
-            self.stats["errors"].append(f"Parse error: {str(e)}")
-
-        return publications
+        with open(CONFIG["stats_file"], 'wb') as f:
+            f.write(orjson.dumps(self.stats, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
     def create_rag_chunks(self, staff_entry: Dict, publication_data: List[Dict]) -> List[Dict]:
         """创建RAG chunks"""
         chunks = []
+        name, email, school, faculty, role, profile_url = (
+            staff_entry[k] for k in ('full_name', 'email', 'school', 'faculty', 'role', 'profile_url')
+        )
 
         # Person basic chunk
         person_basic = {
-            "chunk_id": f"person_basic_{staff_entry['email']}",
+            "chunk_id": f"person_basic_{email}",
             "chunk_type": "person_basic",
-            "content": f"{staff_entry['full_name']}\n"
-                       f"Position: {staff_entry['role']}\n"
-                       f"School: {staff_entry['school']}\n"
-                       f"Faculty: {staff_entry['faculty']}",
+            "content": f"{name}\n"
+                       f"Position: {role}\n"
+                       f"School: {school}\n"
+                       f"Faculty: {faculty}",
             "metadata": {
-                "person_name": staff_entry['full_name'],
-                "person_email": staff_entry['email'],
-                "role": staff_entry['role'],
-                "school": staff_entry['school'],
-                "faculty": staff_entry['faculty'],
-                "profile_url": staff_entry['profile_url'],
+                "person_name": name,
+                "person_email": email,
+                "role": role,
+                "school": school,
+                "faculty": faculty,
+                "profile_url": profile_url,
             }
         }
         chunks.append(person_basic)
@@ -309,52 +735,59 @@ class PublicationParser:
         # Person biography chunk
         if staff_entry.get('biography'):
             person_bio = {
-                "chunk_id": f"person_bio_{staff_entry['email']}",
+                "chunk_id": f"person_bio_{email}",
                 "chunk_type": "person_biography",
-                "content": f"{staff_entry['full_name']} - Research Profile\n\n"
+                "content": f"{name} - Research Profile\n\n"
                            f"{staff_entry['biography']}\n\n"
                            f"Research Areas: {staff_entry.get('research_text', '')}",
                 "metadata": {
-                    "person_name": staff_entry['full_name'],
-                    "person_email": staff_entry['email'],
-                    "school": staff_entry['school'],
-                    "profile_url": staff_entry['profile_url'],
+                    "person_name": name,
+                    "person_email": email,
+                    "school": school,
+                    "profile_url": profile_url,
                 }
             }
             chunks.append(person_bio)
 
-        # Publication chunks
+        # Publication chunks: 每篇论文共用的staff字段只构建一次
+        staff_meta = {
+            "person_name": name,
+            "person_email": email,
+            "person_profile_url": profile_url,
+            "person_school": school,
+        }
         for pub in publication_data:
             pub_data = pub.get('publication_data', {})
             if 'error' in pub_data:
                 continue
 
-            pub_chunks = self._create_publication_chunks(staff_entry, pub, pub_data)
+            pub_chunks = self._create_publication_chunks(staff_meta, pub, pub_data)
             chunks.extend(pub_chunks)
 
         self.stats["chunks_created"] += len(chunks)
         return chunks
 
-    def _create_publication_chunks(self, staff: Dict, pub: Dict, pub_data: Dict) -> List[Dict]:
-        """创建论文chunks"""
+    def _create_publication_chunks(self, staff_meta: Dict, pub: Dict, pub_data: Dict) -> List[Dict]:
+        """创建论文chunks(staff_meta 见 create_rag_chunks)"""
         chunks = []
 
         title = pub_data.get('title') or pub.get('title', 'Unknown')
-        pub_id = pub.get('doi') or hashlib.md5(title.encode()).hexdigest()
+        pub_id = pub.get('doi') or xxhash.xxh3_64_hexdigest(title.encode())  # 非加密哈希,只用作ID
         year = pub_data.get('publication_year') or pub.get('year')
         abstract = pub_data.get('abstract', '')
         abstract_source = pub_data.get('abstract_source', 'none')
+        venue = pub_data.get('venue')
+        citations = pub_data.get('citations_count', 0)
+        person_name = staff_meta['person_name']
 
+        # title / abstract chunk 共用同一个metadata dict,keywords chunk 复制后再加字段
         base_metadata = {
-            "person_name": staff['full_name'],
-            "person_email": staff['email'],
-            "person_profile_url": staff['profile_url'],
-            "person_school": staff['school'],
+            **staff_meta,
             "pub_title": title,
             "pub_year": year,
             "pub_doi": pub.get('doi'),
-            "pub_venue": pub_data.get('venue'),
-            "citations_count": pub_data.get('citations_count', 0),
+            "pub_venue": venue,
+            "citations_count": citations,
             "is_open_access": pub_data.get('is_open_access', False),
             "has_abstract": bool(abstract),
             "abstract_source": abstract_source,
@@ -369,8 +802,8 @@ class PublicationParser:
             "chunk_type": "publication_title",
             "content": f"Title: {title}\n"
                        f"Authors: {', '.join(author_names[:10])}\n"
-                       f"Published: {pub_data.get('venue')} ({year})\n"
-                       f"Citations: {pub_data.get('citations_count', 0)}",
+                       f"Published: {venue} ({year})\n"
+                       f"Citations: {citations}",
             "metadata": base_metadata
         }
         chunks.append(title_chunk)
@@ -381,7 +814,7 @@ class PublicationParser:
                 "chunk_id": f"pub_abstract_{pub_id}",
                 "chunk_type": "publication_abstract",
                 "content": f"Paper: {title}\n"
-                           f"Author: {staff['full_name']} ({staff['school']})\n"
+                           f"Author: {person_name} ({staff_meta['person_school']})\n"
                            f"Year: {year}\n\n"
                            f"Abstract:\n{abstract}\n\n"
                            f"[Source: {abstract_source}]",
@@ -398,7 +831,7 @@ class PublicationParser:
                     "chunk_id": f"pub_keywords_{pub_id}",
                     "chunk_type": "publication_keywords",
                     "content": f"Paper: {title}\n"
-                               f"Author: {staff['full_name']}\n"
+                               f"Author: {person_name}\n"
                                f"Keywords: {', '.join(keywords)}",
                     "metadata": {**base_metadata, "keywords": keywords}
                 }
@@ -406,100 +839,125 @@ class PublicationParser:
 
         return chunks
 
-    def process_staff(self, staff: Dict) -> List[Dict]:
+    async def process_staff(self, staff: Dict) -> List[Dict]:
         """处理单个staff"""
         email = staff['email']
 
-        if email in self.progress["processed_staff_emails"]:
+        if email in self.processed:
             return []
 
         if not staff.get('profile_details') or not staff['profile_details'].get('publications'):
-            self.progress["processed_staff_emails"].append(email)
+            self.processed.add(email)
             return []
 
-        pubs = staff['profile_details']['publications']
-        staff_pubs = []
-
-        for pub_type, pub_text in pubs.items():
-            parsed = self.parse_publication_text(pub_text, pub_type)
-            staff_pubs.extend(parsed)
+        # 解析publications(CPU)在进程池中进行,事件循环继续处理其他staff的HTTP请求
+        staff_pubs, errors = await asyncio.get_running_loop().run_in_executor(
+            self.pool, parse_staff_publications, staff['profile_details']['publications']
+        )
+        self.stats["errors"].extend(errors)
 
         if not staff_pubs:
-            self.progress["processed_staff_emails"].append(email)
+            self.processed.add(email)
             return []
 
         self.stats["staff_with_publications"] += 1
         self.stats["total_publications_parsed"] += len(staff_pubs)
 
-        # 获取publication数据 (多源)
+        # 获取publication数据 (多源): 未缓存的DOI去重后一次批量获取
+        dois = list(dict.fromkeys(pub['doi'] for pub in staff_pubs if pub.get('doi')))
+        cache = self.cache.get_many(dois)
+        uncached = [doi for doi in dois if doi not in cache]
+        if uncached:
+            fetched = await self.fetcher.fetch_batch(uncached)
+            self.cache.put_many(fetched)
+            cache.update(fetched)
+            for pub_data in fetched.values():
+                if pub_data.get('abstract'):
+                    self.stats["publications_with_abstract"] += 1
+
         for pub in staff_pubs:
             if pub.get('doi'):
                 self.stats["publications_with_doi"] += 1
-
-                # 检查缓存
-                if pub['doi'] in self.progress["publication_cache"]:
-                    pub['publication_data'] = self.progress["publication_cache"][pub['doi']]
-                else:
-                    # 多源获取
-                    pub_data = self.fetcher.fetch_abstract(pub['doi'])
-                    pub['publication_data'] = pub_data
-                    self.progress["publication_cache"][pub['doi']] = pub_data
-
-                    if pub_data.get('abstract'):
-                        self.stats["publications_with_abstract"] += 1
-
-                    sleep(CONFIG["api_delay"])
+                pub['publication_data'] = cache[pub['doi']]
             else:
                 pub['publication_data'] = {"error": "no_doi"}
 
         chunks = self.create_rag_chunks(staff, staff_pubs)
-        self.progress["processed_staff_emails"].append(email)
+        self.processed.add(email)
 
         return chunks
 
+    async def read_staff(self, f, queue: asyncio.Queue):
+        """流式读取staff数据(ijson,内存中只保留队列里的几条),跳过已处理的,同时统计总人数"""
+        seen = set(self.processed)
+        for staff in ijson.items(f, "item", use_float=True):
+            self.stats["total_staff"] += 1
+            # 同一email只处理一次
+            if staff['email'] not in seen:
+                seen.add(staff['email'])
+                await queue.put(staff)
+
+        for _ in range(CONFIG["staff_workers"]):
+            await queue.put(None)
+
+    async def staff_worker(self, queue: asyncio.Queue, out_file):
+        """从队列取staff处理,chunks逐行写入 out_file;每处理10个保存一次进度(chunks先落盘)"""
+        while (staff := await queue.get()) is not None:
+            print(f"\\n[{self.stats['total_staff']} read] {staff['full_name']}")
+
+            chunks = await self.process_staff(staff)
+            # 所有worker在同一个线程里,写入之间没有 await,不会交错
+            out_file.write(b"".join(orjson.dumps(chunk) + b"\n" for chunk in chunks))
+            self.pending_processed.append(staff['email'])
+
+            if chunks:
+                print(f"  ✓ {len(chunks)} chunks")
+
+            self.staff_done += 1
+            if self.staff_done % 10 == 0:
+                self.save_progress(out_file)
+                print(f"  💾 Progress saved")
+
+    async def process_all(self, f, out_file):
+        """边读边处理所有未处理的staff(整个过程共用一个HTTP客户端和进程池),chunks写入 out_file"""
+        queue = asyncio.Queue(maxsize=2 * CONFIG["staff_workers"])
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as self.pool:
+            async with self.fetcher.create_client() as self.fetcher.client:
+                await asyncio.gather(
+                    self.read_staff(f, queue),
+                    *(self.staff_worker(queue, out_file) for _ in range(CONFIG["staff_workers"]))
+                )
+
     def run(self):
         """运行完整流程"""
         print("="*80)
         print("Multi-Source Publication Parser")
         print("="*80)
 
-        with open(CONFIG["input_file"], 'r') as f:
-            staff_data = json.load(f)
-
-        self.stats["total_staff"] = len(staff_data)
-        print(f"\\nTotal staff: {len(staff_data)}")
-        print(f"Already processed: {len(self.progress['processed_staff_emails'])}")
-
-        all_chunks = []
+        print(f"Already processed: {len(self.processed)}")
 
+        interrupted = False
         try:
-            for i, staff in enumerate(staff_data, 1):
-                if staff['email'] in self.progress["processed_staff_emails"]:
-                    continue
-
-                print(f"\\n[{i}/{len(staff_data)}] {staff['full_name']}")
+            # 边读边处理,不把整个文件读进内存;追加模式: 恢复运行时保留之前已写入的chunks和已处理记录
+            with open(CONFIG["input_file"], 'rb') as f, \
+                    open(CONFIG["output_file"], 'ab') as out_file, \
+                    open(CONFIG["processed_log"], 'a', encoding='utf-8') as self.processed_log:
+                try:
+                    asyncio.run(self.process_all(f, out_file))
+                except KeyboardInterrupt:
+                    print("\\n\\n⚠️  Interrupted. Saving...")
+                    interrupted = True
+                self.save_progress(out_file)
+        finally:
+            self.cache.close()
 
-                chunks = self.process_staff(staff)
-                all_chunks.extend(chunks)
-
-                if chunks:
-                    print(f"  ✓ {len(chunks)} chunks")
-
-                if i % 10 == 0:
-                    self.save_progress()
-                    print(f"  💾 Progress saved")
-
-        except KeyboardInterrupt:
-            print("\\n\\n⚠️  Interrupted. Saving...")
-            self.save_progress()
-            self.save_stats()
+        self.save_stats()
+        if interrupted:
             return
 
-        with open(CONFIG["output_file"], 'w') as f:
-            json.dump(all_chunks, f, indent=2, ensure_ascii=False)
+        print(f"\\nTotal staff: {self.stats['total_staff']}")
+        print(f"✓ {self.stats['chunks_created']} chunks written to {CONFIG['output_file']}")
 
-        self.save_progress()
-        self.save_stats()
         self._print_statistics()
 
     def _print_statistics(self):
@@ -2,22 +2,25 @@
 多源版本 V2 - 多线程优化版
 改进:
 1. 修复 PubMed DOI 搜索问题（使用 ID Converter API）
-2. 添加多线程支持
-3. 添加分批保存功能
+2. 异步并发获取(共享 httpx 客户端,全局最多 max_concurrency 个请求,每个API主机最多 max_concurrency_per_host 个)
+3. 添加分批保存功能(chunks边处理边追加到 JSONL,完成后再转成 JSON 数组)
 4. 优化错误处理和重试机制
 
 优先级: OpenAlex > Semantic Scholar > Crossref > PubMed (仅当确认在数据库中)
 """
-import json
+import orjson
 import re
-import requests
-from time import sleep
+import sqlite3
+import time
+import asyncio
+import httpx
+from cachetools import LRUCache
 from typing import List, Dict, Optional
-import hashlib
+from urllib.parse import urlsplit
+from xml.etree import ElementTree
+import xxhash
 import os
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
 import logging
 
 # 配置日志
@@ -35,67 +38,247 @@ logger = logging.getLogger(__name__)
 CONFIG = {
     "input_file": "/Users/z5241339/Documents/unsw_ai_rag/engineering_staff_with_profiles_cleaned.json",
     "output_file": "/Users/z5241339/Documents/unsw_ai_rag/rag_chunks_multisource_v2.json",
+    "chunks_file": "/Users/z5241339/Documents/unsw_ai_rag/rag_chunks_multisource_v2.jsonl",  # 每行一个chunk,边处理边追加
     "progress_file": "/Users/z5241339/Documents/unsw_ai_rag/parsing_progress_multisource_v2.json",
     "stats_file": "/Users/z5241339/Documents/unsw_ai_rag/parsing_statistics_multisource_v2.json",
+    "cache_file": "/Users/z5241339/Documents/unsw_ai_rag/publication_cache_multisource_v2.sqlite",  # DOI -> 多源获取结果
+    "cache_memory_size": 4096,  # 内存中保留最近使用的DOI数
+    "cache_ttl_days": 30,  # 缓存结果超过这个天数后重新获取
+    "negative_cache_ttl_days": 7,  # 没取到abstract的结果(可能是临时失败)超过这个天数后重新获取
     "max_retries": 3,
     "retry_delay": 1.0,
-    "api_delay": 0.1,  # 减少延迟，因为使用多线程
+    "api_delay": 0.1,  # 每个请求完成后占用并发槽位的时间
     "email": "research@unsw.edu.au",
-    "max_workers": 5,  # 并发线程数
-    "batch_save_interval": 5,  # 每处理5个staff保存一次
+    "max_concurrency": 50,  # 同时进行的请求数上限
+    "max_concurrency_per_host": 20,  # 每个API主机同时进行的请求数上限
+    "staff_batch_size": 20,  # 每批staff的DOI合并获取,处理完一批保存一次进度
+    "staff_workers": 4,  # 同时处理的staff批数
 }
 
+# 遇到这些状态码时等待后重试
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 批量接口单次请求的 DOI 数
+OPENALEX_BATCH_SIZE = 50
+SEMANTIC_SCHOLAR_BATCH_SIZE = 500
+# 预印本/数据仓库的DOI前缀(arXiv, Zenodo, figshare, SSRN),PubMed 里不会有,不去查
+NON_PUBMED_DOI_PREFIXES = ("10.48550/", "10.5281/", "10.6084/", "10.2139/")
+
+# publication文本解析和abstract清理用的正则(模块加载时编译一次)
+SPLIT_RE = re.compile(r'([A-Za-z][A-Za-z\s/&()\-\']+?)\s\|\s(\d{4})', re.IGNORECASE)
+DOI_RE = re.compile(r'https?://(?:dx\.)?doi\.org/([^\s,]+)', re.IGNORECASE)
+TITLE_RE = re.compile(r"'([^']+)'")
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+def normalize_doi(doi: Optional[str]) -> str:
+    """DOI统一为小写、去掉 https://doi.org/ 前缀,用于匹配OpenAlex返回结果"""
+    doi = (doi or "").strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "http://dx.doi.org/"):
+        if doi.startswith(prefix):
+            return doi[len(prefix):]
+    return doi
+
+class PublicationCache:
+    """
+    DOI -> 多源获取结果的持久化缓存
+
+    SQLite 按 DOI 存 JSON 和获取时间(WAL 模式,每次写入只涉及新增的行),前面加一层内存LRU;
+    超过 ttl 秒的结果视为未缓存,没有abstract的结果超过 negative_ttl 秒就视为未缓存
+    """
+
+    def __init__(self, path: str, memory_size: int, ttl: float, negative_ttl: float):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS publications "
+            "(doi TEXT PRIMARY KEY, data BLOB NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self.memory = LRUCache(maxsize=memory_size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    def get(self, doi: str) -> Optional[Dict]:
+        """单个DOI的缓存结果,没有时返回 None"""
+        return self.get_many([doi]).get(doi)
+
+    def get_many(self, dois: List[str]) -> Dict[str, Dict]:
+        """返回已缓存且未过期的DOI的结果(其他的不在结果里)"""
+        found = {}
+        missing = []
+        for doi in dois:
+            data = self.memory.get(doi)
+            if data is None:
+                missing.append(doi)
+            else:
+                found[doi] = data
+
+        # 分批查询,避免超过 SQLite 参数个数上限
+        now = time.time()
+        min_fetched_at = now - self.ttl
+        min_negative_fetched_at = now - self.negative_ttl
+        for i in range(0, len(missing), 500):
+            batch = missing[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT doi, data, fetched_at FROM publications WHERE doi IN ({','.join('?' * len(batch))}) "
+                f"AND fetched_at >= ?",
+                batch + [min_fetched_at]
+            )
+            for doi, data, fetched_at in rows:
+                data = orjson.loads(data)
+                if not data.get('abstract') and fetched_at < min_negative_fetched_at:
+                    continue
+                found[doi] = self.memory[doi] = data
+
+        return found
+
+    def put_many(self, results: Dict[str, Dict]):
+        """写入(覆盖)一批结果"""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO publications (doi, data, fetched_at) VALUES (?, ?, ?)",
+            [(doi, orjson.dumps(data), now) for doi, data in results.items()]
+        )
+        self.conn.commit()
+        self.memory.update(results)
+
+    def close(self):
+        self.conn.close()
+
 class MultiSourceFetcher:
-    """多源Abstract获取器 - 线程安全版本"""
+    """多源Abstract获取器 - 异步版本"""
 
-    def __init__(self, stats_tracker, stats_lock):
+    def __init__(self, stats_tracker):
         self.stats = stats_tracker
-        self.stats_lock = stats_lock
+        # 在事件循环中创建(见 create_client)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.limit: Optional[asyncio.Semaphore] = None
+        # 主机名 -> 并发上限
+        self.host_limits: Dict[str, asyncio.Semaphore] = {}
+        # 本次运行中在 PubMed 取到过abstract的DOI前缀(如 10.1016),见 should_try_pubmed
+        self.pubmed_prefixes = set()
+
+    def create_client(self) -> httpx.AsyncClient:
+        """
+        创建共享的异步HTTP客户端
+
+        keep-alive 连接在请求间复用;与 requests 一样跟随重定向;连接失败由传输层重试
+        """
+        self.limit = asyncio.Semaphore(CONFIG["max_concurrency"])
+        self.host_limits = {}
+        limits = httpx.Limits(
+            max_connections=2 * CONFIG["max_concurrency"],
+            max_keepalive_connections=CONFIG["max_concurrency"]
+        )
+        return httpx.AsyncClient(
+            headers={"User-Agent": f"mailto:{CONFIG['email']}"},
+            timeout=15,
+            follow_redirects=True,
+            transport=httpx.AsyncHTTPTransport(retries=CONFIG["max_retries"], limits=limits)
+        )
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """GET请求(见 request)"""
+        return await self.request("GET", url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        限制并发的HTTP请求(全局 + 按主机),429/5xx 按 retry_delay 指数退避后重试
 
-    def fetch_abstract(self, doi: str) -> Dict:
+        重试用完后返回最后一次响应,由调用方按非200处理
+        """
+        host = urlsplit(url).hostname
+        semaphore = self.host_limits.get(host)
+        if semaphore is None:
+            semaphore = self.host_limits[host] = asyncio.Semaphore(CONFIG["max_concurrency_per_host"])
+        for attempt in range(CONFIG["max_retries"] + 1):
+            async with self.limit, semaphore:
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                finally:
+                    await asyncio.sleep(CONFIG["api_delay"])
+            if response.status_code not in RETRY_STATUS or attempt == CONFIG["max_retries"]:
+                return response
+            await asyncio.sleep(CONFIG["retry_delay"] * 2 ** attempt)
+
+    async def fetch_batch(self, dois: List[str]) -> Dict[str, Dict]:
+        """
+        批量获取多篇论文,返回 DOI -> fetch_abstract 的结果
+
+        OpenAlex 每 50 个 DOI 合并成一次 filter 请求,Semantic Scholar 每 500 个一次 POST /paper/batch,
+        所有请求并发发出。OpenAlex 批量结果中缺失的 DOI(以及含 "," / "|" 的DOI)、
+        批量请求失败的 DOI 才回退到单篇查询;Crossref / PubMed 没有批量接口,仍逐篇查询
+        """
+        batchable = [doi for doi in dois if "," not in doi and "|" not in doi]
+        openalex_chunks, s2_chunks = await asyncio.gather(
+            asyncio.gather(*(
+                self._fetch_openalex_chunk(batchable[i:i + OPENALEX_BATCH_SIZE])
+                for i in range(0, len(batchable), OPENALEX_BATCH_SIZE)
+            )),
+            asyncio.gather(*(
+                self._fetch_semantic_scholar_chunk(dois[i:i + SEMANTIC_SCHOLAR_BATCH_SIZE])
+                for i in range(0, len(dois), SEMANTIC_SCHOLAR_BATCH_SIZE)
+            )),
+        )
+        openalex_results = {doi: r for chunk in openalex_chunks for doi, r in chunk.items()}
+        s2_results = {doi: r for chunk in s2_chunks for doi, r in chunk.items()}
+
+        results = await asyncio.gather(*(
+            self.fetch_abstract(doi, openalex_results, s2_results) for doi in dois
+        ))
+        return dict(zip(dois, results))
+
+    async def fetch_abstract(self, doi: str, openalex_results: Optional[Dict[str, Dict]] = None,
+                             s2_results: Optional[Dict[str, Optional[str]]] = None) -> Dict:
         """
         按优先级尝试多个源获取abstract
+        openalex_results / s2_results 是 fetch_batch 已批量取到的结果,其中没有的DOI再单独请求
         返回: {abstract, source, ...其他metadata}
         """
         if not doi:
             return {"error": "no_doi"}
 
         # 1. OpenAlex (优先,数据最全)
-        result = self._fetch_openalex(doi)
+        if openalex_results and doi in openalex_results:
+            result = openalex_results[doi]
+        else:
+            result = await self._fetch_openalex(doi)
         if result and result.get('abstract'):
             result['abstract_source'] = 'OpenAlex'
-            with self.stats_lock:
-                self.stats['abstract_sources']['openalex'] += 1
+            self.stats['abstract_sources']['openalex'] += 1
             return result
 
         # 保存OpenAlex的metadata (即使没有abstract)
         base_data = result if result and 'error' not in result else {}
 
         # 2. Semantic Scholar (高质量abstract + TLDR)
-        abstract = self._fetch_semantic_scholar(doi)
+        if s2_results and doi in s2_results:
+            abstract = s2_results[doi]
+        else:
+            abstract = await self._fetch_semantic_scholar(doi)
         if abstract:
             base_data['abstract'] = abstract
             base_data['abstract_source'] = 'Semantic Scholar'
-            with self.stats_lock:
-                self.stats['abstract_sources']['semantic_scholar'] += 1
+            self.stats['abstract_sources']['semantic_scholar'] += 1
             return base_data
 
         # 3. Crossref
-        abstract = self._fetch_crossref(doi)
+        abstract = await self._fetch_crossref(doi)
         if abstract:
             base_data['abstract'] = abstract
             base_data['abstract_source'] = 'Crossref'
-            with self.stats_lock:
-                self.stats['abstract_sources']['crossref'] += 1
+            self.stats['abstract_sources']['crossref'] += 1
             return base_data
 
         # 4. PubMed (使用正确的 ID Converter API)
-        abstract = self._fetch_pubmed_correct(doi)
+        if self.should_try_pubmed(doi, base_data):
+            abstract = await self._fetch_pubmed_correct(doi)
+        else:
+            abstract = None
         if abstract:
+            self.pubmed_prefixes.add(doi.split('/', 1)[0])
             base_data['abstract'] = abstract
             base_data['abstract_source'] = 'PubMed'
-            with self.stats_lock:
-                self.stats['abstract_sources']['pubmed'] += 1
+            self.stats['abstract_sources']['pubmed'] += 1
             return base_data
 
         # 如果都没有abstract,返回OpenAlex的数据
@@ -103,81 +286,157 @@ class MultiSourceFetcher:
             base_data['abstract_source'] = 'none'
         return base_data if base_data else {"error": "not_found"}
 
-    def _fetch_openalex(self, doi: str) -> Optional[Dict]:
+    def should_try_pubmed(self, doi: str, openalex_data: Dict) -> bool:
+        """
+        PubMed 是最慢的一步(ID Converter + efetch 两次请求),明显不可能命中时跳过:
+        - 预印本/数据仓库的DOI
+        - OpenAlex 没有记录(或只有没有类型和概念的空壳记录)的DOI,
+          除非同一前缀的DOI本次运行中已经在 PubMed 取到过abstract
+        """
+        if doi.lower().startswith(NON_PUBMED_DOI_PREFIXES):
+            return False
+        if openalex_data.get('type') not in (None, 'other') or openalex_data.get('concepts'):
+            return True
+        return doi.split('/', 1)[0] in self.pubmed_prefixes
+
+    def _parse_openalex_work(self, data: Dict) -> Dict:
+        """从OpenAlex work对象中提取需要的字段"""
+        abstract = self._invert_abstract_index(data.get("abstract_inverted_index"))
+
+        return {
+            "title": data.get("title"),
+            "abstract": abstract,
+            "publication_year": data.get("publication_year"),
+            "authors": [
+                {"name": a.get("author", {}).get("display_name")}
+                for a in data.get("authorships", [])
+            ],
+            # primary_location / source 可能是 null
+            "venue": ((data.get("primary_location") or {}).get("source") or {}).get("display_name"),
+            "citations_count": data.get("cited_by_count", 0),
+            "is_open_access": data.get("open_access", {}).get("is_oa", False),
+            "pdf_url": data.get("open_access", {}).get("oa_url"),
+            "concepts": [
+                {"name": c.get("display_name"), "score": c.get("score", 0)}
+                for c in data.get("concepts", [])[:20]
+            ],
+            "type": data.get("type"),
+        }
+
+    async def _fetch_openalex_chunk(self, dois: List[str]) -> Dict[str, Dict]:
+        """用 filter=doi:<d1>|<d2>|... 一次请求获取最多 OPENALEX_BATCH_SIZE 篇论文,只返回找到的"""
+        try:
+            response = await self.get(
+                "https://api.openalex.org/works",
+                params={"filter": "doi:" + "|".join(dois), "per-page": OPENALEX_BATCH_SIZE},
+                timeout=30
+            )
+            if response.status_code != 200:
+                return {}
+            works = {
+                normalize_doi(work.get("doi")): work
+                for work in orjson.loads(response.content).get("results", [])
+            }
+        except Exception as e:
+            self.stats['errors'].append(f"OpenAlex batch error: {str(e)}")
+            return {}
+
+        results = {}
+        for doi in dois:
+            work = works.get(normalize_doi(doi))
+            if not work:
+                continue
+            # 解析失败的不放进结果,由 fetch_abstract 逐篇查询
+            try:
+                results[doi] = self._parse_openalex_work(work)
+            except Exception as e:
+                self.stats['errors'].append(f"OpenAlex parse error for {doi}: {str(e)}")
+        return results
+
+    async def _fetch_openalex(self, doi: str) -> Optional[Dict]:
         """从OpenAlex获取"""
         url = f"https://api.openalex.org/works/https://doi.org/{doi}"
-        headers = {"User-Agent": f"mailto:{CONFIG['email']}"}
 
         try:
-            response = requests.get(url, headers=headers, timeout=15)
+            response = await self.get(url, timeout=15)
             if response.status_code == 200:
-                data = response.json()
-                abstract = self._invert_abstract_index(data.get("abstract_inverted_index"))
-
-                return {
-                    "title": data.get("title"),
-                    "abstract": abstract,
-                    "publication_year": data.get("publication_year"),
-                    "authors": [
-                        {"name": a.get("author", {}).get("display_name")}
-                        for a in data.get("authorships", [])
-                    ],
-                    "venue": data.get("primary_location", {}).get("source", {}).get("display_name"),
-                    "citations_count": data.get("cited_by_count", 0),
-                    "is_open_access": data.get("open_access", {}).get("is_oa", False),
-                    "pdf_url": data.get("open_access", {}).get("oa_url"),
-                    "concepts": [
-                        {"name": c.get("display_name"), "score": c.get("score", 0)}
-                        for c in data.get("concepts", [])[:20]
-                    ],
-                    "type": data.get("type"),
-                }
+                return self._parse_openalex_work(orjson.loads(response.content))
             return None
         except Exception as e:
-            with self.stats_lock:
-                self.stats['errors'].append(f"OpenAlex error for {doi}: {str(e)}")
+            self.stats['errors'].append(f"OpenAlex error for {doi}: {str(e)}")
+            return None
+
+    def _semantic_scholar_abstract(self, data: Optional[Dict]) -> Optional[str]:
+        """从Semantic Scholar paper对象中取abstract,没有时用TLDR"""
+        if not data:
             return None
+        # 优先用abstract,其次用TLDR
+        abstract = data.get('abstract')
+        if abstract:
+            return abstract
+        # TLDR是AI生成的摘要,也很有价值
+        tldr = data.get('tldr', {}).get('text') if data.get('tldr') else None
+        if tldr:
+            return f"[TLDR] {tldr}"
+        return None
+
+    async def _fetch_semantic_scholar_chunk(self, dois: List[str]) -> Dict[str, Optional[str]]:
+        """
+        POST /paper/batch 一次获取最多 SEMANTIC_SCHOLAR_BATCH_SIZE 篇论文的abstract
 
-    def _fetch_semantic_scholar(self, doi: str) -> Optional[str]:
+        结果与请求的 ids 按位置一一对应(找不到的为 null),所以请求成功时每个DOI都有答案;
+        请求失败时返回空,由 fetch_abstract 逐篇查询
+        """
+        try:
+            response = await self.request(
+                "POST",
+                "https://api.semanticscholar.org/graph/v1/paper/batch",
+                params={"fields": "abstract,tldr"},
+                content=orjson.dumps({"ids": [f"DOI:{doi}" for doi in dois]}),
+                headers={"Content-Type": "application/json"},
+                timeout=30
+            )
+            if response.status_code != 200:
+                return {}
+            papers = orjson.loads(response.content)
+        except Exception as e:
+            self.stats['errors'].append(f"Semantic Scholar batch error: {str(e)}")
+            return {}
+
+        return {doi: self._semantic_scholar_abstract(paper) for doi, paper in zip(dois, papers)}
+
+    async def _fetch_semantic_scholar(self, doi: str) -> Optional[str]:
         """从Semantic Scholar获取abstract"""
         url = f"https://api.semanticscholar.org/graph/v1/paper/DOI:{doi}"
         params = {"fields": "abstract,tldr"}
 
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.get(url, params=params, timeout=10)
             if response.status_code == 200:
-                data = response.json()
-                # 优先用abstract,其次用TLDR
-                abstract = data.get('abstract')
-                if abstract:
-                    return abstract
-                # TLDR是AI生成的摘要,也很有价值
-                tldr = data.get('tldr', {}).get('text') if data.get('tldr') else None
-                if tldr:
-                    return f"[TLDR] {tldr}"
+                return self._semantic_scholar_abstract(orjson.loads(response.content))
             return None
-        except:
+        except Exception:
             return None
 
-    def _fetch_crossref(self, doi: str) -> Optional[str]:
+    async def _fetch_crossref(self, doi: str) -> Optional[str]:
         """从Crossref获取abstract"""
         url = f"https://api.crossref.org/works/{doi}"
 
         try:
-            response = requests.get(url, timeout=10)
+            response = await self.get(url, timeout=10)
             if response.status_code == 200:
-                data = response.json()['message']
+                data = orjson.loads(response.content)['message']
                 abstract = data.get('abstract', '')
                 if abstract:
                     # 清理HTML标签
-                    abstract = re.sub(r'<[^>]+>', '', abstract)
+                    abstract = HTML_TAG_RE.sub('', abstract)
                     abstract = abstract.strip()
                     return abstract if abstract else None
             return None
-        except:
+        except Exception:
             return None
 
-    def _fetch_pubmed_correct(self, doi: str) -> Optional[str]:
+    async def _fetch_pubmed_correct(self, doi: str) -> Optional[str]:
         """
         从PubMed获取abstract - 使用正确的 ID Converter API
 
@@ -194,11 +453,11 @@ class MultiSourceFetcher:
                 "format": "json"
             }
 
-            response = requests.get(converter_url, params=params, timeout=10)
+            response = await self.get(converter_url, params=params, timeout=10)
             if response.status_code != 200:
                 return None
 
-            data = response.json()
+            data = orjson.loads(response.content)
             records = data.get('records', [])
 
             # 检查是否找到有效的 PMID
@@ -208,7 +467,7 @@ class MultiSourceFetcher:
             pmid = records[0].get('pmid')
 
             # 步骤2: 使用 PMID 获取 abstract
-            sleep(0.2)  # PubMed 要求延迟
+            await asyncio.sleep(0.2)  # PubMed 要求延迟
 
             fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
             params = {
@@ -217,22 +476,24 @@ class MultiSourceFetcher:
                 "retmode": "xml"
             }
 
-            response = requests.get(fetch_url, params=params, timeout=10)
+            response = await self.get(fetch_url, params=params, timeout=10)
             if response.status_code != 200:
                 return None
 
-            # 提取 abstract 文本
-            match = re.search(r'<AbstractText[^>]*>(.*?)</AbstractText>',
-                            response.text, re.DOTALL)
-            if match:
-                abstract = match.group(1).strip()
-                # 清理XML实体
-                abstract = re.sub(r'&lt;', '<', abstract)
-                abstract = re.sub(r'&gt;', '>', abstract)
-                abstract = re.sub(r'&amp;', '&', abstract)
-                return abstract
-
-            return None
+            # 提取 abstract 文本: 分段的abstract每段一个 AbstractText,保留 Label(BACKGROUND / METHODS ...);
+            # 只取 Article/Abstract,不混入 OtherAbstract(其他语言版本等)
+            # itertext 包含段内 <i>/<sup> 等标签里的文字,实体由XML解析器处理
+            root = ElementTree.fromstring(response.content)
+            abstract_element = root.find('.//Article/Abstract')
+            if abstract_element is None:
+                return None
+            parts = []
+            for node in abstract_element.iter('AbstractText'):
+                text = "".join(node.itertext()).strip()
+                if text:
+                    label = node.get('Label')
+                    parts.append(f"{label}: {text}" if label else text)
+            return "\n".join(parts) if parts else None
 
         except Exception as e:
             logger.debug(f"PubMed fetch failed for {doi}: {e}")
@@ -243,12 +504,15 @@ class MultiSourceFetcher:
         if not inverted_index:
             return ""
         try:
-            words = {}
+            # 位置基本是连续的 0..N-1,直接预分配列表按下标填充,不需要 dict + 排序
+            length = 1 + max((max(positions) for positions in inverted_index.values() if positions), default=-1)
+            words = [None] * length
             for word, positions in inverted_index.items():
                 for pos in positions:
                     words[pos] = word
-            return " ".join([words[i] for i in sorted(words.keys())])
-        except:
+            # 跳过缺失的位置
+            return " ".join([word for word in words if word is not None])
+        except Exception:
             return ""
 
 class PublicationParser:
@@ -273,38 +537,44 @@ class PublicationParser:
             },
             "errors": []
         }
-        self.stats_lock = Lock()
-        self.progress_lock = Lock()
         self.progress = self.load_progress()
-        self.fetcher = MultiSourceFetcher(self.stats, self.stats_lock)
+        # 已处理的staff email(集合查找,保存时写回排序后的列表)
+        self.processed = set(self.progress["processed_staff_emails"])
+        self.cache = PublicationCache(
+            CONFIG["cache_file"], CONFIG["cache_memory_size"],
+            CONFIG["cache_ttl_days"] * 86400, CONFIG["negative_cache_ttl_days"] * 86400
+        )
+        # 旧版进度文件里的 publication_cache 迁移到缓存数据库
+        legacy = self.progress.pop("publication_cache", None)
+        if legacy:
+            self.cache.put_many(legacy)
+            self.save_progress()
+        self.fetcher = MultiSourceFetcher(self.stats)
 
     def load_progress(self) -> Dict:
         if os.path.exists(CONFIG["progress_file"]):
-            with open(CONFIG["progress_file"], 'r') as f:
-                return json.load(f)
+            with open(CONFIG["progress_file"], 'rb') as f:
+                return orjson.loads(f.read())
         return {
-            "processed_staff_emails": [],
-            "publication_cache": {}
+            "processed_staff_emails": []
         }
 
     def save_progress(self):
-        with self.progress_lock:
-            with open(CONFIG["progress_file"], 'w') as f:
-                json.dump(self.progress, f, indent=2)
+        self.progress["processed_staff_emails"] = sorted(self.processed)
+        with open(CONFIG["progress_file"], 'wb') as f:
+            f.write(orjson.dumps(self.progress, option=orjson.OPT_INDENT_2))
 
     def save_stats(self):
-        with self.stats_lock:
-            self.stats["end_time"] = datetime.now().isoformat()
-            with open(CONFIG["stats_file"], 'w') as f:
-                json.dump(self.stats, f, indent=2, ensure_ascii=False)
+        self.stats["end_time"] = datetime.now().isoformat()
+        with open(CONFIG["stats_file"], 'wb') as f:
+            f.write(orjson.dumps(self.stats, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
     def parse_publication_text(self, pub_text: str, pub_type: str) -> List[Dict]:
         """解析publication文本"""
         publications = []
-        split_pattern = re.compile(r'([A-Za-z][A-Za-z\s/&()\-\']+?)\s\|\s(\d{4})', re.IGNORECASE)
 
         try:
-            matches = list(split_pattern.finditer(pub_text))
+            matches = list(SPLIT_RE.finditer(pub_text))
             for idx, match in enumerate(matches):
                 entry_label = match.group(1).strip()
                 year = match.group(2)
@@ -315,10 +585,10 @@ class PublicationParser:
                 if not content:
                     continue
 
-                doi_match = re.search(r'https?://(?:dx\.)?doi\.org/([^\s,]+)', content, re.IGNORECASE)
+                doi_match = DOI_RE.search(content)
                 doi = doi_match.group(1) if doi_match else None
 
-                title_match = re.search(r"'([^']+)'", content)
+                title_match = TITLE_RE.search(content)
                 title = title_match.group(1) if title_match else None
 
                 if title or doi:
@@ -330,8 +600,7 @@ class PublicationParser:
                         'pub_type': entry_label or pub_type
                     })
         except Exception as e:
-            with self.stats_lock:
-                self.stats["errors"].append(f"Parse error: {str(e)}")
+            self.stats["errors"].append(f"Parse error: {str(e)}")
 
         return publications
 
@@ -384,8 +653,7 @@ class PublicationParser:
             pub_chunks = self._create_publication_chunks(staff_entry, pub, pub_data)
             chunks.extend(pub_chunks)
 
-        with self.stats_lock:
-            self.stats["chunks_created"] += len(chunks)
+        self.stats["chunks_created"] += len(chunks)
         return chunks
 
     def _create_publication_chunks(self, staff: Dict, pub: Dict, pub_data: Dict) -> List[Dict]:
@@ -393,21 +661,26 @@ class PublicationParser:
         chunks = []
 
         title = pub_data.get('title') or pub.get('title', 'Unknown')
-        pub_id = pub.get('doi') or hashlib.md5(title.encode()).hexdigest()
+        doi = pub.get('doi')
+        pub_id = doi or xxhash.xxh3_64_hexdigest(title.encode())  # 非加密哈希,只用作ID
         year = pub_data.get('publication_year') or pub.get('year')
         abstract = pub_data.get('abstract', '')
         abstract_source = pub_data.get('abstract_source', 'none')
+        venue = pub_data.get('venue')
+        citations_count = pub_data.get('citations_count', 0)
+        full_name = staff['full_name']
 
+        # 三种chunk共用同一个metadata对象(只有keywords chunk需要加字段,另外复制)
         base_metadata = {
-            "person_name": staff['full_name'],
+            "person_name": full_name,
             "person_email": staff['email'],
             "person_profile_url": staff['profile_url'],
             "person_school": staff['school'],
             "pub_title": title,
             "pub_year": year,
-            "pub_doi": pub.get('doi'),
-            "pub_venue": pub_data.get('venue'),
-            "citations_count": pub_data.get('citations_count', 0),
+            "pub_doi": doi,
+            "pub_venue": venue,
+            "citations_count": citations_count,
             "is_open_access": pub_data.get('is_open_access', False),
             "has_abstract": bool(abstract),
             "abstract_source": abstract_source,
@@ -415,15 +688,15 @@ class PublicationParser:
 
         # Title chunk
         authors = pub_data.get('authors', [])
-        author_names = [a['name'] for a in authors if a.get('name')]
+        author_str = ", ".join([a['name'] for a in authors if a.get('name')][:10])
 
         title_chunk = {
             "chunk_id": f"pub_title_{pub_id}",
             "chunk_type": "publication_title",
             "content": f"Title: {title}\n"
-                       f"Authors: {', '.join(author_names[:10])}\n"
-                       f"Published: {pub_data.get('venue')} ({year})\n"
-                       f"Citations: {pub_data.get('citations_count', 0)}",
+                       f"Authors: {author_str}\n"
+                       f"Published: {venue} ({year})\n"
+                       f"Citations: {citations_count}",
             "metadata": base_metadata
         }
         chunks.append(title_chunk)
@@ -434,7 +707,7 @@ class PublicationParser:
                 "chunk_id": f"pub_abstract_{pub_id}",
                 "chunk_type": "publication_abstract",
                 "content": f"Paper: {title}\n"
-                           f"Author: {staff['full_name']} ({staff['school']})\n"
+                           f"Author: {full_name} ({staff['school']})\n"
                            f"Year: {year}\n\n"
                            f"Abstract:\n{abstract}\n\n"
                            f"[Source: {abstract_source}]",
@@ -451,7 +724,7 @@ class PublicationParser:
                     "chunk_id": f"pub_keywords_{pub_id}",
                     "chunk_type": "publication_keywords",
                     "content": f"Paper: {title}\n"
-                               f"Author: {staff['full_name']}\n"
+                               f"Author: {full_name}\n"
                                f"Keywords: {', '.join(keywords)}",
                     "metadata": {**base_metadata, "keywords": keywords}
                 }
@@ -459,22 +732,19 @@ class PublicationParser:
 
         return chunks
 
-    def process_single_publication(self, pub: Dict) -> Dict:
-        """处理单个出版物 - 线程安全版本"""
+    async def process_single_publication(self, pub: Dict) -> Dict:
+        """处理单个出版物(请求间隔由 fetcher 的并发槽位控制)"""
         if pub.get('doi'):
             # 检查缓存
-            with self.progress_lock:
-                if pub['doi'] in self.progress["publication_cache"]:
-                    return self.progress["publication_cache"][pub['doi']]
+            cached = self.cache.get(pub['doi'])
+            if cached is not None:
+                return cached
 
             # 多源获取
-            pub_data = self.fetcher.fetch_abstract(pub['doi'])
+            pub_data = await self.fetcher.fetch_abstract(pub['doi'])
 
             # 更新缓存
-            with self.progress_lock:
-                self.progress["publication_cache"][pub['doi']] = pub_data
-
-            sleep(CONFIG["api_delay"])
+            self.cache.put_many({pub['doi']: pub_data})
             return pub_data
         else:
             # 无 DOI：保留基本信息，至少创建 title chunk
@@ -493,17 +763,15 @@ class PublicationParser:
             }
             return pub_data
 
-    def process_staff(self, staff: Dict) -> List[Dict]:
-        """处理单个staff"""
+    def parse_staff(self, staff: Dict) -> List[Dict]:
+        """解析单个staff的publications;没有可处理的publication时直接记为已处理,返回空列表"""
         email = staff['email']
 
-        with self.progress_lock:
-            if email in self.progress["processed_staff_emails"]:
-                return []
+        if email in self.processed:
+            return []
 
         if not staff.get('profile_details') or not staff['profile_details'].get('publications'):
-            with self.progress_lock:
-                self.progress["processed_staff_emails"].append(email)
+            self.processed.add(email)
             return []
 
         pubs = staff['profile_details']['publications']
@@ -514,101 +782,155 @@ class PublicationParser:
             staff_pubs.extend(parsed)
 
         if not staff_pubs:
-            with self.progress_lock:
-                self.progress["processed_staff_emails"].append(email)
+            self.processed.add(email)
             return []
 
-        with self.stats_lock:
-            self.stats["staff_with_publications"] += 1
-            self.stats["total_publications_parsed"] += len(staff_pubs)
-            doi_count = sum(1 for p in staff_pubs if p.get('doi'))
-            no_doi_count = len(staff_pubs) - doi_count
-            self.stats["publications_with_doi"] += doi_count
-            self.stats["publications_without_doi"] += no_doi_count
-
-        # 使用线程池处理出版物
-        with ThreadPoolExecutor(max_workers=CONFIG["max_workers"]) as executor:
-            future_to_pub = {
-                executor.submit(self.process_single_publication, pub): pub
-                for pub in staff_pubs
-            }
-
-            for future in as_completed(future_to_pub):
-                pub = future_to_pub[future]
-                try:
-                    pub_data = future.result()
-                    pub['publication_data'] = pub_data
-
-                    if pub_data.get('abstract'):
-                        with self.stats_lock:
-                            self.stats["publications_with_abstract"] += 1
-                except Exception as e:
-                    logger.error(f"Error processing publication: {e}")
-                    pub['publication_data'] = {"error": str(e)}
+        self.stats["staff_with_publications"] += 1
+        self.stats["total_publications_parsed"] += len(staff_pubs)
+        doi_count = sum(1 for p in staff_pubs if p.get('doi'))
+        no_doi_count = len(staff_pubs) - doi_count
+        self.stats["publications_with_doi"] += doi_count
+        self.stats["publications_without_doi"] += no_doi_count
+
+        return staff_pubs
+
+    async def prefetch_publications(self, batch_pubs: List[List[Dict]]):
+        """一批staff中未缓存的DOI合并去重后一次批量获取并写入缓存,之后逐篇处理时直接命中缓存"""
+        dois = list(dict.fromkeys(
+            pub['doi'] for staff_pubs in batch_pubs for pub in staff_pubs if pub.get('doi')
+        ))
+        cached = self.cache.get_many(dois)
+        uncached = [doi for doi in dois if doi not in cached]
+        if uncached:
+            self.cache.put_many(await self.fetcher.fetch_batch(uncached))
+
+    async def process_staff(self, staff: Dict, staff_pubs: List[Dict]) -> List[Dict]:
+        """处理单个staff(staff_pubs 由 parse_staff 解析,DOI已由 prefetch_publications 预取)"""
+        # 并发处理出版物(并发数由 fetcher 的信号量限制)
+        results = await asyncio.gather(
+            *(self.process_single_publication(pub) for pub in staff_pubs),
+            return_exceptions=True
+        )
+        for pub, pub_data in zip(staff_pubs, results):
+            if isinstance(pub_data, Exception):
+                logger.error(f"Error processing publication: {pub_data}")
+                pub['publication_data'] = {"error": str(pub_data)}
+                continue
+            pub['publication_data'] = pub_data
+
+            if pub_data.get('abstract'):
+                self.stats["publications_with_abstract"] += 1
 
         chunks = self.create_rag_chunks(staff, staff_pubs)
 
-        with self.progress_lock:
-            self.progress["processed_staff_emails"].append(email)
+        self.processed.add(staff['email'])
 
         return chunks
 
+    async def batch_worker(self, queue: asyncio.Queue, total: int, out_file):
+        """
+        从队列取一批staff处理,chunks逐行写入 out_file;每批处理完保存一次进度(chunks先落盘)
+
+        一批staff的DOI一起预取,批量接口的请求能装满,也不会只剩一个staff的几篇论文在等待
+        """
+        while (item := await queue.get()) is not None:
+            start, staff_batch = item
+            logger.info(f"\n[{start + 1}-{start + len(staff_batch)}/{total}] "
+                        f"Processing {len(staff_batch)} staff")
+
+            batch_pubs = [self.parse_staff(staff) for staff in staff_batch]
+            await self.prefetch_publications(batch_pubs)
+
+            for staff, staff_pubs in zip(staff_batch, batch_pubs):
+                if not staff_pubs:
+                    continue
+                chunks = await self.process_staff(staff, staff_pubs)
+                # 所有worker在同一个线程里,process_staff 标记已处理和写入之间没有 await,不会交错
+                out_file.write(b"".join(orjson.dumps(chunk) + b"\n" for chunk in chunks))
+                logger.info(f"  ✓ {staff['full_name']}: {len(chunks)} chunks created")
+
+            out_file.flush()
+            self.save_progress()
+            self.save_stats()
+            logger.info(f"  💾 Progress saved (staff {start + 1}-{start + len(staff_batch)})")
+
+    async def process_all(self, pending_staff: List[Dict], out_file):
+        """
+        按 staff_batch_size 分批处理staff,staff_workers 批同时进行(整个过程共用一个HTTP客户端),
+        chunks逐行写入 out_file;一批在等最慢的几篇论文时,其他批的请求继续进行
+        """
+        batch_size = CONFIG["staff_batch_size"]
+        queue = asyncio.Queue()
+        for start in range(0, len(pending_staff), batch_size):
+            queue.put_nowait((start, pending_staff[start:start + batch_size]))
+        for _ in range(CONFIG["staff_workers"]):
+            queue.put_nowait(None)
+
+        async with self.fetcher.create_client() as self.fetcher.client:
+            await asyncio.gather(*(
+                self.batch_worker(queue, len(pending_staff), out_file)
+                for _ in range(CONFIG["staff_workers"])
+            ))
+
     def run(self):
-        """运行完整流程 - 多线程版本"""
+        """运行完整流程 - 异步版本"""
         logger.info("="*80)
-        logger.info("Multi-Source Publication Parser V2 (Multi-threaded)")
+        logger.info("Multi-Source Publication Parser V2 (Async)")
         logger.info("="*80)
 
-        with open(CONFIG["input_file"], 'r') as f:
-            staff_data = json.load(f)
+        with open(CONFIG["input_file"], 'rb') as f:
+            staff_data = orjson.loads(f.read())
 
         self.stats["total_staff"] = len(staff_data)
         logger.info(f"\nTotal staff: {len(staff_data)}")
-        logger.info(f"Already processed: {len(self.progress['processed_staff_emails'])}")
-        logger.info(f"Max workers: {CONFIG['max_workers']}")
-
-        # 过滤未处理的staff
-        pending_staff = [
-            s for s in staff_data
-            if s['email'] not in self.progress["processed_staff_emails"]
-        ]
+        logger.info(f"Already processed: {len(self.processed)}")
+        logger.info(f"Max concurrency: {CONFIG['max_concurrency']}, staff workers: {CONFIG['staff_workers']}")
+
+        # 过滤未处理的staff(同一email只处理一次: 同一批里的重复staff不能靠 self.processed 去重)
+        seen = set(self.processed)
+        pending_staff = []
+        for s in staff_data:
+            if s['email'] not in seen:
+                seen.add(s['email'])
+                pending_staff.append(s)
         logger.info(f"Pending staff: {len(pending_staff)}")
 
-        all_chunks = []
-        processed_count = 0
-
         try:
-            # 使用线程池处理 staff（但控制并发数）
-            for i, staff in enumerate(pending_staff, 1):
-                logger.info(f"\n[{i}/{len(pending_staff)}] Processing {staff['full_name']}")
-
-                chunks = self.process_staff(staff)
-                all_chunks.extend(chunks)
-                processed_count += 1
-
-                if chunks:
-                    logger.info(f"  ✓ {len(chunks)} chunks created")
-
-                # 定期保存
-                if processed_count % CONFIG["batch_save_interval"] == 0:
-                    self.save_progress()
-                    self.save_stats()
-                    logger.info(f"  💾 Progress saved (batch {processed_count // CONFIG['batch_save_interval']})")
+            # 追加模式: 恢复运行时保留之前已写入的chunks
+            with open(CONFIG["chunks_file"], 'ab', buffering=1 << 20) as out_file:
+                asyncio.run(self.process_all(pending_staff, out_file))
 
         except KeyboardInterrupt:
             logger.warning("\n\n⚠️  Interrupted. Saving...")
             self.save_progress()
             self.save_stats()
             return
+        finally:
+            self.cache.close()
 
         # 保存最终结果
-        with open(CONFIG["output_file"], 'w') as f:
-            json.dump(all_chunks, f, indent=2, ensure_ascii=False)
+        self.export_chunks_json()
+        logger.info(f"✓ {self.stats['chunks_created']} chunks written to {CONFIG['chunks_file']}")
+        logger.info(f"✓ JSON array exported to {CONFIG['output_file']}")
 
         self.save_progress()
         self.save_stats()
         self._print_statistics()
 
+    def export_chunks_json(self):
+        """把 chunks_file 逐行转写成 JSON 数组(output_file),供 import_chunks_to_db 等读取;不整体载入内存"""
+        with open(CONFIG["chunks_file"], 'rb') as src, open(CONFIG["output_file"], 'wb') as dst:
+            dst.write(b"[")
+            first = True
+            for line in src:
+                line = line.strip()
+                if not line:
+                    continue
+                dst.write(b"\n" if first else b",\n")
+                dst.write(line)
+                first = False
+            dst.write(b"\n]\n")
+
     def _print_statistics(self):
         logger.info("\n" + "="*80)
         logger.info("STATISTICS")
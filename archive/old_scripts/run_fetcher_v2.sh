@@ -56,13 +56,18 @@ case $choice in
             echo ""
             echo "📊 进度文件:"
             processed=$(cat parsing_progress_multisource_v2.json | python3 -c "import sys, json; data=json.load(sys.stdin); print(len(data['processed_staff_emails']))")
-            cache_size=$(cat parsing_progress_multisource_v2.json | python3 -c "import sys, json; data=json.load(sys.stdin); print(len(data['publication_cache']))")
             echo "  已处理 staff: $processed"
-            echo "  缓存的出版物: $cache_size"
         else
             echo "  ⚠️  进度文件不存在"
         fi
 
+        if [ -f "publication_cache_multisource_v2.sqlite" ]; then
+            cache_size=$(python3 -c "import sqlite3; print(sqlite3.connect('file:publication_cache_multisource_v2.sqlite?mode=ro', uri=True).execute('SELECT COUNT(*) FROM publications').fetchone()[0])")
+            echo "  缓存的出版物: $cache_size"
+        else
+            echo "  ⚠️  缓存数据库不存在"
+        fi
+
         if [ -f "parsing_statistics_multisource_v2.json" ]; then
             echo ""
             echo "📈 统计信息:"
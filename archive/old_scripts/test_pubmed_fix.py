@@ -3,10 +3,10 @@
 """
 import json
 import sys
+import asyncio
 sys.path.insert(0, '/Users/z5241339/Documents/unsw_ai_rag')
 
 from parse_publications_multisource_v2 import MultiSourceFetcher
-from threading import Lock
 
 # 测试 DOI 列表
 test_cases = [
@@ -30,6 +30,11 @@ test_cases = [
     }
 ]
 
+async def fetch_one(fetcher: MultiSourceFetcher, doi: str) -> dict:
+    """用一个临时的HTTP客户端获取单个DOI"""
+    async with fetcher.create_client() as fetcher.client:
+        return await fetcher.fetch_abstract(doi)
+
 def test_pubmed_fix():
     """测试修复后的 PubMed 功能"""
 
@@ -43,9 +48,7 @@ def test_pubmed_fix():
         },
         "errors": []
     }
-    stats_lock = Lock()
-
-    fetcher = MultiSourceFetcher(stats, stats_lock)
+    fetcher = MultiSourceFetcher(stats)
 
     print("="*80)
     print("测试修复后的 PubMed Abstract 获取")
@@ -60,7 +63,7 @@ def test_pubmed_fix():
         print(f"DOI: {test['doi']}")
         print('='*80)
 
-        result = fetcher.fetch_abstract(test['doi'])
+        result = asyncio.run(fetch_one(fetcher, test['doi']))
 
         # 检查结果
         title = result.get('title', '').lower()
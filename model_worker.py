@@ -0,0 +1,174 @@
+"""
+Model Worker
+
+A single long-lived process that owns the embedding generator and the
+reranker model. API workers talk to it over a Unix socket, so the ~7 second
+reranker load and its memory are paid once no matter how many API workers run,
+and every request is served by the same batched executor.
+
+Usage:
+    # Start the model worker (optionally pinned to specific CPUs)
+    python3 model_worker.py --socket /tmp/unsw_rag_models.sock --cpus 0,1
+
+    # Point the API server at it; API workers no longer load models themselves
+    MODEL_WORKER_SOCKET=/tmp/unsw_rag_models.sock python3 api_server.py --workers 4
+"""
+import sys
+import os
+from pathlib import Path
+import logging
+import argparse
+import asyncio
+from contextlib import suppress
+
+# Add project root
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from search.batching import BatchingCoalescer
+from search.model_client import STREAM_LIMIT, send_message, read_message
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = "/tmp/unsw_rag_models.sock"
+
+
+class ModelWorker:
+    """Loads models once and serves batched embed / rerank requests"""
+
+    def __init__(self, max_batch: int, max_wait_ms: float):
+        from pipeline.step4_generate_embeddings import EmbeddingGenerator
+        from search.reranker import Reranker
+
+        logger.info("Initializing embedding generator...")
+        self.embedding_generator = EmbeddingGenerator(model_type="openai")
+
+        logger.info("Loading reranker model...")
+        self.reranker = Reranker(model_type="local")
+
+        self.embedding_batcher = BatchingCoalescer(
+            self.embedding_generator.generate_embeddings,
+            max_batch=max_batch,
+            max_wait_ms=max_wait_ms,
+            name="Embedding batcher"
+        )
+        self.rerank_batcher = BatchingCoalescer(
+            self._rerank_batch,
+            max_batch=max_batch,
+            max_wait_ms=max_wait_ms,
+            name="Rerank batcher"
+        )
+
+    def _rerank_batch(self, requests):
+        """Rerank a batch of (query, candidates, top_k) in one model call"""
+        from search.hybrid_search import RERANK_BOOST_FIELDS
+
+        return self.reranker.rerank_batch(
+            queries=[query for query, _, _ in requests],
+            documents_lists=[candidates for _, candidates, _ in requests],
+            top_ks=[top_k for _, _, top_k in requests],
+            boost_fields=RERANK_BOOST_FIELDS
+        )
+
+    async def handle(self, message: dict):
+        """Dispatch one request to the matching batcher"""
+        op = message.get("op")
+
+        if op == "embed":
+            return await self.embedding_batcher.submit(message["text"])
+        if op == "rerank":
+            return await self.rerank_batcher.submit(
+                (message["query"], message["candidates"], message["top_k"])
+            )
+        if op == "ping":
+            return True
+
+        raise ValueError(f"Unknown op: {op}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one client connection until it closes"""
+        try:
+            while True:
+                try:
+                    message = await read_message(reader)
+                except ConnectionError:
+                    break
+
+                try:
+                    response = {"result": await self.handle(message)}
+                except Exception as e:
+                    logger.error(f"Request failed: {e}")
+                    response = {"error": str(e)}
+
+                await send_message(writer, response)
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def serve(self, socket_path: str):
+        """Start batchers and listen on the Unix socket"""
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        self.embedding_batcher.start()
+        self.rerank_batcher.start()
+
+        server = await asyncio.start_unix_server(
+            self.handle_connection,
+            path=socket_path,
+            limit=STREAM_LIMIT
+        )
+        logger.info(f"✓ Model worker listening on {socket_path}")
+
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """Main function to run the model worker"""
+    parser = argparse.ArgumentParser(description="Run the shared model worker")
+    parser.add_argument(
+        "--socket",
+        default=os.getenv("MODEL_WORKER_SOCKET", DEFAULT_SOCKET),
+        help=f"Unix socket path (default: {DEFAULT_SOCKET})"
+    )
+    parser.add_argument(
+        "--cpus",
+        help="Comma-separated CPU ids to pin this process to (e.g. 0,1)"
+    )
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=int(os.getenv("MAX_BATCH", "32")),
+        help="Maximum requests per model call (default: 32)"
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=float(os.getenv("MAX_WAIT_MS", "8")),
+        help="Maximum time to collect a batch in ms (default: 8)"
+    )
+
+    args = parser.parse_args()
+
+    if args.cpus:
+        cpus = {int(cpu) for cpu in args.cpus.split(",")}
+        os.sched_setaffinity(0, cpus)
+        logger.info(f"Pinned to CPUs: {sorted(cpus)}")
+
+    worker = ModelWorker(max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    try:
+        asyncio.run(worker.serve(args.socket))
+    except KeyboardInterrupt:
+        logger.info("✓ Model worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -43,9 +43,28 @@ if [ -f "rag_chunks_multisource_v2.json" ]; then
 fi
 
 # 移动进度文件到 cache
+# v2 的出版物缓存在 SQLite 里,进度文件只记录 processed_staff_emails;
+# 合并成 pipeline 使用的带 publication_cache 的进度文件
 if [ -f "parsing_progress_multisource_v2.json" ]; then
-    echo "  移动: parsing_progress_multisource_v2.json → data/cache/parsing_progress.json"
-    cp parsing_progress_multisource_v2.json data/cache/parsing_progress.json
+    echo "  合并: parsing_progress_multisource_v2.json + publication_cache_multisource_v2.sqlite → data/cache/parsing_progress.json"
+    python3 << 'PYEOF'
+import json
+import os
+import sqlite3
+
+with open("parsing_progress_multisource_v2.json") as f:
+    progress = json.load(f)
+
+progress["publication_cache"] = {}
+if os.path.exists("publication_cache_multisource_v2.sqlite"):
+    conn = sqlite3.connect("publication_cache_multisource_v2.sqlite")
+    for doi, data in conn.execute("SELECT doi, data FROM publications"):
+        progress["publication_cache"][doi] = json.loads(data)
+    conn.close()
+
+with open("data/cache/parsing_progress.json", "w") as f:
+    json.dump(progress, f, indent=2)
+PYEOF
 fi
 
 if [ -f "parsing_statistics_multisource_v2.json" ]; then
@@ -25,6 +25,7 @@ import os
 from pathlib import Path
 from typing import List, Dict
 import time
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 import logging
 
@@ -46,7 +47,9 @@ logger = logging.getLogger(__name__)
 
 # 配置
 CONFIG = {
-    "batch_size": 200,  # 每批处理的 chunk 数量（平衡速度和速率限制）
+    "batch_size": 2048,  # 每批处理（并提交数据库）的 chunk 数量
+    "request_size": 512,  # 每个 embeddings API 请求的输入条数（API 上限 2048）
+    "max_concurrency": 4,  # embed_many 同时进行的 API 请求数
     "model": "text-embedding-3-small",  # OpenAI 模型
     "dimension": 1536,  # 向量维度
     "max_retries": 3,
@@ -120,6 +123,33 @@ class EmbeddingGenerator:
         elif self.model_type == "local":
             return self._generate_local(texts)
 
+    def embed_many(self, texts: List[str], batch: int = CONFIG["request_size"]) -> List[List[float]]:
+        """
+        批量生成向量（离线重算用）
+
+        按 batch 切分后并发请求 embeddings API，每个请求带多条输入，
+        减少网络往返。在线查询仍走 generate_embeddings 单条调用。
+
+        Args:
+            texts: 文本列表
+            batch: 每个 API 请求的输入条数
+
+        Returns:
+            向量列表（与 texts 顺序一致）
+        """
+        if not texts:
+            return []
+
+        if self.model_type == "local":
+            # 本地模型 encode 内部已经分批
+            return self._generate_local(texts)
+
+        sub_batches = [texts[i:i + batch] for i in range(0, len(texts), batch)]
+        with ThreadPoolExecutor(max_workers=min(CONFIG["max_concurrency"], len(sub_batches))) as executor:
+            results = executor.map(self._generate_openai, sub_batches)
+
+        return [embedding for embeddings in results for embedding in embeddings]
+
     def _generate_openai(self, texts: List[str]) -> List[List[float]]:
         """使用 OpenAI API 生成"""
         retries = 0
@@ -214,8 +244,8 @@ def process_chunks(chunks: List[Dict], generator: EmbeddingGenerator,
         chunk_ids = [c["chunk_id"] for c in batch]
 
         try:
-            # 生成 embeddings
-            embeddings = generator.generate_embeddings(texts)
+            # 生成 embeddings（多条输入一个请求，请求之间并发）
+            embeddings = generator.embed_many(texts)
 
             # 保存到数据库
             for chunk_id, embedding in zip(chunk_ids, embeddings):
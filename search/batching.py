@@ -0,0 +1,119 @@
+"""
+请求合并批处理模块
+
+把一个小时间窗口内并发到达的请求合并成一次批量调用
+（embedding 一次 API 请求、reranker 一次模型前向计算），
+再把结果分发回各自的请求。
+"""
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingCoalescer:
+    """
+    自适应微批处理器
+
+    - 队列里只有一个请求时立即执行，不增加低负载延迟
+    - 否则在 max_wait_ms 窗口内最多收集 max_batch 个请求一起执行
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch: int = 32,
+        max_wait_ms: float = 8,
+        name: str = "batcher"
+    ):
+        """
+        Args:
+            batch_fn: 批量处理函数（同步，在线程池中执行），输入列表，返回等长结果列表
+            max_batch: 每批最多请求数
+            max_wait_ms: 收集一批的最长等待时间（毫秒）
+            name: 日志中使用的名称
+        """
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """在当前事件循环中启动后台 worker"""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            f"✓ {self.name} started (max_batch={self.max_batch}, "
+            f"max_wait_ms={self.max_wait * 1000:g})"
+        )
+
+    async def stop(self):
+        """停止后台 worker"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, item: Any) -> Any:
+        """
+        提交一个请求并等待其结果
+
+        Args:
+            item: 单个请求的输入
+
+        Returns:
+            该请求对应的结果
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        """后台循环：收集一批请求 → 批量执行 → 分发结果"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            items = [await self._queue.get()]
+            t0 = loop.time()
+
+            # 队列为空时立即执行；否则在窗口剩余时间内等待后续请求（不轮询）
+            if not self._queue.empty():
+                while len(items) < self.max_batch:
+                    remaining = self.max_wait - (loop.time() - t0)
+                    if remaining <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+            await self._flush(items)
+
+    async def _flush(self, items: List[tuple]):
+        """执行一批请求并把结果写回对应的 future"""
+        inputs = [item for item, _ in items]
+
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, self.batch_fn, inputs
+            )
+        except Exception as e:
+            logger.error(f"{self.name} batch of {len(items)} failed: {e}")
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.debug(f"{self.name} flushed batch of {len(items)}")
+        for (_, future), result in zip(items, results):
+            # 客户端断开时 future 可能已被取消
+            if not future.done():
+                future.set_result(result)
+
@@ -0,0 +1,71 @@
+"""
+查询向量缓存模块
+
+按规范化后的查询文本缓存 embedding（TTL + LRU），
+重复或仅大小写/空白不同的查询不再调用 embedding API。
+"""
+import asyncio
+import logging
+import unicodedata
+from typing import Awaitable, Callable, Dict, List
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """查询向量缓存（异步，同一查询并发未命中时只计算一次）"""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Awaitable[List[float]]],
+        maxsize: int = 10_000,
+        ttl: float = 3600
+    ):
+        """
+        Args:
+            embed_fn: 异步 embedding 函数，输入单个查询，返回向量
+            maxsize: 最多缓存的查询数
+            ttl: 缓存过期时间（秒）
+        """
+        self.embed_fn = embed_fn
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """规范化查询作为缓存 key（NFKC + 去首尾空白 + 小写）"""
+        return unicodedata.normalize("NFKC", query).strip().lower()
+
+    async def get(self, query: str) -> List[float]:
+        """
+        获取查询向量，未命中时计算并缓存
+
+        Args:
+            query: 查询文本
+
+        Returns:
+            查询向量
+        """
+        key = self.normalize(query)
+
+        embedding = self._cache.get(key)
+        cache_hit = embedding is not None
+
+        if not cache_hit:
+            # 每个 key 一把锁，避免同一查询并发时重复调用 API
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            try:
+                async with lock:
+                    embedding = self._cache.get(key)
+                    cache_hit = embedding is not None
+                    if not cache_hit:
+                        embedding = await self.embed_fn(key)
+                        self._cache[key] = embedding
+            finally:
+                # embed_fn 失败时也要释放，否则每个失败的查询都会留下一把锁
+                self._locks.pop(key, None)
+
+        logger.info(f"Query embedding lookup: cache_hit={cache_hit}")
+        return embedding
@@ -4,8 +4,9 @@
 集成 BM25 + Vector + RRF + Reranker + Citation
 """
 import sys
+import copy
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 import logging
 
@@ -21,6 +22,16 @@ from search.citation import CitationFormatter
 
 logger = logging.getLogger(__name__)
 
+# RRF 融合后送入 reranker 的候选数量
+CANDIDATE_POOL_SIZE = 80
+
+# Reranker 元数据增强权重
+RERANK_BOOST_FIELDS = {
+    "citations_count": 0.1,
+    "is_open_access": 0.05,
+    "publication_year": 0.05
+}
+
 
 class HybridSearchEngine:
     """
@@ -70,6 +81,26 @@ class HybridSearchEngine:
 
         logger.info("✓ Search engine initialized")
 
+    def with_session(self, session: Session) -> "HybridSearchEngine":
+        """
+        返回绑定到指定 session 的搜索引擎副本
+
+        共享已加载的 reranker 和 embedding generator，只替换数据库相关组件，
+        用于 API 中每个请求使用连接池里独立的 session。
+
+        Args:
+            session: 数据库 session
+
+        Returns:
+            绑定到该 session 的搜索引擎
+        """
+        engine = copy.copy(self)
+        engine.session = session
+        engine.bm25_searcher = BM25Searcher(session)
+        engine.vector_searcher = VectorSearcher(session, self.embedding_generator)
+        engine.citation_formatter = CitationFormatter(session)
+        return engine
+
     def search(
         self,
         query: str,
@@ -97,10 +128,50 @@ class HybridSearchEngine:
         logger.info(f"Search query: '{query}'")
         logger.info(f"="*80)
 
+        retrieval = self.retrieve(query, chunk_types=chunk_types)
+        final_results = self.rerank(query, retrieval["candidates"], top_k)
+
+        return self.build_response(
+            query,
+            retrieval,
+            final_results,
+            top_k=top_k,
+            filters=filters,
+            include_scores=include_scores
+        )
+
+    def retrieve(
+        self,
+        query: str,
+        chunk_types: List[str] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> Dict:
+        """
+        Step 1-2: BM25 + Vector 检索并用 RRF 融合
+
+        Args:
+            query: 搜索查询
+            chunk_types: 限制的 chunk 类型
+            query_embedding: 预先计算好的查询向量（可选，None 时自动生成）
+
+        Returns:
+            {"bm25_results", "vector_results", "fused_results", "candidates"}
+        """
         # ========== Step 1: 并行检索 ==========
         logger.info("\n[Step 1] Parallel Retrieval (BM25 + Vector)")
 
-        # BM25 检索
+        bm25_results = self.retrieve_bm25(query, chunk_types=chunk_types)
+        vector_results = self.retrieve_vector(
+            query,
+            chunk_types=chunk_types,
+            query_embedding=query_embedding
+        )
+
+        # ========== Step 2: RRF 融合 ==========
+        return self.fuse_results(bm25_results, vector_results)
+
+    def retrieve_bm25(self, query: str, chunk_types: List[str] = None) -> List[Dict]:
+        """BM25 检索（只依赖本引擎的 session，可与向量检索并发执行）"""
         logger.info("  → BM25 search...")
         bm25_results = self.bm25_searcher.search(
             query=query,
@@ -109,16 +180,33 @@ class HybridSearchEngine:
         )
         logger.info(f"    ✓ BM25 found {len(bm25_results)} results")
 
-        # Vector 检索
+        return bm25_results
+
+    def retrieve_vector(
+        self,
+        query: str,
+        chunk_types: List[str] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict]:
+        """Vector 检索（只依赖本引擎的 session，可与 BM25 检索并发执行）"""
         logger.info("  → Vector search...")
         vector_results = self.vector_searcher.search(
             query=query,
             limit=50,
-            chunk_types=chunk_types
+            chunk_types=chunk_types,
+            query_embedding=query_embedding
         )
         logger.info(f"    ✓ Vector found {len(vector_results)} results")
 
-        # ========== Step 2: RRF 融合 ==========
+        return vector_results
+
+    def fuse_results(self, bm25_results: List[Dict], vector_results: List[Dict]) -> Dict:
+        """
+        Step 2: RRF 融合并截取候选集
+
+        Returns:
+            {"bm25_results", "vector_results", "fused_results", "candidates"}
+        """
         logger.info("\n[Step 2] RRF Fusion")
 
         fused_results = HybridFusion.reciprocal_rank_fusion(
@@ -128,29 +216,95 @@ class HybridSearchEngine:
         logger.info(f"  ✓ Fused to {len(fused_results)} unique documents")
 
         # 取前 80 个作为候选
-        candidate_results = fused_results[:80]
+        candidate_results = fused_results[:CANDIDATE_POOL_SIZE]
         logger.info(f"  → Candidate set: {len(candidate_results)} documents")
 
-        # ========== Step 3: Reranker 重排序 ==========
-        if self.use_reranker:
-            logger.info("\n[Step 3] Reranking")
-
-            reranked_results = self.reranker.rerank_with_metadata(
-                query=query,
-                documents=candidate_results,
-                top_k=top_k,
-                boost_fields={
-                    "citations_count": 0.1,
-                    "is_open_access": 0.05,
-                    "publication_year": 0.05
-                }
-            )
-            logger.info(f"  ✓ Reranked to top {len(reranked_results)} results")
-
-            final_results = reranked_results
-        else:
+        return {
+            "bm25_results": bm25_results,
+            "vector_results": vector_results,
+            "fused_results": fused_results,
+            "candidates": candidate_results
+        }
+
+    def rerank(self, query: str, candidates: List[Dict], top_k: int) -> List[Dict]:
+        """
+        Step 3: Reranker 重排序（未启用 reranker 时直接截断）
+
+        Args:
+            query: 搜索查询
+            candidates: 候选文档
+            top_k: 返回结果数量
+
+        Returns:
+            最终结果列表
+        """
+        if not self.use_reranker:
             logger.info("\n[Step 3] Reranking (Skipped)")
-            final_results = candidate_results[:top_k]
+            return candidates[:top_k]
+
+        logger.info("\n[Step 3] Reranking")
+
+        reranked_results = self.reranker.rerank_with_metadata(
+            query=query,
+            documents=candidates,
+            top_k=top_k,
+            boost_fields=RERANK_BOOST_FIELDS
+        )
+        logger.info(f"  ✓ Reranked to top {len(reranked_results)} results")
+
+        return reranked_results
+
+    def rerank_batch(self, requests: List[Tuple[str, List[Dict], int]]) -> List[List[Dict]]:
+        """
+        批量重排序多个查询（一次模型前向计算）
+
+        Args:
+            requests: (query, candidates, top_k) 列表
+
+        Returns:
+            与 requests 顺序对应的结果列表
+        """
+        if not self.use_reranker:
+            return [candidates[:top_k] for _, candidates, top_k in requests]
+
+        results = self.reranker.rerank_batch(
+            queries=[query for query, _, _ in requests],
+            documents_lists=[candidates for _, candidates, _ in requests],
+            top_ks=[top_k for _, _, top_k in requests],
+            boost_fields=RERANK_BOOST_FIELDS
+        )
+        logger.info(f"  ✓ Batch reranked {len(requests)} queries")
+
+        return results
+
+    def build_response(
+        self,
+        query: str,
+        retrieval: Dict,
+        final_results: List[Dict],
+        top_k: int = 10,
+        filters: Dict = None,
+        include_scores: bool = True,
+        reranked: Optional[bool] = None
+    ) -> Dict:
+        """
+        Step 4: Citation 格式化并组装响应
+
+        Args:
+            query: 搜索查询
+            retrieval: retrieve() 的返回值
+            final_results: 重排序后的结果
+            top_k: 返回结果数量
+            filters: 额外过滤条件
+            include_scores: 是否包含分数详情
+            reranked: final_results 是否经过 reranker（在引擎外重排序时由调用方传入，
+                      例如 model worker；默认取 self.use_reranker）
+
+        Returns:
+            搜索结果字典
+        """
+        if reranked is None:
+            reranked = self.use_reranker
 
         # ========== Step 4: Citation 格式化 ==========
         logger.info("\n[Step 4] Citation Formatting")
@@ -163,16 +317,17 @@ class HybridSearchEngine:
         logger.info(f"  ✓ Formatted {len(formatted_response['citations'])} citations")
 
         # ========== 添加额外信息 ==========
+        fused_results = retrieval["fused_results"]
         response = {
             "query": query,
             "total_results": len(fused_results),
             "returned_results": len(final_results),
             "citations": formatted_response["citations"],
             "search_metadata": {
-                "bm25_results": len(bm25_results),
-                "vector_results": len(vector_results),
+                "bm25_results": len(retrieval["bm25_results"]),
+                "vector_results": len(retrieval["vector_results"]),
                 "fused_results": len(fused_results),
-                "reranked": self.use_reranker,
+                "reranked": reranked,
                 "filters_applied": filters or {}
             }
         }
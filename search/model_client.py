@@ -0,0 +1,80 @@
+"""
+模型服务客户端
+
+连接 model_worker.py 启动的模型进程（Unix socket），
+让多个 API worker 共享同一份 reranker / embedding 模型。
+
+协议：每个请求/响应是一行 JSON
+    请求: {"op": "embed", "text": "..."}
+          {"op": "rerank", "query": "...", "candidates": [...], "top_k": 10}
+    响应: {"result": ...} 或 {"error": "..."}
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 单行消息上限（rerank 请求包含候选文档全文）
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+async def send_message(writer: asyncio.StreamWriter, message: Dict):
+    """写入一行 JSON 消息"""
+    writer.write(json.dumps(message).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+async def read_message(reader: asyncio.StreamReader) -> Dict:
+    """读取一行 JSON 消息，连接关闭时抛出 ConnectionError"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Model worker closed the connection")
+    return json.loads(line)
+
+
+class RemoteModelClient:
+    """model_worker 的异步客户端"""
+
+    def __init__(self, socket_path: str):
+        """
+        Args:
+            socket_path: model_worker 监听的 Unix socket 路径
+        """
+        self.socket_path = socket_path
+
+    async def embed(self, text: str) -> List[float]:
+        """获取单个查询的向量"""
+        return await self._call({"op": "embed", "text": text})
+
+    async def rerank(self, request: Tuple[str, List[Dict], int]) -> List[Dict]:
+        """重排序 (query, candidates, top_k)"""
+        query, candidates, top_k = request
+        return await self._call({
+            "op": "rerank",
+            "query": query,
+            "candidates": candidates,
+            "top_k": top_k
+        })
+
+    async def ping(self) -> bool:
+        """检查 model_worker 是否可用"""
+        return await self._call({"op": "ping"})
+
+    async def _call(self, message: Dict) -> Any:
+        """发送一个请求并等待响应（每个请求一个连接，Unix socket 建连开销很小）"""
+        reader, writer = await asyncio.open_unix_connection(
+            self.socket_path,
+            limit=STREAM_LIMIT
+        )
+        try:
+            await send_message(writer, message)
+            response = await read_message(reader)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+        if "error" in response:
+            raise RuntimeError(f"Model worker error: {response['error']}")
+        return response["result"]
@@ -4,12 +4,41 @@ RAG 回答生成器 - 使用 LLM 基于检索内容生成自然语言回答
 使用 OpenAI API 生成流畅、用户友好的回答
 """
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 from openai import OpenAI
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# 静态系统提示词：所有请求完全相同，放在消息最前面以命中 OpenAI 的 prompt cache。
+# 不要在这里插入 query、时间戳等每次请求不同的内容。
+SYSTEM_PROMPT = """You are a professional academic research assistant specializing in UNSW (University of New South Wales) research information.
+
+Your tasks:
+1. **Answer STRICTLY based on the provided documents** - every point must be supported by document evidence
+2. Directly cite specific content, data, methods, and conclusions from the documents
+3. When synthesizing multiple documents, clearly indicate which points come from which research
+4. Use professional and precise academic language
+5. If documents don't contain relevant information, explicitly state this
+6. **Never fabricate, speculate, or add information not present in the documents**
+
+Answer format:
+- Use 2-4 concise paragraphs in English
+- Every point must have document evidence
+- Use bullet points to organize information when appropriate
+- Focus on substantive content: research findings, methods, data, etc.
+- Don't list references in the answer (system will display them automatically)
+
+Each request provides the documents followed by the question. When answering:
+- Use ONLY information explicitly mentioned in the documents
+- Cite specific research findings, data, and methods
+- Do not add information not present in the documents
+- If documents are insufficient to answer the question, state this clearly
+
+IMPORTANT: Always answer in English."""
+
+NO_CONTEXT_ANSWER = "Sorry, I couldn't find relevant information to answer your question."
+
 
 class RAGAnswerGenerator:
     """RAG 回答生成器"""
@@ -63,26 +92,19 @@ class RAGAnswerGenerator:
 
         if not context:
             return {
-                "answer": "Sorry, I couldn't find relevant information to answer your question.",
+                "answer": NO_CONTEXT_ANSWER,
                 "sources": [],
                 "model": self.model,
                 "tokens_used": 0
             }
 
-        # 2. Build prompts
-        system_prompt = self._build_system_prompt()
-        user_prompt = self._build_user_prompt(query, context)
-
-        # 3. 调用 LLM 生成回答
+        # 2. 调用 LLM 生成回答
         try:
             logger.info(f"Generating answer for query: {query}")
 
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=self._build_messages(query, context),
                 temperature=self.temperature,
                 max_tokens=self.max_tokens
             )
@@ -92,7 +114,7 @@ class RAGAnswerGenerator:
 
             logger.info(f"✓ Answer generated ({tokens_used} tokens)")
 
-            # 4. 提取引用的来源
+            # 3. 提取引用的来源
             sources = self._extract_sources(search_results[:max_context_chunks])
 
             return {
@@ -111,6 +133,57 @@ class RAGAnswerGenerator:
                 "tokens_used": 0
             }
 
+    def stream_answer(
+        self,
+        query: str,
+        search_results: List[Dict],
+        max_context_chunks: int = 10
+    ) -> Iterator[str]:
+        """
+        Stream the answer as text deltas (OpenAI stream=True)
+
+        Args:
+            query: User question
+            search_results: Retrieved relevant documents
+            max_context_chunks: Maximum number of chunks to use as context
+
+        Yields:
+            Answer text fragments in generation order
+        """
+        context = self._build_context(search_results[:max_context_chunks])
+
+        if not context:
+            yield NO_CONTEXT_ANSWER
+            return
+
+        logger.info(f"Streaming answer for query: {query}")
+
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(query, context),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True
+        )
+
+        # 关闭生成器（如客户端断开）时同时关闭 HTTP 流
+        with stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def extract_sources(self, search_results: List[Dict], max_context_chunks: int = 10) -> List[Dict]:
+        """Citation sources for the chunks used as context"""
+        return self._extract_sources(search_results[:max_context_chunks])
+
+    def _build_messages(self, query: str, context: str) -> List[Dict]:
+        """Build chat messages - static system prompt first, variable content last"""
+
+        return [
+            {"role": "system", "content": self._build_system_prompt()},
+            {"role": "user", "content": self._build_user_prompt(query, context)}
+        ]
+
     def _build_context(self, search_results: List[Dict]) -> str:
         """Build context string from search results"""
 
@@ -164,41 +237,15 @@ class RAGAnswerGenerator:
     def _build_system_prompt(self) -> str:
         """Build system prompt - always in English"""
 
-        return """You are a professional academic research assistant specializing in UNSW (University of New South Wales) research information.
-
-Your tasks:
-1. **Answer STRICTLY based on the provided documents** - every point must be supported by document evidence
-2. Directly cite specific content, data, methods, and conclusions from the documents
-3. When synthesizing multiple documents, clearly indicate which points come from which research
-4. Use professional and precise academic language
-5. If documents don't contain relevant information, explicitly state this
-6. **Never fabricate, speculate, or add information not present in the documents**
-
-Answer format:
-- Use 2-4 concise paragraphs in English
-- Every point must have document evidence
-- Use bullet points to organize information when appropriate
-- Focus on substantive content: research findings, methods, data, etc.
-- Don't list references in the answer (system will display them automatically)
-
-IMPORTANT: Always answer in English."""
+        return SYSTEM_PROMPT
 
     def _build_user_prompt(self, query: str, context: str) -> str:
-        """Build user prompt - always in English"""
-
-        return f"""Answer the question based on the following documents.
+        """Build user prompt - documents first, question last"""
 
-Question: {query}
-
-Documents:
+        return f"""Documents:
 {context}
 
-Important instructions:
-- Use ONLY information explicitly mentioned in the documents above
-- Cite specific research findings, data, and methods
-- Do not add information not present in the documents
-- If documents are insufficient to answer the question, state this clearly
-- Answer in English"""
+Question: {query}"""
 
     def _extract_sources(self, search_results: List[Dict]) -> List[Dict]:
         """Extract citation sources from search results"""
@@ -5,6 +5,7 @@ Reranker 重排序模块
 """
 from typing import List, Dict, Optional
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
@@ -219,6 +220,68 @@ class Reranker:
         # 先用 reranker 重排
         reranked = self.rerank(query, documents, top_k * 2)  # 取2倍，留余地
 
+        return self._apply_metadata_boost(reranked, top_k, boost_fields)
+
+    def rerank_batch(
+        self,
+        queries: List[str],
+        documents_lists: List[List[Dict]],
+        top_ks: List[int],
+        boost_fields: Dict[str, float] = None
+    ) -> List[List[Dict]]:
+        """
+        批量重排序多个查询
+
+        本地模型把所有 (query, document) 对合并为一次 predict 调用，
+        其他模型逐个查询重排。
+
+        Args:
+            queries: 查询列表
+            documents_lists: 每个查询对应的候选文档列表
+            top_ks: 每个查询返回的结果数量
+            boost_fields: 元数据增强权重
+
+        Returns:
+            与 queries 顺序对应的重排序结果
+        """
+        if self.model_type != "local":
+            return [
+                self.rerank_with_metadata(query, documents, top_k, boost_fields)
+                for query, documents, top_k in zip(queries, documents_lists, top_ks)
+            ]
+
+        # 一次前向计算所有 pair
+        pairs = [
+            (query, doc["content"])
+            for query, documents in zip(queries, documents_lists)
+            for doc in documents
+        ]
+        scores = self.model.predict(pairs) if pairs else []
+
+        results = []
+        offset = 0
+        for documents, top_k in zip(documents_lists, top_ks):
+            for doc, score in zip(documents, scores[offset:offset + len(documents)]):
+                doc["rerank_score"] = float(score)
+            offset += len(documents)
+
+            reranked = sorted(
+                documents,
+                key=lambda x: x["rerank_score"],
+                reverse=True
+            )[:top_k * 2]  # 取2倍，留余地
+            results.append(self._apply_metadata_boost(reranked, top_k, boost_fields))
+
+        logger.info(f"Batch reranked {len(pairs)} pairs for {len(queries)} queries")
+        return results
+
+    def _apply_metadata_boost(
+        self,
+        reranked: List[Dict],
+        top_k: int,
+        boost_fields: Dict[str, float] = None
+    ) -> List[Dict]:
+        """根据元数据调整 rerank 分数并返回前 top_k 个"""
         if not boost_fields:
             return reranked[:top_k]
 
@@ -231,7 +294,6 @@ class Reranker:
             if "citations_count" in boost_fields:
                 citations = metadata.get("citations_count", 0)
                 # 对数归一化
-                import math
                 boost_score += boost_fields["citations_count"] * math.log1p(citations) / 10
 
             # 开放获取增强
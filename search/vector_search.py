@@ -3,7 +3,7 @@
 
 使用余弦相似度进行语义搜索
 """
-from typing import List, Dict
+from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
@@ -29,7 +29,8 @@ class VectorSearcher:
         query: str,
         limit: int = 50,
         chunk_types: List[str] = None,
-        similarity_threshold: float = 0.0
+        similarity_threshold: float = 0.0,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict]:
         """
         向量相似度搜索 - pgvector 优化版
@@ -39,13 +40,20 @@ class VectorSearcher:
             limit: 返回结果数量
             chunk_types: 限制的 chunk 类型列表
             similarity_threshold: 相似度阈值（0-1）
+            query_embedding: 预先计算好的查询向量（可选）
 
         Returns:
             搜索结果列表
         """
+        # 查询向量只生成一次，pgvector 失败回退时复用
+        if query_embedding is None:
+            query_embedding = self._embed_query(query)
+
         # 尝试使用 pgvector，如果失败则回退到 NumPy 方法
         try:
-            return self.search_with_pgvector(query, limit, chunk_types, similarity_threshold)
+            return self.search_with_pgvector(
+                query, limit, chunk_types, similarity_threshold, query_embedding
+            )
         except Exception as e:
             logger.warning(f"pgvector search failed, falling back to NumPy: {e}")
             # 回滚失败的事务
@@ -53,23 +61,31 @@ class VectorSearcher:
                 self.session.rollback()
             except:
                 pass
-            return self._search_with_numpy(query, limit, chunk_types, similarity_threshold)
+            return self._search_with_numpy(
+                query, limit, chunk_types, similarity_threshold, query_embedding
+            )
+
+    def _embed_query(self, query: str) -> List[float]:
+        """生成查询向量"""
+        if not self.embedding_generator:
+            raise ValueError("Embedding generator not initialized")
+
+        return self.embedding_generator.generate_embeddings([query])[0]
 
     def _search_with_numpy(
         self,
         query: str,
         limit: int = 50,
         chunk_types: List[str] = None,
-        similarity_threshold: float = 0.0
+        similarity_threshold: float = 0.0,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict]:
         """
         NumPy 版本的向量搜索（备用方案）
         """
         # 1. 生成查询向量
-        if not self.embedding_generator:
-            raise ValueError("Embedding generator not initialized")
-
-        query_embedding = self.embedding_generator.generate_embeddings([query])[0]
+        if query_embedding is None:
+            query_embedding = self._embed_query(query)
 
         # 2. 获取所有向量
         sql = """
@@ -184,7 +200,8 @@ class VectorSearcher:
         query: str,
         limit: int = 50,
         chunk_types: List[str] = None,
-        similarity_threshold: float = 0.0
+        similarity_threshold: float = 0.0,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict]:
         """
         使用 pgvector 扩展进行高效向量搜索（使用 HNSW 索引）
@@ -196,6 +213,7 @@ class VectorSearcher:
             limit: 返回结果数量
             chunk_types: 限制的 chunk 类型列表
             similarity_threshold: 相似度阈值（0-1）
+            query_embedding: 预先计算好的查询向量（可选）
 
         Returns:
             搜索结果列表
@@ -203,7 +221,8 @@ class VectorSearcher:
         from sqlalchemy import bindparam
 
         # 1. 生成查询向量
-        query_embedding = self.embedding_generator.generate_embeddings([query])[0]
+        if query_embedding is None:
+            query_embedding = self._embed_query(query)
 
         # 将向量转换为字符串格式：'[0.1, 0.2, ...]'
         vector_str = '[' + ','.join(map(str, query_embedding)) + ']'
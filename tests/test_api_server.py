@@ -0,0 +1,24 @@
+"""Tests for API request validation."""
+
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from pydantic import ValidationError  # noqa: E402
+
+import api_server  # noqa: E402
+
+
+def test_query_is_stripped():
+    request = api_server.QueryRequest(query="  What is digital twin?  ")
+    assert request.query == "What is digital twin?"
+
+
+@pytest.mark.parametrize("query", ["   ", "?!...", "x" * (api_server.QUERY_MAX_LENGTH + 1)])
+def test_invalid_queries_are_rejected(query):
+    with pytest.raises(ValidationError):
+        api_server.QueryRequest(query=query)
@@ -0,0 +1,48 @@
+"""Tests for request micro-batching."""
+
+import asyncio
+import time
+
+from search.batching import BatchingCoalescer
+
+
+def test_concurrent_submits_are_coalesced_in_order():
+    calls = []
+
+    def batch_fn(inputs):
+        calls.append(list(inputs))
+        return [x * 10 for x in inputs]
+
+    async def run():
+        batcher = BatchingCoalescer(batch_fn, max_batch=32, max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(8)))
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+
+    assert calls == [list(range(8))]
+    assert results == [i * 10 for i in range(8)]
+
+
+def test_collection_window_does_not_busy_wait():
+    async def run():
+        batcher = BatchingCoalescer(lambda inputs: inputs, max_batch=32, max_wait_ms=50)
+        batcher.start()
+        try:
+            for _ in range(5):
+                await asyncio.gather(batcher.submit(1), batcher.submit(2))
+        finally:
+            await batcher.stop()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    asyncio.run(run())
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    # Each batch waits out the 50 ms window; that wait must not spin the CPU
+    assert wall >= 0.2
+    assert cpu < wall / 2
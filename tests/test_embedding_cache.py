@@ -0,0 +1,50 @@
+"""Tests for the query embedding cache."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("cachetools")
+
+from search.embedding_cache import QueryEmbeddingCache  # noqa: E402
+
+
+def test_concurrent_misses_embed_once():
+    calls = []
+
+    async def embed_fn(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return [1.0, 2.0]
+
+    async def run():
+        cache = QueryEmbeddingCache(embed_fn)
+        results = await asyncio.gather(
+            cache.get("Digital Twin"),
+            cache.get("  digital twin "),
+            cache.get("DIGITAL TWIN"),
+        )
+        return cache, results
+
+    cache, results = asyncio.run(run())
+
+    assert calls == ["digital twin"]
+    assert results == [[1.0, 2.0]] * 3
+    assert cache._locks == {}
+
+
+def test_failed_embedding_releases_lock():
+    async def embed_fn(text):
+        raise RuntimeError("embedding service unavailable")
+
+    async def run():
+        cache = QueryEmbeddingCache(embed_fn)
+        for i in range(5):
+            with pytest.raises(RuntimeError):
+                await cache.get(f"query {i}")
+        return cache
+
+    cache = asyncio.run(run())
+
+    assert cache._locks == {}
+    assert len(cache._cache) == 0
@@ -0,0 +1,29 @@
+"""Tests for RAG answer prompt construction."""
+
+import os
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("pydantic_settings")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from search import rag_generator  # noqa: E402
+
+
+def test_system_prompt_is_stable_across_requests():
+    generator = rag_generator.RAGAnswerGenerator()
+    first = generator._build_system_prompt()
+    generator._build_user_prompt("What is digital twin?", "[Document 1]")
+    second = generator._build_system_prompt()
+
+    assert first == rag_generator.SYSTEM_PROMPT
+    assert hash(first) == hash(second)
+
+
+def test_user_prompt_puts_query_after_documents():
+    generator = rag_generator.RAGAnswerGenerator()
+    prompt = generator._build_user_prompt("What is digital twin?", "[Document 1]")
+
+    assert "What is digital twin?" not in generator._build_system_prompt()
+    assert prompt.index("[Document 1]") < prompt.index("What is digital twin?")